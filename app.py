@@ -1,29 +1,122 @@
 # app.py
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, make_response
 from flask_cors import CORS
-from controllers.tire_controller import get_all_tires, create_tire, update_tire, delete_tire, swap_tires
-from controllers.vehicle_controller import get_all_vehicles, create_vehicle, update_vehicle, delete_vehicle
-from controllers.event_controller import get_all_events, create_event, delete_event
+from controllers.tire_controller import (get_all_tires, create_tire, update_tire, delete_tire, swap_tires,
+                                         apply_rotation_plan)
+from controllers.vehicle_controller import (get_all_vehicles, get_vehicle_layout, create_vehicle, update_vehicle,
+                                            delete_vehicle)
+from controllers.event_controller import (get_all_events, stream_all_events, get_tire_events, get_vehicle_events,
+                                          create_event, create_events_batch, delete_event)
+from controllers.kpi_controller import get_kpis
+from controllers.analytics_controller import get_analytics_rollup, get_tire_analytics, rebuild_tire_analytics
+from controllers.forecast_controller import get_wear_forecast
+from controllers.search_controller import search
+from controllers.export_controller import export_rows
+from controllers.tire_projection import rebuild_tire_states
+from controllers.tire_import_controller import bulk_import_tires, parse_tires_csv, decode_csv
+from controllers.sync_controller import get_changes, list_etag, sync_watermark
+from controllers.bootstrap_controller import get_bootstrap
+from db.connection import init_app as init_db, get_pool, replica_stats
+from db.cache import init_app as init_cache, cache_stats
+from db.slow_queries import init_app as init_slow_queries, slow_query_log, REPORT_ORDERS
+from responses import init_app as init_responses
+from metrics import init_app as init_metrics, metrics_response
+from ops import require_ops
 import os
 
 def validate_client_id():
     """Valida e extrai o cliente_id da requisição"""
-    cliente_id = request.args.get('cliente_id') or (request.json.get('cliente_id') if request.is_json else None)
+    body = request.get_json(silent=True) if request.is_json else None
+    cliente_id = request.args.get('cliente_id') or (body.get('cliente_id') if isinstance(body, dict) else None)
     if not cliente_id:
         return None, jsonify({"message": "cliente_id é obrigatório"}), 400
     return cliente_id, None, None
 
+def conditional_list(cliente_id, resource, producer, also=()):
+    """
+    Serves a list endpoint with an ETag derived from the tenant's list versions
+    (and those of the `also` resources it embeds). Answers 304 without running
+    the list query when If-None-Match still matches; a 200 also carries the sync
+    watermark, read before the list.
+    """
+    etag = list_etag(cliente_id, resource, request.args, also)
+    watermark = None
+    if etag and request.if_none_match.contains_weak(etag):
+        response = make_response('', 304)
+    else:
+        watermark = sync_watermark()  # taken before the list is read
+        response = make_response(producer())
+        if response.status_code != 200:
+            return response
+    if etag:
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+    if watermark:
+        response.headers['X-Sync-Watermark'] = watermark
+    return response
+
 app = Flask(__name__)
-CORS(app) # Enable CORS for all routes
+CORS(app, expose_headers=['ETag', 'X-Sync-Watermark']) # Enable CORS for all routes
+init_db(app) # Return the request's pooled DB connection on teardown
+init_cache(app) # Subscribe each worker to the cross-worker invalidations (CACHE_CONFIG['backend'] = 'redis')
+init_slow_queries(app) # Log statements above SLOW_QUERY_CONFIG['threshold_ms'] (EXPLAIN once per SELECT shape)
+init_metrics(app) # Per-route latency and SQL time; registered first so it sees the compressed size
+init_responses(app) # orjson provider + gzip/brotli for large bodies
+
+# --- Health Routes ---
+@app.route('/api/db/pool', methods=['GET'])
+@require_ops
+def api_db_pool_stats():
+    """API endpoint to inspect connection pool usage (and the read replicas, when configured)."""
+    stats = get_pool().stats()
+    replicas = replica_stats()
+    if replicas is not None:
+        stats["replicas"] = replicas
+    return jsonify(stats), 200
+
+@app.route('/api/cache/stats', methods=['GET'])
+@require_ops
+def api_cache_stats():
+    """API endpoint to inspect the read cache (hits, misses, evictions, memory)."""
+    return jsonify(cache_stats()), 200
+
+@app.route('/api/db/slow-queries', methods=['GET'])
+@require_ops
+def api_db_slow_queries():
+    """API endpoint with the slowest statement fingerprints (?limit=20&order=total|max|count)."""
+    order = request.args.get('order', 'total')
+    try:
+        limit = int(request.args.get('limit', 20))
+    except ValueError:
+        limit = 0
+    if order not in REPORT_ORDERS or limit < 1:
+        return jsonify({"message": f"Use limit >= 1 e order entre: {', '.join(REPORT_ORDERS)}."}), 400
+    return jsonify(slow_query_log.report(limit, order)), 200
+
+@app.route('/api/db/slow-queries', methods=['DELETE'])
+@require_ops
+def api_db_reset_slow_queries():
+    """API endpoint to clear the slow-query report."""
+    slow_query_log.reset()
+    return jsonify({"message": "Relatório de consultas lentas limpo."}), 200
+
+@app.route('/metrics', methods=['GET'])
+@require_ops
+def api_metrics():
+    """Prometheus scrape endpoint (request latency, SQL time, pool and cache counters)."""
+    return metrics_response()
 
 # --- Tire Routes ---
 @app.route('/api/tires', methods=['GET'])
 def api_get_all_tires():
-    """API endpoint to get all tires."""
+    """API endpoint to list tires (filters, sort, keyset pagination or ?since= delta)."""
     cliente_id, error_response, status_code = validate_client_id()
     if error_response:
         return error_response, status_code
-    return get_all_tires(cliente_id)
+    since = request.args.get('since')
+    if since:
+        return conditional_list(cliente_id, 'tires', lambda: get_changes(cliente_id, 'tires', since))
+    return conditional_list(cliente_id, 'tires', lambda: get_all_tires(cliente_id, request.args))
 
 @app.route('/api/tires', methods=['POST'])
 def api_create_tire():
@@ -34,6 +127,40 @@ def api_create_tire():
     data = request.json
     return create_tire(data, cliente_id)
 
+@app.route('/api/tires/bulk', methods=['POST'])
+def api_bulk_import_tires():
+    """API endpoint to import many tires at once (JSON array or CSV body/upload)."""
+    cliente_id, error_response, status_code = validate_client_id()
+    if error_response:
+        return error_response, status_code
+    if request.is_json:
+        data = request.get_json(silent=True)
+        rows = data.get('tires') if isinstance(data, dict) else data
+    else:
+        data = request.files['file'].read() if 'file' in request.files else request.get_data()
+        try:
+            rows = parse_tires_csv(decode_csv(data))
+        except UnicodeDecodeError:
+            return jsonify({"message": "Não foi possível ler o CSV: salve o arquivo em UTF-8 ou Windows-1252."}), 400
+    return bulk_import_tires(rows, cliente_id)
+
+@app.route('/api/tires/rebuild-state', methods=['POST'])
+@require_ops
+def api_rebuild_tire_states():
+    """API endpoint to recompute every tire's state from its event history."""
+    cliente_id, error_response, status_code = validate_client_id()
+    if error_response:
+        return error_response, status_code
+    return rebuild_tire_states(cliente_id)
+
+@app.route('/api/tires/<string:tire_id>/events', methods=['GET'])
+def api_get_tire_events(tire_id):
+    """API endpoint to page through one tire's event history."""
+    cliente_id, error_response, status_code = validate_client_id()
+    if error_response:
+        return error_response, status_code
+    return get_tire_events(tire_id, cliente_id, request.args)
+
 @app.route('/api/tires/<string:tire_id>', methods=['PUT'])
 def api_update_tire(tire_id):
     """API endpoint to update an existing tire."""
@@ -54,11 +181,15 @@ def api_delete_tire(tire_id):
 # --- Vehicle Routes ---
 @app.route('/api/vehicles', methods=['GET'])
 def api_get_all_vehicles():
-    """API endpoint to get all vehicles."""
+    """API endpoint to list vehicles (filters, sort, keyset pagination, ?include= or ?since= delta)."""
     cliente_id, error_response, status_code = validate_client_id()
     if error_response:
         return error_response, status_code
-    return get_all_vehicles(cliente_id)
+    since = request.args.get('since')
+    if since:
+        return conditional_list(cliente_id, 'vehicles', lambda: get_changes(cliente_id, 'vehicles', since))
+    also = ('tires',) if request.args.get('include') else () # mounted tires are embedded
+    return conditional_list(cliente_id, 'vehicles', lambda: get_all_vehicles(cliente_id, request.args), also)
 
 @app.route('/api/vehicles', methods=['POST'])
 def api_create_vehicle():
@@ -69,6 +200,22 @@ def api_create_vehicle():
     data = request.json
     return create_vehicle(data, cliente_id)
 
+@app.route('/api/vehicles/<string:vehicle_id>/events', methods=['GET'])
+def api_get_vehicle_events(vehicle_id):
+    """API endpoint to page through the history of a vehicle's mounted tires."""
+    cliente_id, error_response, status_code = validate_client_id()
+    if error_response:
+        return error_response, status_code
+    return get_vehicle_events(vehicle_id, cliente_id, request.args)
+
+@app.route('/api/vehicles/<string:vehicle_id>/layout', methods=['GET'])
+def api_get_vehicle_layout(vehicle_id):
+    """API endpoint to get a vehicle's mounted tires grouped by axle and position."""
+    cliente_id, error_response, status_code = validate_client_id()
+    if error_response:
+        return error_response, status_code
+    return get_vehicle_layout(vehicle_id, cliente_id)
+
 @app.route('/api/vehicles/<string:vehicle_id>', methods=['PUT'])
 def api_update_vehicle(vehicle_id):
     """API endpoint to update an existing vehicle."""
@@ -89,11 +236,16 @@ def api_delete_vehicle(vehicle_id):
 # --- Event Routes ---
 @app.route('/api/events', methods=['GET'])
 def api_get_all_events():
-    """API endpoint to get all events."""
+    """API endpoint to get all events (?stream=1 streams the array, ?since= returns a delta)."""
     cliente_id, error_response, status_code = validate_client_id()
     if error_response:
         return error_response, status_code
-    return get_all_events(cliente_id)
+    since = request.args.get('since')
+    if since:
+        return conditional_list(cliente_id, 'events', lambda: get_changes(cliente_id, 'events', since))
+    if request.args.get('stream') in ('1', 'true'):
+        return conditional_list(cliente_id, 'events', lambda: stream_all_events(cliente_id))
+    return conditional_list(cliente_id, 'events', lambda: get_all_events(cliente_id))
 
 @app.route('/api/events', methods=['POST'])
 def api_create_event():
@@ -104,13 +256,93 @@ def api_create_event():
     data = request.json
     return create_event(data, cliente_id)
 
+@app.route('/api/events/batch', methods=['POST'])
+def api_create_events_batch():
+    """API endpoint to create many events (e.g. an inspection round) in one transaction."""
+    cliente_id, error_response, status_code = validate_client_id()
+    if error_response:
+        return error_response, status_code
+    data = request.get_json(silent=True)
+    events = data.get('events') if isinstance(data, dict) else data
+    return create_events_batch(events, cliente_id)
+
 @app.route('/api/events/<string:event_id>', methods=['DELETE'])
 def api_delete_event(event_id):
-    """API endpoint to delete an event."""
+    """API endpoint to delete an event (?force=1 also deletes events folded into the tire's base)."""
+    cliente_id, error_response, status_code = validate_client_id()
+    if error_response:
+        return error_response, status_code
+    return delete_event(event_id, cliente_id, force=request.args.get('force') in ('1', 'true'))
+
+# --- Bootstrap Route ---
+@app.route('/api/bootstrap', methods=['GET'])
+def api_get_bootstrap():
+    """API endpoint to load the dashboard's tires, vehicles and events in one round trip."""
+    cliente_id, error_response, status_code = validate_client_id()
+    if error_response:
+        return error_response, status_code
+    return get_bootstrap(cliente_id, request.args)
+
+# --- Export Route ---
+@app.route('/api/export/<string:resource>', methods=['GET'])
+def api_export(resource):
+    """API endpoint to stream a client's events or tires as CSV or Parquet."""
+    cliente_id, error_response, status_code = validate_client_id()
+    if error_response:
+        return error_response, status_code
+    return export_rows(cliente_id, resource, request.args)
+
+# --- Search Route ---
+@app.route('/api/search', methods=['GET'])
+def api_search():
+    """API endpoint to search a client's tires and vehicles by prefix or substring."""
+    cliente_id, error_response, status_code = validate_client_id()
+    if error_response:
+        return error_response, status_code
+    return search(cliente_id, request.args)
+
+# --- KPI Routes ---
+@app.route('/api/kpis', methods=['GET'])
+def api_get_kpis():
+    """API endpoint to get the fleet KPIs (cached per client)."""
+    cliente_id, error_response, status_code = validate_client_id()
+    if error_response:
+        return error_response, status_code
+    return get_kpis(cliente_id)
+
+# --- Analytics Routes ---
+@app.route('/api/analytics/rollup', methods=['GET'])
+def api_get_analytics_rollup():
+    """API endpoint to get cost and wear totals per marca, modelo, medida, fornecedor or vehicle."""
     cliente_id, error_response, status_code = validate_client_id()
     if error_response:
         return error_response, status_code
-    return delete_event(event_id, cliente_id)
+    return get_analytics_rollup(cliente_id, request.args.get('by', 'marca'))
+
+@app.route('/api/analytics/tires', methods=['GET'])
+def api_get_tire_analytics():
+    """API endpoint to rank tires by CPK, wear rate, km or cost."""
+    cliente_id, error_response, status_code = validate_client_id()
+    if error_response:
+        return error_response, status_code
+    return get_tire_analytics(cliente_id, request.args)
+
+@app.route('/api/analytics/refresh', methods=['POST'])
+@require_ops
+def api_rebuild_tire_analytics():
+    """API endpoint to recompute a client's tire analytics from tires and events."""
+    cliente_id, error_response, status_code = validate_client_id()
+    if error_response:
+        return error_response, status_code
+    return rebuild_tire_analytics(cliente_id)
+
+@app.route('/api/forecast/wear', methods=['GET'])
+def api_get_wear_forecast():
+    """API endpoint to predict when each tire reaches the legal tread limit."""
+    cliente_id, error_response, status_code = validate_client_id()
+    if error_response:
+        return error_response, status_code
+    return get_wear_forecast(cliente_id, request.args)
 
 # --- Swap Tires Route ---
 @app.route('/api/swap-tires', methods=['POST'])
@@ -126,6 +358,14 @@ def api_swap_tires():
         return jsonify({"message": "IDs dos pneus são necessários para a permuta."}), 400
     return swap_tires(tire1_id, tire2_id, cliente_id)
 
+@app.route('/api/rotation-plans', methods=['POST'])
+def api_apply_rotation_plan():
+    """API endpoint to move many mounted tires (any permutation of their positions) at once."""
+    cliente_id, error_response, status_code = validate_client_id()
+    if error_response:
+        return error_response, status_code
+    return apply_rotation_plan(request.get_json(silent=True), cliente_id)
+
 if __name__ == '__main__':
     # For local development, use this:
     # app.run(debug=True, host='0.0.0.0', port=7766)
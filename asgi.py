@@ -0,0 +1,147 @@
+# asgi.py
+"""
+ASGI serving mode: uvicorn asgi:application --host 0.0.0.0 --port 7766
+
+The dashboard read routes run as coroutines on an aiomysql pool, so one process
+keeps many requests in flight without a thread per request. Every other /api/*
+route (writes, imports, per-tire history, CORS preflights) is served by the Flask
+app from app.py in a small thread pool, so both modes expose the same API.
+"""
+from a2wsgi import WSGIMiddleware
+from quart import Quart, request, jsonify, make_response
+from werkzeug.exceptions import HTTPException
+
+from app import app as flask_app
+from controllers.async_read_controller import (get_all, get_all_events, stream_all_events, get_changes, list_etag,
+                                               sync_watermark, get_kpis, get_bootstrap)
+from db.cache import start_invalidation_bus
+from db.async_connection import init_async_pool, close_async_pool, async_pool_stats
+from responses import init_async_app as init_responses
+from metrics import init_async_app as init_metrics
+from ops import require_ops_async
+
+FALLBACK_THREADS = 10
+
+async_app = Quart(__name__)
+init_metrics(async_app)
+init_responses(async_app)
+
+@async_app.before_serving
+async def startup():
+    await init_async_pool()
+    start_invalidation_bus()
+
+@async_app.after_serving
+async def shutdown():
+    await close_async_pool()
+
+@async_app.after_request
+async def add_cors_headers(response):
+    """Same headers flask-cors adds to the Flask routes."""
+    origin = request.headers.get('Origin')
+    if origin:
+        response.headers['Access-Control-Allow-Origin'] = origin
+        response.headers['Access-Control-Expose-Headers'] = 'ETag, X-Sync-Watermark'
+        response.vary.add('Origin')
+    return response
+
+async def validate_client_id():
+    """Valida e extrai o cliente_id da requisição"""
+    body = await request.get_json(silent=True) if request.is_json else None
+    cliente_id = request.args.get('cliente_id') or (body.get('cliente_id') if isinstance(body, dict) else None)
+    if not cliente_id:
+        return None, jsonify({"message": "cliente_id é obrigatório"}), 400
+    return cliente_id, None, None
+
+async def conditional_list(cliente_id, resource, producer, also=()):
+    """Async counterpart of app.conditional_list (ETag / 304 / X-Sync-Watermark)."""
+    etag = await list_etag(cliente_id, resource, request.args, also)
+    watermark = None
+    if etag and request.if_none_match.contains_weak(etag):
+        response = await make_response('', 304)
+    else:
+        watermark = await sync_watermark()  # taken before the list is read
+        response = await make_response(await producer())
+        if response.status_code != 200:
+            return response
+    if etag:
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+    if watermark:
+        response.headers['X-Sync-Watermark'] = watermark
+    return response
+
+# --- Health Routes ---
+@async_app.route('/api/db/async-pool', methods=['GET'])
+@require_ops_async
+async def api_async_pool_stats():
+    """API endpoint to inspect the async connection pool."""
+    return jsonify(async_pool_stats()), 200
+
+# --- List Routes ---
+@async_app.route('/api/tires', methods=['GET'])
+async def api_get_all_tires():
+    cliente_id, error_response, status_code = await validate_client_id()
+    if error_response:
+        return error_response, status_code
+    since = request.args.get('since')
+    if since:
+        return await conditional_list(cliente_id, 'tires', lambda: get_changes(cliente_id, 'tires', since))
+    return await conditional_list(cliente_id, 'tires', lambda: get_all(cliente_id, 'tires', request.args))
+
+@async_app.route('/api/vehicles', methods=['GET'])
+async def api_get_all_vehicles():
+    cliente_id, error_response, status_code = await validate_client_id()
+    if error_response:
+        return error_response, status_code
+    since = request.args.get('since')
+    if since:
+        return await conditional_list(cliente_id, 'vehicles', lambda: get_changes(cliente_id, 'vehicles', since))
+    also = ('tires',) if request.args.get('include') else ()
+    return await conditional_list(cliente_id, 'vehicles', lambda: get_all(cliente_id, 'vehicles', request.args), also)
+
+@async_app.route('/api/events', methods=['GET'])
+async def api_get_all_events():
+    cliente_id, error_response, status_code = await validate_client_id()
+    if error_response:
+        return error_response, status_code
+    since = request.args.get('since')
+    if since:
+        return await conditional_list(cliente_id, 'events', lambda: get_changes(cliente_id, 'events', since))
+    if request.args.get('stream') in ('1', 'true'):
+        return await conditional_list(cliente_id, 'events', lambda: stream_all_events(cliente_id))
+    return await conditional_list(cliente_id, 'events', lambda: get_all_events(cliente_id))
+
+# --- Dashboard Routes ---
+@async_app.route('/api/bootstrap', methods=['GET'])
+async def api_get_bootstrap():
+    cliente_id, error_response, status_code = await validate_client_id()
+    if error_response:
+        return error_response, status_code
+    return await get_bootstrap(cliente_id, request.args)
+
+@async_app.route('/api/kpis', methods=['GET'])
+async def api_get_kpis():
+    cliente_id, error_response, status_code = await validate_client_id()
+    if error_response:
+        return error_response, status_code
+    return await get_kpis(cliente_id)
+
+flask_fallback = WSGIMiddleware(flask_app, workers=FALLBACK_THREADS)
+_async_routes = async_app.url_map.bind('localhost')
+
+def _is_async_route(scope):
+    if scope['method'] == 'OPTIONS':
+        return False  # preflights are answered by flask-cors
+    try:
+        _async_routes.match(scope['path'], method=scope['method'])
+        return True
+    except HTTPException:
+        return False
+
+async def application(scope, receive, send):
+    """ASGI entry point: async routes first, the Flask app for everything else."""
+    if scope['type'] == 'http' and not _is_async_route(scope):
+        await flask_fallback(scope, receive, send)
+    else:
+        await async_app(scope, receive, send)
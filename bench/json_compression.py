@@ -0,0 +1,94 @@
+# bench/json_compression.py
+"""
+Micro-benchmark of the /api/tires and /api/events response encoding: Flask's default
+JSON provider vs the orjson provider, and the size/time of gzip and brotli.
+
+    python -m bench.json_compression [--rows 5000] [--repeat 20]
+"""
+import argparse
+import json
+import random
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+import responses
+
+
+def synthetic_tires(count, seed=1):
+    """Rows shaped like `SELECT * FROM tires` (22 columns, DECIMAL and DATE values)."""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(count):
+        rows.append({
+            'id': f'tire_{i:08d}', 'numeroFogo': f'F{i:06d}', 'marca': rng.choice(['Michelin', 'Pirelli', 'Goodyear']),
+            'modelo': rng.choice(['X Multi Z', 'FR85', 'KMAX S']), 'tipoPneu': 'Radial', 'medida': '295/80R22.5',
+            'capacidadeCarga': '152/148M', 'desenhoBanda': 'Liso', 'profundidadeSulcoInicial': Decimal('16.00'),
+            'custoAquisicao': Decimal(f'{rng.uniform(1500, 3000):.2f}'), 'dataAquisicao': date(2023, 1, 1) + timedelta(days=i % 700),
+            'fornecedor': 'Distribuidora Sul', 'numeroNF': f'NF{i:07d}', 'statusInicial': 'Em Uso',
+            'numeroRecapagens': rng.randint(0, 3), 'quilometragemTotalPercorrida': Decimal(f'{rng.uniform(0, 200000):.2f}'),
+            'ultimaLeituraHodometroRegistrada': Decimal(f'{rng.uniform(0, 500000):.2f}'),
+            'profundidadeSulcoAtual': Decimal(f'{rng.uniform(2, 16):.2f}'), 'currentVehicleId': f'veh_{i // 10:06d}',
+            'currentVehiclePlaca': f'ABC{i // 10:04d}', 'currentAxle': 1 + i % 3, 'currentPosition': 'Esquerda Externa',
+            'cliente_id': 'bench', 'createdAt': datetime(2024, 1, 1, 12, 0, 0), 'updatedAt': datetime(2024, 6, 1, 8, 30, 0),
+        })
+    return rows
+
+
+def synthetic_events(count, seed=2):
+    rng = random.Random(seed)
+    return [{
+        'id': f'evt_{i:08d}', 'tireId': f'tire_{rng.randint(0, count // 10):08d}',
+        'tipo': rng.choice(['Leitura de Hodômetro', 'Medição de Sulco', 'Montagem']),
+        'data': date(2024, 1, 1) + timedelta(days=i % 365), 'observacoes': None,
+        'detalhes': {'leituraHodometro': rng.randint(0, 500000), 'profundidadeSulco': round(rng.uniform(2, 16), 2)},
+        'cliente_id': 'bench', 'timestamp': datetime(2024, 1, 1) + timedelta(minutes=i),
+    } for i in range(count)]
+
+
+def timed(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def run(rows, repeat):
+    app = Flask(__name__)
+    providers = {'flask': DefaultJSONProvider(app)}
+    if responses.orjson is not None:
+        providers['orjson'] = responses.json_provider_class({'json_serializer': 'orjson', 'date_format': 'http'})(app)
+        providers['orjson_iso'] = responses.json_provider_class({'json_serializer': 'orjson', 'date_format': 'iso'})(app)
+    config = responses.load_response_config()
+    report = {}
+    for name, payload in (('tires', synthetic_tires(rows)), ('events', synthetic_events(rows))):
+        result = {'rows': rows, 'serialize_ms': {}}
+        for provider_name, provider in providers.items():
+            ms, body = timed(lambda: provider.dumps(payload, separators=(',', ':')), repeat)
+            result['serialize_ms'][provider_name] = round(ms, 2)
+        raw = body.encode('utf-8')
+        result['bytes'] = {'identity': len(raw)}
+        result['compress_ms'] = {}
+        for encoding in ('gzip', 'br') if responses.brotli is not None else ('gzip',):
+            ms, compressed = timed(lambda: responses.compress_body(raw, encoding, config), repeat)
+            result['bytes'][encoding] = len(compressed)
+            result['compress_ms'][encoding] = round(ms, 2)
+        report[name] = result
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args(argv)
+    print(json.dumps(run(args.rows, args.repeat), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,357 @@
+# bench/load.py
+"""
+Load test of every route in app.py against a seeded local database.
+
+    python -m bench.seed --reset                       # once
+    python -m bench.load --concurrency 1,8,32 --requests 200 --output results.json
+    python -m bench.load --baseline results.json      # exits 1 if a route's p95 regressed
+
+Unless --url is given, the app is started with bench.serve on the benchmark database.
+Each route is driven at each concurrency level in turn, so the server's query count
+(SHOW GLOBAL STATUS 'Questions') can be attributed to it; keep other clients off the
+server while the benchmark runs.
+"""
+import argparse
+import http.client
+import itertools
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import date
+from urllib.parse import urlsplit, urlencode
+
+import mysql.connector
+
+from bench.seed import add_connection_arguments, connect_args, tenant_ids
+from ops import load_ops_config
+
+SERVER_START_TIMEOUT = 30
+FIXTURE_LIMIT = 2000
+
+
+class Fixtures:
+    """Ids read from the seeded database plus the ones created during the run."""
+
+    def __init__(self, connection, tenants):
+        self.tenants = tenants
+        self.vehicles, self.tires, self.in_use, self.events = {}, {}, {}, {}
+        self.created = {kind: {t: deque() for t in tenants} for kind in ('tires', 'vehicles', 'events')}
+        cursor = connection.cursor()
+        try:
+            for tenant in tenants:
+                cursor.execute("SELECT id FROM vehicles WHERE cliente_id = %s LIMIT %s", (tenant, FIXTURE_LIMIT))
+                self.vehicles[tenant] = [row[0] for row in cursor.fetchall()]
+                cursor.execute("SELECT id, statusInicial FROM tires WHERE cliente_id = %s LIMIT %s", (tenant, FIXTURE_LIMIT))
+                rows = cursor.fetchall()
+                self.tires[tenant] = [row[0] for row in rows]
+                self.in_use[tenant] = [row[0] for row in rows if row[1] == 'Em Uso']
+            cursor.execute("SELECT DATE_FORMAT(NOW() - INTERVAL 1 HOUR, '%Y-%m-%d %H:%i:%s')")
+            self.since = cursor.fetchone()[0]
+        finally:
+            cursor.close()
+        missing = [t for t in tenants if not self.vehicles[t] or len(self.in_use[t]) < 2]
+        if missing:
+            raise SystemExit(f"Banco de benchmark sem dados para {', '.join(missing)}; rode python -m bench.seed")
+
+
+def new_id(prefix):
+    return f"bench_{prefix}_{uuid.uuid4().hex[:16]}"
+
+
+def tire_payload(tire_id):
+    return {'id': tire_id, 'numeroFogo': tire_id[-8:], 'marca': 'Michelin', 'modelo': 'X Multi Z',
+            'medida': '295/80R22.5', 'custoAquisicao': '2500.00', 'dataAquisicao': '2024-01-15',
+            'fornecedor': 'Fornecedor Bench', 'statusInicial': 'Em Estoque - Novo', 'profundidadeSulcoInicial': 16}
+
+
+def odometer_event(tire_id, rng):
+    return {'tireId': tire_id, 'tipo': 'Registro de Quilometragem e Sulco', 'data': date.today().isoformat(),
+            'detalhes': {'quilometragemVeiculo': rng.randint(400000, 900000),
+                         'profundidadeSulcoAtual': round(rng.uniform(3, 15), 2)}}
+
+
+def rotation_cycle(tire_ids):
+    """Moves each tire to the position of the next one (a single cycle)."""
+    return [{'tireId': tire_id, 'toTireId': tire_ids[(index + 1) % len(tire_ids)]} for index, tire_id in enumerate(tire_ids)]
+
+
+def _consume(fixtures, kind, tenant, fallback):
+    try:
+        return fixtures.created[kind][tenant].popleft()
+    except IndexError:
+        return fallback
+
+
+# Prefix (marca), substring (modelo) and size queries against the seeded tires
+SEARCH_TERMS = ('Mich', 'Pirelli', 'Multi', 'KMAX', '295/80')
+
+# name -> (method, builder(fixtures, tenant, rng) -> (path, query, body)); run in this order
+SCENARIOS = {
+    'GET /api/db/pool': ('GET', lambda f, t, r: ('/api/db/pool', {}, None)),
+    'GET /api/cache/stats': ('GET', lambda f, t, r: ('/api/cache/stats', {}, None)),
+    'GET /api/tires': ('GET', lambda f, t, r: ('/api/tires', {}, None)),
+    'GET /api/tires?limit=100': ('GET', lambda f, t, r: ('/api/tires', {'limit': 100, 'sort': 'numeroFogo'}, None)),
+    'GET /api/tires?since': ('GET', lambda f, t, r: ('/api/tires', {'since': f.since}, None)),
+    'GET /api/tires/<id>/events': ('GET', lambda f, t, r: (f"/api/tires/{r.choice(f.in_use[t])}/events", {}, None)),
+    'GET /api/vehicles': ('GET', lambda f, t, r: ('/api/vehicles', {}, None)),
+    'GET /api/vehicles?include=layout': ('GET', lambda f, t, r: ('/api/vehicles', {'include': 'layout'}, None)),
+    'GET /api/vehicles/<id>/layout': ('GET', lambda f, t, r: (f"/api/vehicles/{r.choice(f.vehicles[t])}/layout", {}, None)),
+    'GET /api/vehicles/<id>/events': ('GET', lambda f, t, r: (f"/api/vehicles/{r.choice(f.vehicles[t])}/events", {}, None)),
+    'GET /api/events': ('GET', lambda f, t, r: ('/api/events', {}, None)),
+    'GET /api/events?stream=1': ('GET', lambda f, t, r: ('/api/events', {'stream': 1}, None)),
+    'GET /api/bootstrap': ('GET', lambda f, t, r: ('/api/bootstrap', {}, None)),
+    'GET /api/kpis': ('GET', lambda f, t, r: ('/api/kpis', {}, None)),
+    'GET /api/analytics/rollup': ('GET', lambda f, t, r: ('/api/analytics/rollup', {'by': r.choice(('marca', 'medida', 'vehicle'))}, None)),
+    'GET /api/analytics/tires': ('GET', lambda f, t, r: ('/api/analytics/tires', {'sort': 'cpk', 'limit': 100}, None)),
+    'GET /api/forecast/wear': ('GET', lambda f, t, r: ('/api/forecast/wear', {}, None)),
+    'GET /api/forecast/wear?dias=90': ('GET', lambda f, t, r: ('/api/forecast/wear', {'dias': 90, 'limit': 100}, None)),
+    'GET /api/search': ('GET', lambda f, t, r: ('/api/search', {'q': r.choice(SEARCH_TERMS)}, None)),
+    'GET /api/export/events': ('GET', lambda f, t, r: ('/api/export/events', {'format': 'csv'}, None)),
+    'GET /api/export/tires': ('GET', lambda f, t, r: ('/api/export/tires', {'format': 'csv'}, None)),
+    'GET /api/export/tires?format=parquet': ('GET', lambda f, t, r: ('/api/export/tires', {'format': 'parquet'}, None)),
+    'POST /api/tires': ('POST', lambda f, t, r: ('/api/tires', {}, tire_payload(_created(f, 'tires', t, new_id('tire'))))),
+    'PUT /api/tires/<id>': ('PUT', lambda f, t, r: (f"/api/tires/{r.choice(f.tires[t])}", {}, {'fornecedor': f"Fornecedor {r.randint(1, 9)}"})),
+    'DELETE /api/tires/<id>': ('DELETE', lambda f, t, r: (f"/api/tires/{_consume(f, 'tires', t, 'missing')}", {}, None)),
+    'POST /api/tires/bulk': ('POST', lambda f, t, r: ('/api/tires/bulk', {}, [tire_payload(new_id('tire')) for _ in range(100)])),
+    'POST /api/vehicles': ('POST', lambda f, t, r: ('/api/vehicles', {}, {'id': _created(f, 'vehicles', t, new_id('veh')), 'placa': 'BEN0001', 'modelo': 'Bench', 'ano': 2024, 'eixos': 3})),
+    'PUT /api/vehicles/<id>': ('PUT', lambda f, t, r: (f"/api/vehicles/{r.choice(f.vehicles[t])}", {}, {'modelo': f"Modelo {r.randint(1, 9)}"})),
+    'DELETE /api/vehicles/<id>': ('DELETE', lambda f, t, r: (f"/api/vehicles/{_consume(f, 'vehicles', t, 'missing')}", {}, None)),
+    'POST /api/events': ('POST', lambda f, t, r: ('/api/events', {}, dict(odometer_event(r.choice(f.in_use[t]), r), id=_created(f, 'events', t, new_id('evt'))))),
+    'POST /api/events/batch': ('POST', lambda f, t, r: ('/api/events/batch', {}, [odometer_event(r.choice(f.in_use[t]), r) for _ in range(50)])),
+    'DELETE /api/events/<id>': ('DELETE', lambda f, t, r: (f"/api/events/{_consume(f, 'events', t, 'missing')}", {}, None)),
+    'POST /api/swap-tires': ('POST', lambda f, t, r: ('/api/swap-tires', {}, dict(zip(('tire1Id', 'tire2Id'), r.sample(f.in_use[t], 2))))),
+    'POST /api/tires/rebuild-state': ('POST', lambda f, t, r: ('/api/tires/rebuild-state', {}, None)),
+    'POST /api/analytics/refresh': ('POST', lambda f, t, r: ('/api/analytics/refresh', {}, None)),
+    'POST /api/rotation-plans': ('POST', lambda f, t, r: ('/api/rotation-plans', {}, {'moves': rotation_cycle(r.sample(f.in_use[t], min(6, len(f.in_use[t]))))})),
+}
+
+
+def _created(fixtures, kind, tenant, record_id):
+    fixtures.created[kind][tenant].append(record_id)
+    return record_id
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+class Client:
+    """One keep-alive HTTP connection per worker thread (reopened when the server closes it)."""
+
+    def __init__(self, base_url, ops_token=None):
+        parts = urlsplit(base_url)
+        self.host, self.port, self.prefix = parts.hostname, parts.port or 80, parts.path.rstrip('/')
+        self.ops_token = ops_token
+        self.connection = None
+
+    def request(self, method, path, body=None):
+        payload = json.dumps(body).encode() if body is not None else None
+        headers = {'Content-Type': 'application/json', 'Accept-Encoding': 'gzip'} if payload else {'Accept-Encoding': 'gzip'}
+        if self.ops_token:
+            headers['X-Ops-Token'] = self.ops_token  # ops routes are ops-only off localhost
+        for attempt in (1, 2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=120)
+            try:
+                self.connection.request(method, self.prefix + path, body=payload, headers=headers)
+                response = self.connection.getresponse()
+                data = response.read()
+                if response.will_close:
+                    self.connection.close()
+                    self.connection = None
+                return response.status, len(data)
+            except (http.client.HTTPException, ConnectionError):
+                self.connection.close()
+                self.connection = None
+                if attempt == 2:
+                    raise
+
+
+def server_questions(monitor):
+    cursor = monitor.cursor()
+    try:
+        cursor.execute("SHOW GLOBAL STATUS LIKE 'Questions'")
+        return int(cursor.fetchone()[1])
+    finally:
+        cursor.close()
+
+
+def run_phase(base_url, fixtures, name, concurrency, requests, monitor, seed, ops_token=None):
+    method, build = SCENARIOS[name]
+    counter = itertools.count()
+    latencies, statuses, sizes = [], [], []
+    lock = threading.Lock()
+
+    def worker(index):
+        rng = random.Random(f"{seed}-{name}-{concurrency}-{index}")
+        client = Client(base_url, ops_token)
+        while next(counter) < requests:
+            tenant = rng.choice(fixtures.tenants)
+            path, query, body = build(fixtures, tenant, rng)
+            url = f"{path}?{urlencode(dict(query, cliente_id=tenant))}"
+            started = time.perf_counter()
+            try:
+                status, size = client.request(method, url, body)
+            except Exception:
+                status, size = 0, 0
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                latencies.append(elapsed)
+                statuses.append(status)
+                sizes.append(size)
+
+    questions_before = server_questions(monitor) if monitor else None
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+    queries = None
+    if monitor:
+        queries = server_questions(monitor) - questions_before - 1  # minus the probe itself
+
+    latencies.sort()
+    errors = sum(1 for status in statuses if not 200 <= status < 400)
+    return {
+        'route': name,
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / wall, 2) if wall else None,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.50), 2),
+            'p95': round(percentile(latencies, 0.95), 2),
+            'p99': round(percentile(latencies, 0.99), 2),
+            'max': round(latencies[-1], 2),
+            'mean': round(sum(latencies) / len(latencies), 2),
+        },
+        'queries_per_request': round(queries / len(latencies), 2) if queries is not None else None,
+        'response_bytes_mean': round(sum(sizes) / len(sizes)),
+    }
+
+
+def start_server(args):
+    command = [sys.executable, '-m', 'bench.serve', '--host', args.host, '--port', str(args.port), '--user', args.user,
+               '--password', args.password, '--database', args.database, '--listen-port', str(args.listen_port),
+               '--server', args.server, '--workers', str(args.workers)]
+    if args.no_cache:
+        command.append('--no-cache')
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.Popen(command, cwd=root, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{args.listen_port}"
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit("O servidor de benchmark encerrou ao iniciar (python -m bench.serve)")
+        try:
+            if Client(base_url).request('GET', '/api/db/pool')[0] in (200, 403):  # 403: up, ops-only
+                return process, base_url
+        except OSError:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise SystemExit("O servidor de benchmark não respondeu a tempo")
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def compare(results, baseline, tolerance):
+    """Returns the (route, concurrency) whose p95 grew more than `tolerance` over the baseline."""
+    previous = {(r['route'], r['concurrency']): r for r in baseline['results']}
+    regressions = []
+    for result in results:
+        before = previous.get((result['route'], result['concurrency']))
+        if before and result['latency_ms']['p95'] > before['latency_ms']['p95'] * (1 + tolerance):
+            regressions.append({'route': result['route'], 'concurrency': result['concurrency'],
+                                'p95_before': before['latency_ms']['p95'], 'p95_after': result['latency_ms']['p95']})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_connection_arguments(parser)
+    parser.add_argument('--url', help="API já em execução (ex.: http://127.0.0.1:7766); sem isso inicia bench.serve")
+    parser.add_argument('--listen-port', type=int, default=7799)
+    parser.add_argument('--server', choices=('werkzeug', 'gunicorn'), default='werkzeug')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--tenants', type=int, default=3, help="quantos clientes semeados usar")
+    parser.add_argument('--concurrency', default='1,8,32')
+    parser.add_argument('--requests', type=int, default=200, help="requisições por rota e nível de concorrência")
+    parser.add_argument('--routes', help="subconjunto de rotas, separadas por vírgula (nomes como em SCENARIOS)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--ops-token', default=load_ops_config()['token'],
+                        help="X-Ops-Token das rotas de operação (padrão: OPS_CONFIG do config.py)")
+    parser.add_argument('--output', help="arquivo JSON de resultados (padrão: stdout)")
+    parser.add_argument('--baseline', help="resultados anteriores para comparar o p95")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="aumento de p95 tolerado (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    routes = [name.strip() for name in args.routes.split(',')] if args.routes else list(SCENARIOS)
+    unknown = [name for name in routes if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"rotas desconhecidas: {', '.join(unknown)}")
+    levels = [int(level) for level in args.concurrency.split(',')]
+
+    monitor = mysql.connector.connect(autocommit=True, **connect_args(args))
+    fixtures = Fixtures(monitor, tenant_ids(args.tenants))
+    process = None
+    base_url = args.url
+    if base_url is None:
+        process, base_url = start_server(args)
+    results = []
+    try:
+        for name in routes:
+            for level in levels:
+                result = run_phase(base_url, fixtures, name, level, args.requests, monitor, args.seed,
+                                   args.ops_token)
+                results.append(result)
+                print(f"{name:<36} c={level:<4} p50={result['latency_ms']['p50']:>8} ms  "
+                      f"p95={result['latency_ms']['p95']:>8} ms  {result['throughput_rps']:>8} req/s  "
+                      f"q/req={result['queries_per_request']}  erros={result['errors']}", file=sys.stderr)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+        monitor.close()
+
+    report = {
+        'meta': {'commit': git_commit(), 'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'url': base_url,
+                 'server': None if args.url else args.server, 'cache': not args.no_cache, 'tenants': args.tenants,
+                 'requests_per_phase': args.requests, 'concurrency': levels},
+        'results': results,
+    }
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as handle:
+            report['regressions'] = compare(results, json.load(handle), args.tolerance)
+        status = 1 if report['regressions'] else 0
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as handle:
+            handle.write(output)
+    else:
+        print(output)
+    return status
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,203 @@
+# bench/seed.py
+"""
+Seeds a local MySQL-compatible server with synthetic fleets for the load tests.
+
+    python -m bench.seed --tenants 3 --vehicles 50 --spare-tires 20 --events-per-tire 20 --reset
+
+Every tenant gets `--vehicles` vehicles with all wheel positions filled, `--spare-tires`
+tires in stock and a history of mounting/odometer events per mounted tire. The tire
+columns are derived from the generated events with the same rules the API applies,
+and the tenant's tire_analytics rows are computed from them.
+"""
+import argparse
+import json
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+import mysql.connector
+
+from db.batch import chunked
+from db.connection import load_database_config
+from db import migrate
+from controllers.tire_state import TIRE_STATE_COLUMNS, apply_events
+from controllers.analytics_controller import refresh_tenant_analytics
+
+DEFAULT_BENCH_DATABASE = 'tire_management_bench'
+INSERT_CHUNK_SIZE = 1000
+
+AXLE_POSITIONS = {
+    'Eixo Dianteiro': ('Simples Esquerda', 'Simples Direita'),
+    'Eixo 1': ('Esquerda Externa', 'Esquerda Interna', 'Direita Interna', 'Direita Externa'),
+    'Eixo 2': ('Esquerda Externa', 'Esquerda Interna', 'Direita Interna', 'Direita Externa'),
+    'Eixo 3': ('Esquerda Externa', 'Esquerda Interna', 'Direita Interna', 'Direita Externa'),
+}
+MARCAS = (('Michelin', 'X Multi Z'), ('Pirelli', 'FR85'), ('Goodyear', 'KMAX S'), ('Bridgestone', 'R268'))
+MEDIDAS = ('295/80R22.5', '275/80R22.5', '215/75R17.5')
+
+VEHICLE_SQL = "INSERT INTO vehicles (id, placa, modelo, ano, eixos, cliente_id) VALUES (%s, %s, %s, %s, %s, %s)"
+TIRE_COLUMNS = ('id', 'numeroFogo', 'marca', 'modelo', 'tipoPneu', 'medida', 'profundidadeSulcoInicial',
+                'custoAquisicao', 'dataAquisicao', 'fornecedor', 'numeroNF', 'statusInicial', 'numeroRecapagens',
+                'quilometragemTotalPercorrida', 'ultimaLeituraHodometroRegistrada', 'profundidadeSulcoAtual',
+                'currentVehicleId', 'currentVehiclePlaca', 'currentAxle', 'currentPosition', 'cliente_id')
+TIRE_SQL = f"INSERT INTO tires ({', '.join(TIRE_COLUMNS)}) VALUES ({', '.join(['%s'] * len(TIRE_COLUMNS))})"
+BASE_COLUMNS = ('tireId', 'cliente_id') + TIRE_STATE_COLUMNS
+BASE_SQL = (f"INSERT INTO tire_projection_bases ({', '.join(BASE_COLUMNS)}) "
+            f"VALUES ({', '.join(['%s'] * len(BASE_COLUMNS))})")
+EVENT_SQL = ("INSERT INTO tire_events (id, tireId, tipo, data, observacoes, detalhes, cliente_id) "
+             "VALUES (%s, %s, %s, %s, %s, %s, %s)")
+
+
+def add_connection_arguments(parser):
+    """MySQL server flags shared by the bench scripts (defaults come from config.py)."""
+    config = load_database_config()
+    parser.add_argument('--host', default=config['host'])
+    parser.add_argument('--port', type=int, default=config['port'])
+    parser.add_argument('--user', default=config['user'])
+    parser.add_argument('--password', default=config['password'])
+    parser.add_argument('--database', default=DEFAULT_BENCH_DATABASE)
+
+
+def connect_args(args, database=True):
+    connect = {'host': args.host, 'port': args.port, 'user': args.user, 'password': args.password}
+    if database:
+        connect['database'] = args.database
+    return connect
+
+
+def tenant_ids(count):
+    return [f"bench_tenant_{index:03d}" for index in range(count)]
+
+
+def new_tire(rng, tire_id, numero, cliente_id, acquired):
+    marca, modelo = rng.choice(MARCAS)
+    return {
+        'id': tire_id, 'numeroFogo': numero, 'marca': marca, 'modelo': modelo, 'tipoPneu': 'Radial',
+        'medida': rng.choice(MEDIDAS), 'profundidadeSulcoInicial': Decimal('16.00'),
+        'custoAquisicao': Decimal(f"{rng.uniform(1500, 3200):.2f}"), 'dataAquisicao': acquired,
+        'fornecedor': 'Fornecedor Bench', 'numeroNF': f"NF{rng.randint(1, 999999):06d}",
+        'statusInicial': 'Em Estoque - Novo', 'numeroRecapagens': 0, 'quilometragemTotalPercorrida': 0,
+        'ultimaLeituraHodometroRegistrada': 0, 'profundidadeSulcoAtual': Decimal('16.00'),
+        'currentVehicleId': None, 'currentVehiclePlaca': None, 'currentAxle': None, 'currentPosition': None,
+        'cliente_id': cliente_id,
+    }
+
+
+def generate_tenant(rng, cliente_id, vehicles, spare_tires, events_per_tire, start=date(2023, 1, 1)):
+    """
+    Returns (vehicle rows, tire rows, projection base rows, event rows) for one tenant.
+    Mounted tires get their pre-event state as base, so a rebuild replays their whole history.
+    """
+    vehicle_rows, tire_rows, base_rows, event_rows = [], [], [], []
+    axles = list(AXLE_POSITIONS)[:3]
+    tire_index = 0
+    for v in range(vehicles):
+        vehicle_id = f"{cliente_id}_veh_{v:05d}"
+        placa = f"B{v // 1000 % 26 + 65:c}{v % 1000:03d}{rng.randint(0, 9)}"
+        vehicle_rows.append((vehicle_id, placa, rng.choice(('Scania R450', 'Volvo FH 540', 'MB Actros')),
+                             rng.randint(2015, 2024), len(axles), cliente_id))
+        odometer = rng.randint(10000, 400000)
+        for axle in axles:
+            for position in AXLE_POSITIONS[axle]:
+                tire_id = f"{cliente_id}_tire_{tire_index:07d}"
+                tire = new_tire(rng, tire_id, f"F{tire_index:07d}", cliente_id, start)
+                tire['ultimaLeituraHodometroRegistrada'] = odometer  # reading taken when mounted
+                events = [{'tipo': 'Montagem em Veículo', 'data': start, 'detalhes': {
+                    'veiculoId': vehicle_id, 'veiculoPlaca': placa, 'eixo': axle, 'posicao': position}}]
+                km, depth = odometer, 16.0
+                for e in range(1, events_per_tire):
+                    km += rng.randint(2000, 8000)
+                    depth = max(1.0, depth - rng.uniform(0.2, 0.9))
+                    events.append({'tipo': 'Registro de Quilometragem e Sulco', 'data': start + timedelta(days=7 * e),
+                                   'detalhes': {'quilometragemVeiculo': km, 'profundidadeSulcoAtual': round(depth, 2)}})
+                base_rows.append((tire_id, cliente_id) + tuple(tire[column] for column in TIRE_STATE_COLUMNS))
+                tire, _ = apply_events(tire, events)
+                tire_rows.append(tuple(tire[column] for column in TIRE_COLUMNS))
+                for e, event in enumerate(events):
+                    event_rows.append((f"{tire_id}_evt_{e:04d}", tire_id, event['tipo'], event['data'], None,
+                                       json.dumps(event['detalhes']), cliente_id))
+                tire_index += 1
+    for _ in range(spare_tires):
+        tire_id = f"{cliente_id}_tire_{tire_index:07d}"
+        tire = new_tire(rng, tire_id, f"F{tire_index:07d}", cliente_id, start + timedelta(days=rng.randint(0, 600)))
+        tire_rows.append(tuple(tire[column] for column in TIRE_COLUMNS))
+        tire_index += 1
+    return vehicle_rows, tire_rows, base_rows, event_rows
+
+
+def insert_rows(connection, sql, rows):
+    cursor = connection.cursor()
+    try:
+        for chunk in chunked(rows, INSERT_CHUNK_SIZE):
+            cursor.executemany(sql, chunk)
+        connection.commit()
+    finally:
+        cursor.close()
+
+
+def prepare_database(args, reset=False):
+    """Creates (or recreates) the benchmark database and applies the migrations."""
+    server = mysql.connector.connect(**connect_args(args, database=False))
+    try:
+        cursor = server.cursor()
+        if reset:
+            cursor.execute(f"DROP DATABASE IF EXISTS `{args.database}`")
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{args.database}`")
+        cursor.close()
+    finally:
+        server.close()
+    connection = mysql.connector.connect(**connect_args(args))
+    migrate.run(connection, 'up', out=lambda line: None)
+    return connection
+
+
+def seed(connection, tenants, vehicles, spare_tires, events_per_tire, seed_value=42, out=print):
+    """Inserts the synthetic tenants. Returns a summary of what was created."""
+    rng = random.Random(seed_value)
+    summary = {'tenants': tenants, 'vehicles': 0, 'tires': 0, 'events': 0}
+    started = time.perf_counter()
+    for cliente_id in tenant_ids(tenants):
+        vehicle_rows, tire_rows, base_rows, event_rows = generate_tenant(rng, cliente_id, vehicles, spare_tires,
+                                                                         events_per_tire)
+        insert_rows(connection, VEHICLE_SQL, vehicle_rows)
+        insert_rows(connection, TIRE_SQL, tire_rows)
+        insert_rows(connection, BASE_SQL, base_rows)
+        insert_rows(connection, EVENT_SQL, event_rows)
+        # The analytics rows are what /api/analytics/* reads; the API keeps them up to date on writes
+        cursor = connection.cursor()
+        try:
+            refresh_tenant_analytics(cursor, cliente_id)
+            connection.commit()
+        finally:
+            cursor.close()
+        summary['vehicles'] += len(vehicle_rows)
+        summary['tires'] += len(tire_rows)
+        summary['events'] += len(event_rows)
+        out(f"{cliente_id}: {len(vehicle_rows)} veículos, {len(tire_rows)} pneus, {len(event_rows)} eventos")
+    summary['seconds'] = round(time.perf_counter() - started, 2)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_connection_arguments(parser)
+    parser.add_argument('--tenants', type=int, default=3)
+    parser.add_argument('--vehicles', type=int, default=50, help="veículos por cliente")
+    parser.add_argument('--spare-tires', type=int, default=20, help="pneus em estoque por cliente")
+    parser.add_argument('--events-per-tire', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--reset', action='store_true', help="apaga e recria o banco de benchmark")
+    args = parser.parse_args(argv)
+
+    connection = prepare_database(args, reset=args.reset)
+    try:
+        summary = seed(connection, args.tenants, args.vehicles, args.spare_tires, args.events_per_tire, args.seed)
+    finally:
+        connection.close()
+    print(json.dumps(summary))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
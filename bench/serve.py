@@ -0,0 +1,63 @@
+# bench/serve.py
+"""
+Serves app.py against the benchmark database (started by bench.load unless --url is given).
+
+    python -m bench.serve --listen-port 7799 [--server gunicorn --workers 4] [--no-cache]
+"""
+import argparse
+
+import db.connection
+from bench.seed import add_connection_arguments
+
+
+def point_app_at(args):
+    """Makes the app's pool connect to the benchmark database instead of config.py's."""
+    config = db.connection.load_database_config()
+    config.update({'host': args.host, 'port': args.port, 'user': args.user,
+                   'password': args.password, 'database': args.database, 'pool_size': args.pool_size})
+    db.connection.load_database_config = lambda: dict(config)
+    db.connection._pool = None
+
+
+def run_gunicorn(app, args):
+    from gunicorn.app.base import BaseApplication
+
+    class BenchApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f"127.0.0.1:{args.listen_port}")
+            self.cfg.set('workers', args.workers)
+            self.cfg.set('threads', args.threads)
+            self.cfg.set('accesslog', None)
+
+        def load(self):
+            return app
+
+    BenchApplication().run()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_connection_arguments(parser)
+    parser.add_argument('--listen-port', type=int, default=7799, help="porta HTTP (--port é a do MySQL)")
+    parser.add_argument('--server', choices=('werkzeug', 'gunicorn'), default='werkzeug')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--pool-size', type=int, default=10)
+    parser.add_argument('--no-cache', action='store_true', help="desativa o cache de leitura por cliente")
+    args = parser.parse_args(argv)
+
+    point_app_at(args)
+    from app import app
+    if args.no_cache:
+        from db.cache import tenant_cache
+        tenant_cache.enabled = False
+    if args.server == 'gunicorn':
+        run_gunicorn(app, args)
+    else:
+        from werkzeug.serving import run_simple
+        run_simple('127.0.0.1', args.listen_port, app, threaded=True)
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -7,7 +7,64 @@ DATABASE_CONFIG = {
     'user': 'root',
     'password': 'sua_senha_aqui',
     'database': 'tire_management_db',
-    'port': 3306
+    'port': 3306,
+    # Pool de conexões (uma conexão por requisição, compartilhada pelos controllers)
+    'pool_size': 10,                   # Conexões por processo (worker do Gunicorn)
+    'pool_timeout': 30,                # Segundos aguardando uma conexão livre
+    'pool_recycle': 1800,              # Recria conexões mais antigas que isso (segundos)
+    'pool_health_check_interval': 30,  # Faz ping em conexões ociosas há mais que isso
+    'pool_statement_cache_size': 64,   # Prepared statements mantidos por conexão (limite do servidor:
+                                       # max_prepared_stmt_count, somando todas as conexões)
+    'async_pool_size': 20,             # Conexões do pool aiomysql no modo ASGI (asgi.py)
+    # Réplicas de leitura: listas, relatórios, busca e exportação leem delas; escritas ficam no primário.
+    # Cada entrada herda usuário/senha/banco do primário e pode sobrescrever host, port e pool_size.
+    'replicas': [
+        # {'name': 'replica-1', 'host': '10.0.0.11', 'port': 3306},
+    ],
+    'replica_max_lag': 5,              # Réplica com atraso (Seconds_Behind_Source) maior que isso não recebe leituras
+    'replica_check_interval': 5,       # Segundos entre as verificações de saúde e atraso
+    'replica_sticky_seconds': 10       # Após uma escrita, o cliente lê do primário por esse tempo (lê o que escreveu)
+}
+
+# Cache de leitura por cliente (listas, KPIs e carga inicial)
+CACHE_CONFIG = {
+    'enabled': True,
+    'max_bytes': 64 * 1024 * 1024,     # Orçamento de memória por processo; acima disso remove os menos usados (LRU)
+    'default_ttl': 60,                 # Segundos até uma entrada expirar
+    'backend': 'local',                # 'redis' propaga invalidações entre os workers do Gunicorn
+    'redis_url': 'redis://localhost:6379/0',
+    'redis_channel': 'gestao_pneus:cache_invalidation'
+}
+
+# Serialização JSON e compressão das respostas
+RESPONSE_CONFIG = {
+    'json_serializer': 'orjson',       # 'orjson' (rápido) ou 'std' (encoder padrão do Flask)
+    'date_format': 'http',             # 'http' mantém o formato atual das datas; 'iso' usa AAAA-MM-DD
+    'compression_min_size': 1024,      # Comprime (gzip/brotli) respostas a partir deste tamanho em bytes
+    'gzip_level': 6,
+    'brotli_quality': 4
+}
+
+# Log de consultas lentas (GET /api/db/slow-queries)
+SLOW_QUERY_CONFIG = {
+    'enabled': True,
+    'threshold_ms': 200,               # Registra comandos SQL mais lentos que isto
+    'explain': True,                   # Captura o EXPLAIN de cada SELECT lento (uma vez por formato de consulta)
+    'explain_queue_size': 20,          # EXPLAINs pendentes (um único worker, conexão própria); excedentes são descartados
+    'max_fingerprints': 500,           # Formatos de consulta mantidos no relatório
+    'log': True                        # Também imprime cada consulta lenta no log
+}
+
+# Métricas Prometheus (GET /metrics)
+METRICS_CONFIG = {
+    'enabled': True,
+    'per_tenant': False                # Latência por cliente_id: uma série por cliente, ligue só com poucos clientes
+}
+
+# Acesso aos endpoints de operação (/metrics, /api/db/slow-queries, reconstruções)
+OPS_CONFIG = {
+    'token': 'troque_este_token',      # Enviado no cabeçalho X-Ops-Token (ou Authorization: Bearer)
+    'allow_localhost': True            # Aceita 127.0.0.1/::1 sem token; desligue atrás de um proxy reverso
 }
 
 # Configurações da Aplicação Flask
@@ -0,0 +1,236 @@
+# controllers/analytics_controller.py
+from db.connection import get_db_connection
+from db.cache import tenant_cache, invalidate_tenant
+from db.batch import chunked
+from controllers.kpi_controller import adjust_kpi_counters, rebuild_kpi_counters
+from flask import jsonify
+import mysql.connector
+
+ANALYTICS_CHUNK_SIZE = 500
+
+# rollup dimension -> tire_analytics column (each one has a (cliente_id, column) index)
+ROLLUP_DIMENSIONS = {
+    'marca': 'marca',
+    'modelo': 'modelo',
+    'medida': 'medida',
+    'fornecedor': 'fornecedor',
+    'vehicle': 'currentVehicleId',
+}
+TIRE_ANALYTICS_SORTABLE = ('cpk', 'desgastePor1000Km', 'quilometragem', 'custoTotal', 'custoRecapagens',
+                           'numeroRecapagens', 'desgasteMm')
+TIRE_ANALYTICS_MAX_LIMIT = 500
+ANALYTICS_COLUMNS = ('tireId', 'marca', 'modelo', 'medida', 'fornecedor', 'currentVehicleId', 'statusInicial',
+                     'quilometragem', 'numeroRecapagens', 'custoAquisicao', 'custoRecapagens', 'custoTotal',
+                     'sulcoInicial', 'sulcoAtual', 'desgasteMm', 'desgastePor1000Km', 'cpk', 'updatedAt')
+
+def _json_decimal(path_sql, precision):
+    """CAST of a 'detalhes' JSON value to DECIMAL; missing, null or empty values become NULL."""
+    return f"CAST(NULLIF(NULLIF(JSON_UNQUOTE(JSON_EXTRACT(e.detalhes, {path_sql})), 'null'), '') AS DECIMAL({precision}))"
+
+def analytics_refresh_sql(count=None):
+    """
+    INSERT ... SELECT ... ON DUPLICATE KEY UPDATE that recomputes the analytics rows of
+    `count` tires of a tenant (all of them when count is None). Parameters come from
+    analytics_refresh_values. Tread lost sums the drops between consecutive readings in
+    (data, timestamp, seq) order, starting from profundidadeSulcoInicial. The update reads
+    the derived table's columns (`new.col`) instead of the deprecated VALUES(col).
+    """
+    ids = f" AND {{alias}}.id IN ({', '.join(['%s'] * count)})" if count else ""
+    event_ids = ids.replace('{alias}.id', '{alias}.tireId')
+    depth = _json_decimal("IF(e.tipo = 'Retorno da Recapagem', '$.novaProfundidadeSulco', '$.profundidadeSulcoAtual')", '5,2')
+    return f"""
+    INSERT INTO tire_analytics (tireId, cliente_id, marca, modelo, medida, fornecedor, currentVehicleId,
+                                statusInicial, quilometragem, numeroRecapagens, custoAquisicao,
+                                custoRecapagens, sulcoInicial, sulcoAtual, desgasteMm)
+    SELECT * FROM (
+    SELECT t.id AS tireId, t.cliente_id, t.marca, t.modelo, t.medida, t.fornecedor, t.currentVehicleId,
+           t.statusInicial, COALESCE(t.quilometragemTotalPercorrida, 0) AS quilometragem,
+           COALESCE(t.numeroRecapagens, 0) AS numeroRecapagens, COALESCE(t.custoAquisicao, 0) AS custoAquisicao,
+           COALESCE(c.custoRecapagens, 0) AS custoRecapagens, t.profundidadeSulcoInicial AS sulcoInicial,
+           t.profundidadeSulcoAtual AS sulcoAtual, COALESCE(w.desgasteMm, 0) AS desgasteMm
+    FROM tires t
+    LEFT JOIN (
+        SELECT d.tireId, SUM(GREATEST(COALESCE(d.anterior, d.sulcoInicial) - d.sulco, 0)) AS desgasteMm
+        FROM (
+            SELECT s.tireId, s.sulcoInicial, s.sulco,
+                   LAG(s.sulco) OVER (PARTITION BY s.tireId ORDER BY s.data, s.timestamp, s.seq) AS anterior
+            FROM (
+                SELECT e.tireId, e.data, e.timestamp, e.seq, ti.profundidadeSulcoInicial AS sulcoInicial,
+                       {depth} AS sulco
+                FROM tire_events e JOIN tires ti ON ti.id = e.tireId
+                WHERE e.cliente_id = %s{event_ids.format(alias='e')}
+                  AND e.tipo IN ('Registro de Quilometragem e Sulco', 'Retorno da Recapagem')
+            ) s
+            WHERE s.sulco IS NOT NULL
+        ) d
+        GROUP BY d.tireId
+    ) w ON w.tireId = t.id
+    LEFT JOIN (
+        SELECT e.tireId, SUM({_json_decimal("'$.custoRecapagem'", '12,2')}) AS custoRecapagens
+        FROM tire_events e
+        WHERE e.cliente_id = %s{event_ids.format(alias='e')} AND e.tipo = 'Retorno da Recapagem'
+        GROUP BY e.tireId
+    ) c ON c.tireId = t.id
+    WHERE t.cliente_id = %s{ids.format(alias='t')}
+    ) AS new
+    ON DUPLICATE KEY UPDATE
+        marca = new.marca, modelo = new.modelo, medida = new.medida, fornecedor = new.fornecedor,
+        currentVehicleId = new.currentVehicleId, statusInicial = new.statusInicial,
+        quilometragem = new.quilometragem, numeroRecapagens = new.numeroRecapagens,
+        custoAquisicao = new.custoAquisicao, custoRecapagens = new.custoRecapagens,
+        sulcoInicial = new.sulcoInicial, sulcoAtual = new.sulcoAtual, desgasteMm = new.desgasteMm
+    """
+
+def analytics_refresh_values(cliente_id, tire_ids=()):
+    tire_ids = list(tire_ids)
+    return [cliente_id, *tire_ids] * 3
+
+def refresh_tire_analytics(cursor, cliente_id, tire_ids):
+    """
+    Recomputes the analytics rows of the given tires, and moves their share of the
+    tenant's KPI counters from the old rows to the new ones, inside the caller's
+    transaction. Call it after the tires (or their events) were written; the caller
+    commits and invalidates the tenant's 'tires' cache entries.
+    """
+    tire_ids = list(dict.fromkeys(tire_ids))
+    for ids in chunked(tire_ids, ANALYTICS_CHUNK_SIZE):
+        adjust_kpi_counters(cursor, cliente_id, ids, -1)
+        cursor.execute(analytics_refresh_sql(len(ids)), analytics_refresh_values(cliente_id, ids))
+        adjust_kpi_counters(cursor, cliente_id, ids, 1)
+
+def refresh_tenant_analytics(cursor, cliente_id):
+    """Recomputes every analytics row of a tenant in one statement, then its KPI counters."""
+    cursor.execute(analytics_refresh_sql(), analytics_refresh_values(cliente_id))
+    rebuild_kpi_counters(cursor, cliente_id)
+
+def _number(value, digits):
+    return round(float(value), digits) if value is not None else None
+
+def rollup_query(cliente_id, dimension):
+    """Returns (sql, values) aggregating a tenant's analytics rows by `dimension`."""
+    column = ROLLUP_DIMENSIONS[dimension]
+    label = "v.placa" if dimension == 'vehicle' else "NULL"
+    join = "LEFT JOIN vehicles v ON v.id = a.currentVehicleId" if dimension == 'vehicle' else ""
+    sql = f"""
+        SELECT a.{column} AS chave, {label} AS placa, COUNT(*) AS pneus,
+               SUM(a.quilometragem) AS quilometragem, SUM(a.numeroRecapagens) AS recapagens,
+               SUM(a.custoAquisicao) AS custoAquisicao, SUM(a.custoRecapagens) AS custoRecapagens,
+               SUM(a.custoTotal) AS custoTotal, SUM(a.desgasteMm) AS desgasteMm
+        FROM tire_analytics a {join}
+        WHERE a.cliente_id = %s
+        GROUP BY a.{column}{', v.placa' if dimension == 'vehicle' else ''}
+        ORDER BY a.{column}
+    """
+    return sql, (cliente_id,)
+
+def summarize_rollup(rows, dimension):
+    """Adds the ratio metrics (CPK, mm/1000 km) computed from the group sums."""
+    groups = []
+    for row in rows:
+        km = float(row['quilometragem'] or 0)
+        custo_total = float(row['custoTotal'] or 0)
+        group = {
+            dimension: row['chave'],
+            "pneus": int(row['pneus']),
+            "quilometragem": _number(row['quilometragem'], 2),
+            "recapagens": int(row['recapagens'] or 0),
+            "custoAquisicao": _number(row['custoAquisicao'], 2),
+            "custoRecapagens": _number(row['custoRecapagens'], 2),
+            "custoTotal": round(custo_total, 2),
+            "desgasteMm": _number(row['desgasteMm'], 2),
+            "cpk": round(custo_total / km, 6) if km else None,
+            "desgastePor1000Km": round(float(row['desgasteMm'] or 0) * 1000 / km, 4) if km else None,
+        }
+        if dimension == 'vehicle':
+            group["placa"] = row['placa']
+        groups.append(group)
+    return groups
+
+def get_analytics_rollup(cliente_id, dimension):
+    """Cost and wear totals per marca, modelo, medida, fornecedor or vehicle (cached until the next write)."""
+    if dimension not in ROLLUP_DIMENSIONS:
+        return jsonify({"message": f"Parâmetro 'by' inválido. Use: {', '.join(ROLLUP_DIMENSIONS)}."}), 400
+    groups = tenant_cache.get(cliente_id, 'analytics', dimension)
+    if groups is not None:
+        return jsonify(groups), 200
+    connection = get_db_connection(readonly=True)
+    if connection is None:
+        return jsonify({"message": "Erro de conexão com o banco de dados"}), 500
+    generation = tenant_cache.generation(cliente_id)
+    cursor = None
+    try:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute(*rollup_query(cliente_id, dimension))
+        groups = summarize_rollup(cursor.fetchall(), dimension)
+        tenant_cache.set(cliente_id, 'analytics', dimension, groups, depends_on=('tires', 'events', 'vehicles'),
+                         generation=generation)
+        return jsonify(groups), 200
+    except Exception as e:
+        print(f"Erro ao calcular análise de pneus: {e}")
+        return jsonify({"message": "Erro ao calcular análise de pneus."}), 500
+    finally:
+        if cursor is not None:
+            cursor.close()
+
+def get_tire_analytics(cliente_id, args=None):
+    """
+    Per-tire analytics rows, ordered by `sort` (default cpk, desc) and limited to `limit`
+    rows; `tireId` returns a single tire. Tires without km sort last.
+    """
+    args = args or {}
+    sort = args.get('sort', 'cpk')
+    order = args.get('order', 'desc').lower()
+    try:
+        limit = int(args.get('limit', 100))
+    except ValueError:
+        limit = 0
+    if sort not in TIRE_ANALYTICS_SORTABLE or order not in ('asc', 'desc') or not 1 <= limit <= TIRE_ANALYTICS_MAX_LIMIT:
+        return jsonify({"message": f"Use sort entre {', '.join(TIRE_ANALYTICS_SORTABLE)}, order asc/desc e "
+                                   f"limit entre 1 e {TIRE_ANALYTICS_MAX_LIMIT}."}), 400
+    where = "cliente_id = %s"
+    values = [cliente_id]
+    if args.get('tireId'):
+        where += " AND tireId = %s"
+        values.append(args['tireId'])
+    connection = get_db_connection(readonly=True)
+    if connection is None:
+        return jsonify({"message": "Erro de conexão com o banco de dados"}), 500
+    cursor = None
+    try:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute(
+            f"SELECT {', '.join(ANALYTICS_COLUMNS)} FROM tire_analytics WHERE {where} "
+            f"ORDER BY {sort} IS NULL, {sort} {order.upper()}, tireId LIMIT %s",
+            [*values, limit]
+        )
+        return jsonify(cursor.fetchall()), 200
+    except Exception as e:
+        print(f"Erro ao buscar análise de pneus: {e}")
+        return jsonify({"message": "Erro ao buscar análise de pneus."}), 500
+    finally:
+        if cursor is not None:
+            cursor.close()
+
+def rebuild_tire_analytics(cliente_id):
+    """Recomputes every analytics row of a client (e.g. after importing history)."""
+    connection = get_db_connection()
+    if connection is None:
+        return jsonify({"message": "Erro de conexão com o banco de dados"}), 500
+    cursor = None
+    try:
+        cursor = connection.cursor()
+        refresh_tenant_analytics(cursor, cliente_id)
+        connection.commit()
+        invalidate_tenant(cliente_id, 'tires')
+        return jsonify({"message": "Análise de pneus recalculada."}), 200
+    except mysql.connector.Error as err:
+        connection.rollback()
+        print(f"Erro MySQL ao recalcular análise de pneus: {err}")
+        return jsonify({"message": f"Erro ao recalcular análise de pneus: {err.msg}"}), 500
+    except Exception as e:
+        connection.rollback()
+        print(f"Erro geral ao recalcular análise de pneus: {e}")
+        return jsonify({"message": "Erro interno ao recalcular análise de pneus."}), 500
+    finally:
+        if cursor is not None:
+            cursor.close()
@@ -0,0 +1,216 @@
+# controllers/async_read_controller.py
+"""
+Async variants of the dashboard read paths, used by the ASGI entry point (asgi.py).
+They reuse the SQL builders and the tenant cache of the sync controllers, so both
+serving modes return the same bodies and share invalidations within a process.
+"""
+from contextlib import AsyncExitStack
+
+from quart import jsonify, Response, current_app
+
+from db.async_connection import async_db_cursor
+from db.cache import tenant_cache, cache_params
+from controllers.pagination import parse_list_params, build_list_query, build_page, build_count_query, ListParamsError
+from controllers.tire_controller import TIRE_SORTABLE, TIRE_FILTERABLE
+from controllers.vehicle_controller import (VEHICLE_SORTABLE, VEHICLE_FILTERABLE, parse_vehicle_include,
+                                            mounted_tires_query, attach_mounted_tires)
+from controllers.event_controller import (decode_event_details, EVENT_LIST_SQL, encode_stream_row, EVENT_STREAM_SQL,
+                                          EVENT_STREAM_BATCH_SIZE)
+from controllers.sync_controller import (version_etag, next_watermark, parse_watermark, changes_queries,
+                                         watermark_fallback, SYNC_WATERMARK_SQL, SYNC_WATERMARK_FALLBACK_SECONDS,
+                                         INVALID_SINCE_MESSAGE)
+from db.versions import list_versions_query, versions_from_rows
+from controllers.kpi_controller import KPI_BY_STATUS_SQL, summarize_kpis
+from controllers.bootstrap_controller import parse_bootstrap_params, snapshot_queries
+
+LIST_RESOURCES = {
+    'tires': (TIRE_SORTABLE, TIRE_FILTERABLE, "Erro ao buscar pneus."),
+    'vehicles': (VEHICLE_SORTABLE, VEHICLE_FILTERABLE, "Erro ao buscar veículos."),
+}
+
+def _body_response(body):
+    return Response(body, mimetype='application/json'), 200
+
+async def get_all(cliente_id, resource, args=None):
+    """Async get_all_tires / get_all_vehicles (filters, sort, keyset pagination, include, cache)."""
+    sortable, filterable, error_message = LIST_RESOURCES[resource]
+    try:
+        params = parse_list_params(args, sortable, filterable)
+        include = parse_vehicle_include(args) if resource == 'vehicles' else None
+    except ListParamsError as err:
+        return jsonify({"message": str(err)}), 400
+    key = cache_params(args)
+    body = tenant_cache.get(cliente_id, resource, key)
+    if body is not None:
+        return _body_response(body)
+    generation = tenant_cache.generation(cliente_id)
+    try:
+        async with async_db_cursor() as cursor:
+            await cursor.execute(*build_list_query(resource, cliente_id, params))
+            rows = list(await cursor.fetchall())
+            total = None
+            if params['total']:
+                await cursor.execute(*build_count_query(resource, cliente_id, params))
+                total = int((await cursor.fetchone())['total'])
+            payload = build_page(rows, params, total) if params['paginate'] else rows
+            listed = payload['items'] if params['paginate'] else rows
+            if include and listed:
+                ids = [row['id'] for row in listed] if params['paginate'] else None
+                await cursor.execute(*mounted_tires_query(cliente_id, include, ids))
+                attach_mounted_tires(listed, await cursor.fetchall(), include)
+    except Exception as e:
+        print(f"{error_message.rstrip('.')}: {e}")
+        return jsonify({"message": error_message}), 500
+    body = current_app.json.dumps(payload)
+    depends_on = (resource, 'tires') if include else (resource,)
+    tenant_cache.set(cliente_id, resource, key, body, depends_on=depends_on, generation=generation)
+    return _body_response(body)
+
+async def get_all_events(cliente_id):
+    """Async get_all_events."""
+    body = tenant_cache.get(cliente_id, 'events')
+    if body is not None:
+        return _body_response(body)
+    generation = tenant_cache.generation(cliente_id)
+    try:
+        async with async_db_cursor() as cursor:
+            await cursor.execute(EVENT_LIST_SQL, (cliente_id,))
+            events = decode_event_details(list(await cursor.fetchall()))
+    except Exception as e:
+        print(f"Erro ao buscar eventos: {e}")
+        return jsonify({"message": "Erro ao buscar eventos."}), 500
+    body = current_app.json.dumps(events)
+    tenant_cache.set(cliente_id, 'events', (), body, depends_on=('events',), generation=generation)
+    return _body_response(body)
+
+async def stream_all_events(cliente_id):
+    """Async stream_all_events: batches from a server-side cursor, written as they arrive."""
+    stack = AsyncExitStack()
+    try:
+        cursor = await stack.enter_async_context(async_db_cursor(dictionary=False, unbuffered=True))
+        await cursor.execute(EVENT_STREAM_SQL, (cliente_id,))
+    except Exception as e:
+        await stack.aclose()
+        print(f"Erro ao buscar eventos: {e}")
+        return jsonify({"message": "Erro ao buscar eventos."}), 500
+
+    dumps = current_app.json.dumps
+    async def generate():
+        try:
+            yield '['
+            separator = ''
+            while True:
+                rows = await cursor.fetchmany(EVENT_STREAM_BATCH_SIZE)
+                if not rows:
+                    break
+                yield separator + ','.join(encode_stream_row(dumps, row) for row in rows)
+                separator = ','
+            yield ']'
+        except Exception as e:
+            # Headers and a 200 are already sent: re-raise so the server aborts the
+            # response instead of ending it, and the client sees an incomplete body
+            # (no closing ']', no final chunk) rather than a short but valid array
+            print(f"Erro ao transmitir eventos: {e}")
+            raise
+        finally:
+            await stack.aclose()
+
+    return Response(generate(), mimetype='application/json'), 200
+
+async def get_changes(cliente_id, resource, since):
+    """Async get_changes (?since= delta with tombstones)."""
+    since_at = parse_watermark(since)
+    if since_at is None:
+        return jsonify({"message": INVALID_SINCE_MESSAGE}), 400
+    (items_sql, items_values), (deleted_sql, deleted_values) = changes_queries(cliente_id, resource, since_at)
+    try:
+        async with async_db_cursor() as cursor:
+            watermark = await read_watermark(cursor)
+            await cursor.execute(items_sql, items_values)
+            items = list(await cursor.fetchall())
+            await cursor.execute(deleted_sql, deleted_values)
+            deleted = [row['record_id'] for row in await cursor.fetchall()]
+    except Exception as e:
+        print(f"Erro ao buscar alterações: {e}")
+        return jsonify({"message": "Erro ao buscar alterações."}), 500
+    if resource == 'events':
+        decode_event_details(items)
+    return jsonify({"items": items, "deleted": deleted, "watermark": watermark}), 200
+
+async def read_watermark(cursor):
+    """Async read_watermark (the async pool only connects to the primary)."""
+    margin = 0
+    try:
+        await cursor.execute(SYNC_WATERMARK_SQL)
+    except Exception as err:
+        await cursor.execute(watermark_fallback(err))
+        margin = SYNC_WATERMARK_FALLBACK_SECONDS
+    row = await cursor.fetchone()
+    return next_watermark(row['now'] if isinstance(row, dict) else row[0], margin)
+
+async def sync_watermark():
+    """Async sync_watermark, or None."""
+    try:
+        async with async_db_cursor() as cursor:
+            return await read_watermark(cursor)
+    except Exception as e:
+        print(f"Erro ao calcular watermark: {e}")
+        return None
+
+async def list_etag(cliente_id, resource, args, also=()):
+    """Async list_etag: the ETag from the cached or stored list versions, or None."""
+    names = (resource, *also)
+    versions = tenant_cache.get(cliente_id, 'list_versions', names)
+    if versions is None:
+        generation = tenant_cache.generation(cliente_id)
+        try:
+            async with async_db_cursor(dictionary=False) as cursor:
+                await cursor.execute(*list_versions_query(cliente_id, names))
+                versions = versions_from_rows(await cursor.fetchall(), names)
+        except Exception as e:
+            print(f"Erro ao calcular versão da lista: {e}")
+            return None
+        tenant_cache.set(cliente_id, 'list_versions', names, versions, depends_on=names, generation=generation)
+    return version_etag(cliente_id, resource, args, versions)
+
+async def get_kpis(cliente_id):
+    """Async get_kpis."""
+    kpis = tenant_cache.get(cliente_id, 'kpis')
+    if kpis is not None:
+        return jsonify(kpis), 200
+    generation = tenant_cache.generation(cliente_id)
+    try:
+        async with async_db_cursor() as cursor:
+            await cursor.execute(KPI_BY_STATUS_SQL, (cliente_id,))
+            kpis = summarize_kpis(await cursor.fetchall())
+    except Exception as e:
+        print(f"Erro ao calcular KPIs: {e}")
+        return jsonify({"message": "Erro ao calcular KPIs."}), 500
+    tenant_cache.set(cliente_id, 'kpis', (), kpis, depends_on=('tires', 'events'), generation=generation)
+    return jsonify(kpis), 200
+
+async def get_bootstrap(cliente_id, args=None):
+    """Async get_bootstrap (one snapshot of tires, vehicles and events)."""
+    try:
+        include, columns = parse_bootstrap_params(args)
+    except ValueError as err:
+        return jsonify({"message": str(err)}), 400
+    key = (include, tuple(sorted(columns.items())))
+    body = tenant_cache.get(cliente_id, 'bootstrap', key)
+    if body is not None:
+        return _body_response(body)
+    generation = tenant_cache.generation(cliente_id)
+    try:
+        async with async_db_cursor() as cursor:
+            snapshot = {"watermark": await read_watermark(cursor)}
+            for resource, sql, values in snapshot_queries(cliente_id, include, columns):
+                await cursor.execute(sql, values)
+                snapshot[resource] = list(await cursor.fetchall())
+    except Exception as e:
+        print(f"Erro ao carregar dados iniciais: {e}")
+        return jsonify({"message": "Erro ao carregar dados iniciais."}), 500
+    if 'events' in snapshot:
+        decode_event_details(snapshot['events'])
+    body = current_app.json.dumps(snapshot)
+    tenant_cache.set(cliente_id, 'bootstrap', key, body, depends_on=include, generation=generation)
+    return _body_response(body)
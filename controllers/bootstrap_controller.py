@@ -0,0 +1,92 @@
+# controllers/bootstrap_controller.py
+from db.connection import get_db_connection
+from db.cache import tenant_cache
+from controllers.event_controller import decode_event_details
+from controllers.sync_controller import read_watermark
+from flask import jsonify, Response, current_app
+
+# resource -> (table, selectable columns)
+BOOTSTRAP_RESOURCES = {
+    'tires': ('tires', (
+        'id', 'numeroFogo', 'marca', 'modelo', 'tipoPneu', 'medida', 'capacidadeCarga', 'desenhoBanda',
+        'profundidadeSulcoInicial', 'custoAquisicao', 'dataAquisicao', 'fornecedor', 'numeroNF',
+        'statusInicial', 'numeroRecapagens', 'quilometragemTotalPercorrida',
+        'ultimaLeituraHodometroRegistrada', 'profundidadeSulcoAtual', 'currentVehicleId',
+        'currentVehiclePlaca', 'currentAxle', 'currentPosition', 'cliente_id', 'createdAt', 'updatedAt',
+    )),
+    'vehicles': ('vehicles', ('id', 'placa', 'modelo', 'ano', 'eixos', 'cliente_id', 'createdAt', 'updatedAt')),
+    'events': ('tire_events', ('id', 'tireId', 'tipo', 'data', 'observacoes', 'detalhes', 'cliente_id', 'timestamp')),
+}
+
+def parse_bootstrap_params(args):
+    """
+    Parses `include` (comma-separated resources) and `fields` (comma-separated
+    `resource.column` projections). Returns (include, {resource: columns}) or raises ValueError.
+    """
+    args = args or {}
+    include = tuple(dict.fromkeys(part.strip() for part in args.get('include', 'tires,vehicles,events').split(',') if part.strip()))
+    unknown = [resource for resource in include if resource not in BOOTSTRAP_RESOURCES]
+    if unknown or not include:
+        raise ValueError(f"Parâmetro 'include' inválido. Use: {', '.join(BOOTSTRAP_RESOURCES)}.")
+
+    projections = {}
+    for item in filter(None, (part.strip() for part in args.get('fields', '').split(','))):
+        resource, _, column = item.partition('.')
+        if resource not in include or column not in BOOTSTRAP_RESOURCES[resource][1]:
+            raise ValueError(f"Campo inválido em 'fields': {item}.")
+        projections.setdefault(resource, ['id'])
+        if column not in projections[resource]:
+            projections[resource].append(column)
+
+    columns = {resource: tuple(projections.get(resource, BOOTSTRAP_RESOURCES[resource][1])) for resource in include}
+    return include, columns
+
+def snapshot_queries(cliente_id, include, columns):
+    """Yields (resource, sql, values) for each resource of the snapshot."""
+    for resource in include:
+        table = BOOTSTRAP_RESOURCES[resource][0]
+        yield resource, f"SELECT {', '.join(columns[resource])} FROM {table} WHERE cliente_id = %s", (cliente_id,)
+
+def build_snapshot(cursor, cliente_id, include, columns):
+    """
+    Reads every requested resource on the request's connection. With autocommit off
+    (REPEATABLE READ) all the SELECTs share the snapshot taken by the first one.
+    """
+    snapshot = {"watermark": read_watermark(cursor)}
+    for resource, sql, values in snapshot_queries(cliente_id, include, columns):
+        cursor.execute(sql, values)
+        rows = cursor.fetchall()
+        if resource == 'events':
+            decode_event_details(rows)
+        snapshot[resource] = rows
+    return snapshot
+
+def get_bootstrap(cliente_id, args=None):
+    """
+    Returns the tenant's dashboard working set (tires, vehicles, events) in one response.
+    The serialized snapshot is cached per (cliente_id, include, fields) until a write
+    to one of the included resources invalidates it.
+    """
+    try:
+        include, columns = parse_bootstrap_params(args)
+    except ValueError as err:
+        return jsonify({"message": str(err)}), 400
+    cache_params = (include, tuple(sorted(columns.items())))
+    body = tenant_cache.get(cliente_id, 'bootstrap', cache_params)
+    if body is None:
+        connection = get_db_connection()
+        if connection is None:
+            return jsonify({"message": "Erro de conexão com o banco de dados"}), 500
+        generation = tenant_cache.generation(cliente_id)
+        cursor = None
+        try:
+            cursor = connection.cursor(dictionary=True)
+            body = current_app.json.dumps(build_snapshot(cursor, cliente_id, include, columns))
+        except Exception as e:
+            print(f"Erro ao carregar dados iniciais: {e}")
+            return jsonify({"message": "Erro ao carregar dados iniciais."}), 500
+        finally:
+            if cursor is not None:
+                cursor.close()
+        tenant_cache.set(cliente_id, 'bootstrap', cache_params, body, depends_on=include, generation=generation)
+    return Response(body, mimetype='application/json'), 200
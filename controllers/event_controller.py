@@ -1,38 +1,180 @@
 # controllers/event_controller.py
-from db.connection import create_db_connection
-from flask import jsonify
+from db.connection import get_db_connection
+from db.cache import tenant_cache, invalidate_tenant, json_body_response
+from db.tombstones import record_tombstones
+from flask import jsonify, Response, current_app, stream_with_context
 import mysql.connector
 import json
 from datetime import datetime
+from controllers.tire_state import event_tire_updates, apply_events
+from controllers.tire_projection import lock_tire_states, is_in_order, replay_tire, rebase_from_acquisition
+from controllers.analytics_controller import refresh_tire_analytics
+from db.batch import chunked, build_case_update
+from db.statements import build_update, select_list
+from controllers.tire_controller import generate_unique_id
+from controllers.pagination import parse_list_params, build_list_query, build_page, count_total, ListParamsError
+
+EVENT_SORTABLE = ('data', 'timestamp', 'id')
+EVENT_FILTERABLE = ('tipo',)
+
+def decode_event_details(events):
+    """Parses each event's 'detalhes' from its JSON string, in place."""
+    for event in events:
+        if isinstance(event.get('detalhes'), str):
+            try:
+                event['detalhes'] = json.loads(event['detalhes'])
+            except json.JSONDecodeError:
+                event['detalhes'] = {} # Handle invalid JSON
+    return events
+
+def date_range_clauses(args, column='data'):
+    """Returns (clause, values) pairs bounding `column` by the `from`/`to` (AAAA-MM-DD) query parameters."""
+    clauses = []
+    for param, operator in (('from', '>='), ('to', '<=')):
+        value = args.get(param)
+        if value:
+            try:
+                datetime.strptime(value, "%Y-%m-%d")
+            except ValueError:
+                raise ListParamsError(f"Parâmetro '{param}' deve estar no formato AAAA-MM-DD.")
+            clauses.append((f"{column} {operator} %s", [value]))
+    return clauses
+
+def _get_scoped_events(cliente_id, args, owner_sql, owner_values, scope_clause, not_found_message):
+    """Pages through the events selected by `scope_clause` once the owner row is confirmed."""
+    try:
+        params = parse_list_params(args, EVENT_SORTABLE, EVENT_FILTERABLE,
+                                   default_sort='data', default_order='desc', always_paginate=True)
+        extra_where = [scope_clause] + date_range_clauses(args or {})
+    except ListParamsError as err:
+        return jsonify({"message": str(err)}), 400
+    connection = get_db_connection(readonly=True)
+    if connection is None:
+        return jsonify({"message": "Erro de conexão com o banco de dados"}), 500
+    cursor = None
+    try:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute(owner_sql, owner_values)
+        if cursor.fetchone() is None:
+            return jsonify({"message": not_found_message}), 404
+        sql, values = build_list_query("tire_events", cliente_id, params, extra_where=extra_where)
+        cursor.execute(sql, values)
+        rows = cursor.fetchall()
+        page = build_page(rows, params, count_total(cursor, "tire_events", cliente_id, params, extra_where))
+        decode_event_details(page['items'])
+        return jsonify(page), 200
+    except Exception as e:
+        print(f"Erro ao buscar eventos: {e}")
+        return jsonify({"message": "Erro ao buscar eventos."}), 500
+    finally:
+        if cursor is not None:
+            cursor.close()
+
+def get_tire_events(tire_id, cliente_id, args=None):
+    """
+    Fetches one page of a tire's history (newest first), optionally filtered by
+    `tipo` and a `from`/`to` date range. Served by (cliente_id, tireId, data).
+    """
+    return _get_scoped_events(
+        cliente_id, args,
+        "SELECT id FROM tires WHERE id = %s AND cliente_id = %s", (tire_id, cliente_id),
+        ("tireId = %s", [tire_id]),
+        "Pneu não encontrado ou não pertence ao cliente."
+    )
+
+def get_vehicle_events(vehicle_id, cliente_id, args=None):
+    """
+    Fetches one page of the history of the tires currently mounted on a vehicle,
+    with the same filters as get_tire_events.
+    """
+    return _get_scoped_events(
+        cliente_id, args,
+        "SELECT id FROM vehicles WHERE id = %s AND cliente_id = %s", (vehicle_id, cliente_id),
+        ("tireId IN (SELECT id FROM tires WHERE cliente_id = %s AND currentVehicleId = %s)", [cliente_id, vehicle_id]),
+        "Veículo não encontrado ou não pertence ao cliente."
+    )
+
+EVENT_LIST_SQL = f"SELECT {select_list('tire_events')} FROM tire_events WHERE cliente_id = %s"
 
 def get_all_events(cliente_id):
-    """Fetches all tire events from the database for a specific client."""
-    connection = create_db_connection()
+    """Fetches all tire events from the database for a specific client (cached until the next event write)."""
+    body = tenant_cache.get(cliente_id, 'events')
+    if body is not None:
+        return json_body_response(body)
+    connection = get_db_connection(readonly=True)
     if connection is None:
         return jsonify({"message": "Erro de conexão com o banco de dados"}), 500
+    cursor = None
     try:
+        generation = tenant_cache.generation(cliente_id)
         cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM tire_events WHERE cliente_id = %s", (cliente_id,))
-        events = cursor.fetchall()
-        # Ensure 'detalhes' field is parsed from JSON string if necessary
-        for event in events:
-            if isinstance(event.get('detalhes'), str):
-                try:
-                    event['detalhes'] = json.loads(event['detalhes'])
-                except json.JSONDecodeError:
-                    event['detalhes'] = {} # Handle invalid JSON
-        return jsonify(events), 200
+        cursor.execute(EVENT_LIST_SQL, (cliente_id,))
+        events = decode_event_details(cursor.fetchall())
+        body = current_app.json.dumps(events)
+        tenant_cache.set(cliente_id, 'events', (), body, depends_on=('events',), generation=generation)
+        return json_body_response(body)
     except Exception as e:
         print(f"Erro ao buscar eventos: {e}")
         return jsonify({"message": "Erro ao buscar eventos."}), 500
     finally:
-        if connection and connection.is_connected():
+        if cursor is not None:
+            cursor.close()
+
+EVENT_STREAM_BATCH_SIZE = 1000
+EVENT_STREAM_COLUMNS = ('id', 'tireId', 'tipo', 'data', 'observacoes', 'cliente_id', 'timestamp')
+EVENT_STREAM_SQL = f"SELECT {', '.join(EVENT_STREAM_COLUMNS)}, detalhes FROM tire_events WHERE cliente_id = %s"
+
+def encode_stream_row(dumps, row):
+    """Serializes a streamed event row, splicing in 'detalhes' (its last column) as raw JSON."""
+    detalhes = row[-1]
+    if isinstance(detalhes, (bytes, bytearray)):
+        detalhes = detalhes.decode('utf-8')
+    encoded = dumps(dict(zip(EVENT_STREAM_COLUMNS, row)))
+    return f'{encoded[:-1]},"detalhes":{detalhes if detalhes is not None else "null"}}}'
+
+def stream_all_events(cliente_id):
+    """
+    Streams all tire events of a client as a JSON array.
+    Rows are pulled from an unbuffered cursor in batches of EVENT_STREAM_BATCH_SIZE and
+    'detalhes' is spliced in as the raw JSON text stored by MySQL, so memory stays flat
+    regardless of the history length.
+    """
+    connection = get_db_connection(readonly=True)
+    if connection is None:
+        return jsonify({"message": "Erro de conexão com o banco de dados"}), 500
+    try:
+        cursor = connection.cursor()  # unbuffered: rows stay on the server until fetched
+        cursor.execute(EVENT_STREAM_SQL, (cliente_id,))
+    except Exception as e:
+        print(f"Erro ao buscar eventos: {e}")
+        return jsonify({"message": "Erro ao buscar eventos."}), 500
+
+    dumps = current_app.json.dumps
+    def generate():
+        try:
+            yield '['
+            separator = ''
+            while True:
+                rows = cursor.fetchmany(EVENT_STREAM_BATCH_SIZE)
+                if not rows:
+                    break
+                yield separator + ','.join(encode_stream_row(dumps, row) for row in rows)
+                separator = ','
+            yield ']'
+        except Exception as e:
+            # Headers and a 200 are already sent: re-raise so the server aborts the
+            # response instead of ending it, and the client sees an incomplete body
+            # (no closing ']', no final chunk) rather than a short but valid array
+            print(f"Erro ao transmitir eventos: {e}")
+            raise
+        finally:
             cursor.close()
-            connection.close()
+
+    return Response(stream_with_context(generate()), mimetype='application/json'), 200
 
 def create_event(data, cliente_id):
     """Creates a new event and updates the associated tire for a specific client."""
-    connection = create_db_connection()
+    connection = get_db_connection()
     if connection is None:
         return jsonify({"message": "Erro de conexão com o banco de dados"}), 500
     try:
@@ -40,6 +182,7 @@ def create_event(data, cliente_id):
         data['cliente_id'] = cliente_id
         create_event_internal(connection, data)
         connection.commit()
+        invalidate_tenant(cliente_id, 'events', 'tires')
         return jsonify({"message": "Evento adicionado com sucesso!", "id": data['id']}), 201
     except mysql.connector.Error as err:
         connection.rollback()
@@ -49,112 +192,207 @@ def create_event(data, cliente_id):
         connection.rollback()
         print(f"Erro geral ao cadastrar evento: {e}")
         return jsonify({"message": "Erro interno ao cadastrar evento."}), 500
-    finally:
-        if connection and connection.is_connected():
-            connection.close()
+
+EVENT_INSERT_SQL = """
+INSERT INTO tire_events (id, tireId, tipo, data, observacoes, detalhes, cliente_id, timestamp)
+VALUES (%s, %s, %s, %s, %s, %s, %s, NOW())
+"""
 
 def create_event_internal(connection, data):
     """
     Internal function to create an event and update tire.
-    Assumes an open connection is passed. Does not commit or close.
+    Assumes an open connection is passed. Does not commit or close; the caller
+    invalidates the tenant's 'events' and 'tires' cache entries after committing.
+    An event dated after the tire's other events is applied on top of the current
+    state; a back-dated one makes the tire replay its history.
     """
-    cursor = connection.cursor()
-    
+    tire_id = data['tireId']
+
+    # Lock the tire and read its state (capturing its projection base if it has none)
+    state_cursor = connection.cursor(dictionary=True)
+    current_tire = lock_tire_states(state_cursor, data.get('cliente_id'), [tire_id]).get(tire_id)
+    if not current_tire:
+        state_cursor.close()
+        raise Exception(f"Pneu com ID {tire_id} não encontrado ou não pertence ao cliente.")
+
     # Insert the event
-    sql_event = """
-    INSERT INTO tire_events (id, tireId, tipo, data, observacoes, detalhes, cliente_id, timestamp)
-    VALUES (%s, %s, %s, %s, %s, %s, %s, NOW())
-    """
     event_details_json = json.dumps(data.get('detalhes', {}))
     event_values = (
         data['id'], data['tireId'], data['tipo'], data['data'],
         data.get('observacoes'), event_details_json, data.get('cliente_id')
     )
-    cursor.execute(sql_event, event_values)
+    connection.execute_prepared(EVENT_INSERT_SQL, event_values)
 
-    # Update tire properties based on event type
-    tire_id = data['tireId']
-    tire_updates = {}
-
-    # Fetch current tire data to calculate new values (e.g., total mileage)
-    cursor.execute("SELECT * FROM tires WHERE id = %s AND cliente_id = %s", (tire_id, data.get('cliente_id')))
-    current_tire = cursor.fetchone()
-    if not current_tire:
-        raise Exception(f"Pneu com ID {tire_id} não encontrado ou não pertence ao cliente.")
+    cursor = connection.cursor()
+    if not is_in_order(data['data'], current_tire['latestEventData']):
+        replay_tire(state_cursor, data.get('cliente_id'), tire_id)
+        refresh_tire_analytics(cursor, data.get('cliente_id'), [tire_id])
+        state_cursor.close()
+        cursor.close()
+        return
+    state_cursor.close()
 
-    if data['tipo'] == 'Retorno da Recapagem':
-        tire_updates['numeroRecapagens'] = current_tire[14] + 1 # Assuming index 14 is numeroRecapagens
-        tire_updates['statusInicial'] = 'Em Estoque - Recapado'
-        tire_updates['profundidadeSulcoAtual'] = data['detalhes']['novaProfundidadeSulco']
-    elif data['tipo'] == 'Descarte (Fim de Vida)':
-        tire_updates['statusInicial'] = 'Descartado'
-        tire_updates['currentVehicleId'] = None
-        tire_updates['currentVehiclePlaca'] = None
-        tire_updates['currentAxle'] = None
-        tire_updates['currentPosition'] = None
-    elif data['tipo'] == 'Envio para Recapagem':
-        tire_updates['statusInicial'] = 'Em Recapagem'
-        tire_updates['currentVehicleId'] = None
-        tire_updates['currentVehiclePlaca'] = None
-        tire_updates['currentAxle'] = None
-        tire_updates['currentPosition'] = None
-    elif data['tipo'] in ['Montagem em Veículo', 'Rodízio/Permutação']:
-        tire_updates['statusInicial'] = 'Em Uso'
-        tire_updates['currentVehicleId'] = data['detalhes']['veiculoId']
-        tire_updates['currentVehiclePlaca'] = data['detalhes']['veiculoPlaca']
-        tire_updates['currentAxle'] = data['detalhes']['eixo']
-        tire_updates['currentPosition'] = data['detalhes']['posicao']
-    elif data['tipo'] == 'Remoção de Veículo':
-        tire_updates['statusInicial'] = 'Em Estoque - Usado'
-        tire_updates['currentVehicleId'] = None
-        tire_updates['currentVehiclePlaca'] = None
-        tire_updates['currentAxle'] = None
-        tire_updates['currentPosition'] = None
-    elif data['tipo'] == 'Registro de Quilometragem e Sulco':
-        nova_leitura_hodometro = float(data['detalhes']['quilometragemVeiculo'])
-        ultima_leitura = float(current_tire[16] or 0) # Assuming index 16 is ultimaLeituraHodometroRegistrada
-
-        if nova_leitura_hodometro > ultima_leitura:
-            km_rodados = nova_leitura_hodometro - ultima_leitura
-            tire_updates['quilometragemTotalPercorrida'] = float(current_tire[15] or 0) + km_rodados # Assuming index 15 is quilometragemTotalPercorrida
-            tire_updates['ultimaLeituraHodometroRegistrada'] = nova_leitura_hodometro
-        elif ultima_leitura == 0 and nova_leitura_hodometro > 0:
-            tire_updates['quilometragemTotalPercorrida'] = 0 # Reset for this tire's accumulated mileage
-            tire_updates['ultimaLeituraHodometroRegistrada'] = nova_leitura_hodometro
-
-        tire_updates['profundidadeSulcoAtual'] = data['detalhes']['profundidadeSulcoAtual']
+    # Update tire properties based on event type
+    tire_updates = event_tire_updates(current_tire, data)
 
     if tire_updates:
-        set_clauses = []
-        values = []
-        for key, value in tire_updates.items():
-            set_clauses.append(f"{key} = %s")
-            values.append(value)
-        set_clauses.append("updatedAt = NOW()")
-        
-        sql_tire_update = f"UPDATE tires SET {', '.join(set_clauses)} WHERE id = %s"
-        values.append(tire_id)
-        cursor.execute(sql_tire_update, values)
-    
+        sql_tire_update, values = build_update('tires', tire_updates)
+        connection.execute_prepared(sql_tire_update, [*values, tire_id, data.get('cliente_id')])
+
+    refresh_tire_analytics(cursor, data.get('cliente_id'), [tire_id])
     cursor.close()
 
 
-def delete_event(event_id, cliente_id):
-    """Deletes an event from the database for a specific client."""
-    connection = create_db_connection()
+EVENT_BATCH_MAX_SIZE = 5000
+EVENT_BATCH_CHUNK_SIZE = 500
+
+# timestamp is left to the column default so executemany() sends one multi-row INSERT
+BATCH_EVENT_INSERT_SQL = """
+INSERT INTO tire_events (id, tireId, tipo, data, observacoes, detalhes, cliente_id)
+VALUES (%s, %s, %s, %s, %s, %s, %s)
+"""
+
+def create_events_batch(events, cliente_id):
+    """
+    Creates many events (e.g. a monthly odometer/tread inspection) in one transaction.
+    Events are grouped by tire and applied in (data, submission) order on top of state
+    read with a single locking SELECT, and inserted in that same order so their seq
+    matches it on replay; tires are then written with batched UPDATEs. Tires that
+    receive events dated before their latest one are replayed instead.
+    """
+    if not isinstance(events, list) or not events:
+        return jsonify({"message": "Envie uma lista de eventos."}), 400
+    if len(events) > EVENT_BATCH_MAX_SIZE:
+        return jsonify({"message": f"Limite de {EVENT_BATCH_MAX_SIZE} eventos por lote."}), 400
+
+    by_tire = {}
+    for index, event in enumerate(events):
+        if not isinstance(event, dict) or not all(event.get(key) for key in ('tireId', 'tipo', 'data')):
+            return jsonify({"message": f"Evento {index + 1}: 'tireId', 'tipo' e 'data' são obrigatórios."}), 400
+        event.setdefault('id', generate_unique_id())
+        event['cliente_id'] = cliente_id
+        by_tire.setdefault(event['tireId'], []).append((index, event))
+
+    connection = get_db_connection()
     if connection is None:
         return jsonify({"message": "Erro de conexão com o banco de dados"}), 500
+    cursor = None
     try:
-        cursor = connection.cursor()
-        cursor.execute("DELETE FROM tire_events WHERE id = %s AND cliente_id = %s", (event_id, cliente_id))
+        cursor = connection.cursor(dictionary=True)
+        tire_ids = list(by_tire)
+        tires = lock_tire_states(cursor, cliente_id, tire_ids)
+        missing = [tire_id for tire_id in tire_ids if tire_id not in tires]
+        if missing:
+            connection.rollback()
+            return jsonify({"message": "Pneus não encontrados ou não pertencem ao cliente.", "tireIds": missing}), 404
+
+        tire_updates = {}
+        replay_ids = []
+        applied = []
+        for tire_id, indexed_events in by_tire.items():
+            # Readings with the same date keep their submission order
+            ordered = [event for _, event in sorted(indexed_events, key=lambda item: (str(item[1]['data']), item[0]))]
+            applied.extend(ordered)
+            try:
+                state, changed = apply_events(tires[tire_id], ordered)
+            except (KeyError, TypeError, ValueError) as err:
+                connection.rollback()
+                return jsonify({"message": f"Detalhes inválidos em evento do pneu {tire_id}: {err}"}), 400
+            if not is_in_order(ordered[0]['data'], tires[tire_id]['latestEventData']):
+                replay_ids.append(tire_id)  # back-dated: replayed once the events are stored
+            elif changed:
+                tire_updates[tire_id] = {column: state[column] for column in changed}
+
+        rows = [
+            (event['id'], event['tireId'], event['tipo'], event['data'], event.get('observacoes'),
+             json.dumps(event.get('detalhes', {})), cliente_id)
+            for event in applied
+        ]
+        for chunk in chunked(rows, EVENT_BATCH_CHUNK_SIZE):
+            cursor.executemany(BATCH_EVENT_INSERT_SQL, chunk)
+        update_items = list(tire_updates.items())
+        for chunk in chunked(update_items, EVENT_BATCH_CHUNK_SIZE):
+            sql, values = build_case_update("tires", dict(chunk), cliente_id)
+            cursor.execute(sql, values)
+        for tire_id in replay_ids:
+            replay_tire(cursor, cliente_id, tire_id)
+        refresh_tire_analytics(cursor, cliente_id, tire_ids)
         connection.commit()
-        if cursor.rowcount == 0:
+        invalidate_tenant(cliente_id, 'events', 'tires')
+        return jsonify({
+            "message": "Eventos adicionados com sucesso!",
+            "inserted": len(rows),
+            "tiresUpdated": len(tire_updates) + len(replay_ids),
+            "ids": [event['id'] for event in events],
+        }), 201
+    except mysql.connector.Error as err:
+        connection.rollback()
+        print(f"Erro MySQL ao cadastrar lote de eventos: {err}")
+        return jsonify({"message": f"Erro ao cadastrar eventos: {err.msg}"}), 500
+    except Exception as e:
+        connection.rollback()
+        print(f"Erro geral ao cadastrar lote de eventos: {e}")
+        return jsonify({"message": "Erro interno ao cadastrar eventos."}), 500
+    finally:
+        if cursor is not None:
+            cursor.close()
+
+# An event at or below its tire's baseEventSeq (or of a tire with no base, whose
+# hand-edited state is authoritative) is folded into the base: there is nothing
+# to replay without it until the tire is rebased on its acquisition state.
+DELETE_EVENT_LOOKUP_SQL = """
+SELECT e.tireId, e.seq, b.tireId IS NOT NULL AS hasBase, b.baseEventSeq
+FROM tire_events e LEFT JOIN tire_projection_bases b ON b.tireId = e.tireId
+WHERE e.id = %s AND e.cliente_id = %s
+"""
+
+def is_folded(event):
+    """True when the event's effect is part of its tire's projection base."""
+    return not event['hasBase'] or event['seq'] <= (event['baseEventSeq'] or 0)
+
+def delete_event(event_id, cliente_id, force=False):
+    """
+    Deletes an event for a specific client and replays its tire without it. An event
+    folded into the tire's projection base first rebases the tire on its acquisition
+    state, when its history reproduces its current state; otherwise it cannot be
+    replayed away and is refused with 409 unless `force`, which deletes it and leaves
+    the state as is.
+    """
+    connection = get_db_connection()
+    if connection is None:
+        return jsonify({"message": "Erro de conexão com o banco de dados"}), 500
+    cursor = None
+    try:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute(DELETE_EVENT_LOOKUP_SQL, (event_id, cliente_id))
+        event = cursor.fetchone()
+        if event is None:
+            connection.rollback()
             return jsonify({"message": "Evento não encontrado ou não pertence ao cliente."}), 404
-        return jsonify({"message": "Evento excluído com sucesso!"}), 200
+        folded = is_folded(event) and not rebase_from_acquisition(cursor, cliente_id, event['tireId'])
+        if folded and not force:
+            connection.rollback()
+            return jsonify({
+                "message": "O estado atual do pneu não corresponde ao seu histórico de eventos (edição manual ou "
+                           "histórico incompleto), então o efeito deste evento não pode ser revertido. Corrija o "
+                           "pneu manualmente ou exclua com force=1 para remover só o registro.",
+                "estadoRecalculado": False,
+            }), 409
+        cursor.execute("DELETE FROM tire_events WHERE id = %s AND cliente_id = %s", (event_id, cliente_id))
+        record_tombstones(cursor, cliente_id, 'events', [event_id])
+        if not folded:
+            replay_tire(cursor, cliente_id, event['tireId'])
+            refresh_tire_analytics(cursor, cliente_id, [event['tireId']])
+        connection.commit()
+        invalidate_tenant(cliente_id, 'events', 'tires')
+        if folded:
+            return jsonify({"message": "Evento excluído; o estado do pneu não foi alterado.",
+                            "estadoRecalculado": False}), 200
+        return jsonify({"message": "Evento excluído com sucesso!", "estadoRecalculado": True}), 200
     except Exception as e:
+        connection.rollback()
         print(f"Erro ao excluir evento: {e}")
         return jsonify({"message": "Erro ao excluir evento."}), 500
     finally:
-        if connection and connection.is_connected():
+        if cursor is not None:
             cursor.close()
-            connection.close()
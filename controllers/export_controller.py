@@ -0,0 +1,187 @@
+# controllers/export_controller.py
+"""
+Full-history exports of a client's events and tires, as CSV or Parquet.
+
+Rows are pulled from an unbuffered cursor and written out batch by batch (CSV) or
+row group by row group (Parquet), so memory stays flat however many rows a client
+has, and bytes reach the client from the first batch on.
+"""
+import csv
+import io
+import re
+from datetime import datetime
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: only needed for format=parquet
+    pa = None
+
+from db.connection import get_db_connection
+from controllers.event_controller import date_range_clauses
+from controllers.pagination import ListParamsError
+from flask import jsonify, Response, stream_with_context
+
+EXPORT_FETCH_SIZE = 5000
+PARQUET_ROW_GROUP_SIZE = 100000
+EXPORT_FORMATS = ('csv', 'parquet')
+# MySQL drops a connection whose client stops reading for net_write_timeout seconds;
+# a slow download of a large export must not hit the 60 s default
+EXPORT_NET_WRITE_TIMEOUT = 3600
+
+# resource -> (table, date column for from/to, ORDER BY, [(column, arrow type)])
+# Events follow idx_tire_events_cliente_tire_order, so the server streams them without sorting.
+EXPORT_RESOURCES = {
+    'events': ('tire_events', 'data', 'tireId, data, timestamp, seq', [
+        ('id', 'string'), ('tireId', 'string'), ('tipo', 'string'), ('data', 'date'),
+        ('observacoes', 'string'), ('detalhes', 'string'), ('timestamp', 'timestamp'), ('seq', 'int'),
+    ]),
+    'tires': ('tires', 'dataAquisicao', 'id', [
+        ('id', 'string'), ('numeroFogo', 'string'), ('marca', 'string'), ('modelo', 'string'),
+        ('tipoPneu', 'string'), ('medida', 'string'), ('capacidadeCarga', 'string'), ('desenhoBanda', 'string'),
+        ('profundidadeSulcoInicial', 'decimal'), ('custoAquisicao', 'decimal'), ('dataAquisicao', 'date'),
+        ('fornecedor', 'string'), ('numeroNF', 'string'), ('statusInicial', 'string'), ('numeroRecapagens', 'int'),
+        ('quilometragemTotalPercorrida', 'decimal'), ('ultimaLeituraHodometroRegistrada', 'decimal'),
+        ('profundidadeSulcoAtual', 'decimal'), ('currentVehicleId', 'string'), ('currentVehiclePlaca', 'string'),
+        ('currentAxle', 'string'), ('currentPosition', 'string'), ('createdAt', 'timestamp'), ('updatedAt', 'timestamp'),
+    ]),
+}
+
+def _arrow_schema(columns):
+    types = {
+        'string': pa.string(), 'date': pa.date32(), 'timestamp': pa.timestamp('s'),
+        'int': pa.int64(), 'decimal': pa.decimal128(12, 2),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in columns])
+
+def _text(value):
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode('utf-8')
+    return value
+
+def export_query(cliente_id, resource, args):
+    """Returns (sql, values) selecting a client's rows of `resource` within the from/to dates."""
+    table, date_column, order_by, columns = EXPORT_RESOURCES[resource]
+    clauses = [("cliente_id = %s", [cliente_id])] + date_range_clauses(args, date_column)
+    sql = (f"SELECT {', '.join(name for name, _ in columns)} FROM {table} "
+           f"WHERE {' AND '.join(clause for clause, _ in clauses)} ORDER BY {order_by}")
+    return sql, [value for _, values in clauses for value in values]
+
+def csv_chunks(cursor, columns):
+    """Yields the CSV header, then one chunk of text per fetched batch."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([name for name, _ in columns])
+    yield buffer.getvalue()
+    while True:
+        rows = cursor.fetchmany(EXPORT_FETCH_SIZE)
+        if not rows:
+            break
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows([_text(value) for value in row] for row in rows)
+        yield buffer.getvalue()
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that keeps what was written until drained (Parquet needs tell())."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def parquet_chunks(cursor, columns):
+    """Yields the Parquet file as it is written, one row group of PARQUET_ROW_GROUP_SIZE rows at a time."""
+    schema = _arrow_schema(columns)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression='zstd')
+    try:
+        while True:
+            rows = []
+            while len(rows) < PARQUET_ROW_GROUP_SIZE:
+                batch = cursor.fetchmany(min(EXPORT_FETCH_SIZE, PARQUET_ROW_GROUP_SIZE - len(rows)))
+                if not batch:
+                    break
+                rows.extend(batch)
+            if not rows:
+                break
+            values = list(zip(*rows))
+            arrays = [pa.array([_text(value) for value in values[i]], type=field.type) for i, field in enumerate(schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()  # footer
+
+def export_rows(cliente_id, resource, args=None):
+    """
+    Streams a client's events or tires (`resource`) as CSV or Parquet (`format`),
+    optionally bounded by `from`/`to` (AAAA-MM-DD) on the event date / acquisition date.
+    """
+    args = args or {}
+    if resource not in EXPORT_RESOURCES:
+        return jsonify({"message": f"Exportação inválida. Use: {', '.join(EXPORT_RESOURCES)}."}), 404
+    export_format = args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"message": f"Parâmetro 'format' inválido. Use: {', '.join(EXPORT_FORMATS)}."}), 400
+    if export_format == 'parquet' and pa is None:
+        return jsonify({"message": "Exportação em Parquet indisponível: instale o pacote 'pyarrow'."}), 501
+    try:
+        sql, values = export_query(cliente_id, resource, args)
+    except ListParamsError as err:
+        return jsonify({"message": str(err)}), 400
+
+    connection = get_db_connection(readonly=True)
+    if connection is None:
+        return jsonify({"message": "Erro de conexão com o banco de dados"}), 500
+    try:
+        session = connection.cursor()
+        session.execute("SET SESSION net_write_timeout = %s", (EXPORT_NET_WRITE_TIMEOUT,))
+        session.close()
+        cursor = connection.cursor()  # unbuffered: rows stay on the server until fetched
+        cursor.execute(sql, values)
+    except Exception as e:
+        print(f"Erro ao exportar {resource}: {e}")
+        return jsonify({"message": "Erro ao exportar dados."}), 500
+
+    columns = EXPORT_RESOURCES[resource][3]
+    chunks = csv_chunks if export_format == 'csv' else parquet_chunks
+    def generate():
+        try:
+            yield from chunks(cursor, columns)
+        except Exception as e:
+            # Headers are already sent: re-raise so the server aborts the response and
+            # the download fails, instead of ending it as a complete but truncated file
+            print(f"Erro ao transmitir exportação de {resource}: {e}")
+            raise
+        finally:
+            cursor.close()
+            try:
+                session = connection.cursor()
+                session.execute("SET SESSION net_write_timeout = DEFAULT")
+                session.close()
+            except Exception:
+                pass  # the pool health check discards a broken connection
+
+    stamp = datetime.now().strftime('%Y%m%d%H%M%S')
+    filename = f"{resource}_{re.sub(r'[^A-Za-z0-9_.-]', '_', cliente_id)}_{stamp}.{export_format}"
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/vnd.apache.parquet'
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response, 200
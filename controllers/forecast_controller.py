@@ -0,0 +1,283 @@
+# controllers/forecast_controller.py
+"""
+Tread-wear forecast for a whole fleet.
+
+A tenant's tread readings are loaded into columnar NumPy arrays, ordered by tire and
+time. Each tire's wear rate (mm per km) is the least-squares slope of depth against
+the km it ran since its last retread, fitted for every tire at once from per-tire
+sums (np.bincount); nothing loops over tires in Python.
+"""
+
+import numpy as np
+
+from db.connection import get_db_connection
+from db.cache import tenant_cache, cache_params, json_body_response
+from flask import jsonify, current_app
+
+LEGAL_TREAD_LIMIT_MM = 1.6
+FORECAST_FETCH_SIZE = 5000
+FORECAST_DEFAULT_LIMIT = 500
+FORECAST_MAX_LIMIT = 5000
+RETREAD_EVENT_TYPE = 'Retorno da Recapagem'
+READING_EVENT_TYPE = 'Registro de Quilometragem e Sulco'
+
+FORECAST_TIRES_SQL = """
+SELECT id, numeroFogo, marca, modelo, medida, statusInicial, currentVehiclePlaca, numeroRecapagens,
+       profundidadeSulcoInicial, profundidadeSulcoAtual, quilometragemTotalPercorrida
+FROM tires
+WHERE cliente_id = %s AND statusInicial <> 'Descartado'
+"""
+
+# Served in order by idx_tire_events_cliente_tire_order; the JSON values are cast server-side
+FORECAST_READINGS_SQL = f"""
+SELECT tireId, tipo = '{RETREAD_EVENT_TYPE}' AS recapagem, data,
+       CAST(NULLIF(NULLIF(JSON_UNQUOTE(JSON_EXTRACT(detalhes, '$.quilometragemVeiculo')), 'null'), '') AS DECIMAL(12,2)),
+       CAST(NULLIF(NULLIF(JSON_UNQUOTE(JSON_EXTRACT(detalhes, '$.profundidadeSulcoAtual')), 'null'), '') AS DECIMAL(5,2))
+FROM tire_events
+WHERE cliente_id = %s AND tipo IN ('{READING_EVENT_TYPE}', '{RETREAD_EVENT_TYPE}')
+ORDER BY tireId, data, timestamp, seq
+"""
+
+def _floats(values):
+    return np.array([np.nan if value is None else float(value) for value in values], dtype=np.float64)
+
+def load_tires(cursor, cliente_id):
+    """Returns the tenant's active tires as a dict of columns."""
+    cursor.execute(FORECAST_TIRES_SQL, (cliente_id,))
+    rows = cursor.fetchall()
+    columns = list(zip(*rows)) if rows else [()] * 11
+    return {
+        'id': np.array(columns[0], dtype=object),
+        'numeroFogo': columns[1], 'marca': columns[2], 'modelo': columns[3], 'medida': np.array(columns[4], dtype=object),
+        'status': np.array(columns[5], dtype=object), 'placa': columns[6],
+        'recapagens': np.array([value or 0 for value in columns[7]], dtype=np.int64),
+        'sulcoInicial': _floats(columns[8]), 'sulcoAtual': _floats(columns[9]), 'km': _floats(columns[10]),
+    }
+
+def tire_positions(tire_ids, reading_tire_ids):
+    """
+    Maps each reading to its tire's position in `tire_ids` (-1 for unknown tires).
+    Readings are grouped by tire, so only one lookup per tire is needed.
+    """
+    new_tire = np.ones(len(reading_tire_ids), dtype=bool)
+    new_tire[1:] = reading_tire_ids[1:] != reading_tire_ids[:-1]
+    position = {tire_id: i for i, tire_id in enumerate(tire_ids.tolist())}
+    group_position = np.array([position.get(tire_id, -1) for tire_id in reading_tire_ids[new_tire].tolist()],
+                              dtype=np.int64)
+    return group_position[np.cumsum(new_tire) - 1]
+
+def load_readings(connection, cliente_id):
+    """Streams the tenant's readings and retreads into columns (tireId, recapagem, day, odometer, depth)."""
+    tire_ids, retreads, days, odometers, depths = [], [], [], [], []
+    stream = connection.cursor()  # unbuffered: rows stay on the server until fetched
+    try:
+        stream.execute(FORECAST_READINGS_SQL, (cliente_id,))
+        while True:
+            rows = stream.fetchmany(FORECAST_FETCH_SIZE)
+            if not rows:
+                break
+            for column, values in zip((tire_ids, retreads, days, odometers, depths), zip(*rows)):
+                column.extend(values)
+    finally:
+        stream.close()
+    return {
+        'tireId': np.array(tire_ids, dtype=object),
+        'recapagem': np.array(retreads, dtype=bool),
+        'dia': np.array([str(value)[:10] for value in days], dtype='datetime64[D]').astype(np.int64),
+        'odometro': _floats(odometers),
+        'sulco': _floats(depths),
+    }
+
+def fit_wear_rates(tire_index, retread, day, odometer, depth, tire_count):
+    """
+    Fits every tire's current life in one pass. Inputs are aligned arrays ordered by
+    tire and time; `tire_index` maps each row to 0..tire_count-1. Returns per-tire
+    arrays: wear rate (mm/km, NaN when it cannot be fitted), readings used, km/day
+    and the day of the last reading (-1 when none).
+    """
+    count = len(tire_index)
+    new_tire = np.ones(count, dtype=bool)
+    new_tire[1:] = tire_index[1:] != tire_index[:-1]
+    # a retread starts a new life: only the readings after the last one are fitted
+    life = np.cumsum(new_tire | retread)
+    last_life = np.zeros(tire_count, dtype=np.int64)
+    np.maximum.at(last_life, tire_index, life)
+    keep = (life == last_life[tire_index]) & ~retread & ~np.isnan(odometer) & ~np.isnan(depth)
+
+    g = tire_index[keep]
+    odometer, depth, day = odometer[keep], depth[keep], day[keep]
+    first = np.ones(len(g), dtype=bool)
+    first[1:] = g[1:] != g[:-1]
+    # km run by the tire: the positive odometer deltas, as the event rules accumulate them
+    delta = np.diff(odometer, prepend=np.nan)
+    delta = np.where(first | np.isnan(delta), 0.0, np.clip(delta, 0.0, None))
+    km = np.cumsum(delta)
+    km -= km[np.flatnonzero(first)][np.cumsum(first) - 1]
+
+    n = np.bincount(g, minlength=tire_count).astype(np.float64)
+    sx = np.bincount(g, km, tire_count)
+    sy = np.bincount(g, depth, tire_count)
+    sxx = np.bincount(g, km * km, tire_count)
+    sxy = np.bincount(g, km * depth, tire_count)
+    denominator = n * sxx - sx * sx
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope = (n * sxy - sx * sy) / denominator
+    rate = np.where((n >= 2) & (denominator > 0) & (slope < 0), -slope, np.nan)
+
+    last_day = np.full(tire_count, -1, dtype=np.int64)
+    np.maximum.at(last_day, g, day)
+    first_day = np.full(tire_count, np.iinfo(np.int64).max, dtype=np.int64)
+    np.minimum.at(first_day, g, day)
+    span_km = np.zeros(tire_count)
+    np.maximum.at(span_km, g, km)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        km_per_day = np.where(last_day > first_day, span_km / (last_day - first_day), np.nan)
+    km_per_day[~(km_per_day > 0)] = np.nan
+    return rate, n.astype(np.int64), km_per_day, last_day
+
+def _nanmedian(values):
+    values = values[~np.isnan(values)]
+    return float(np.median(values)) if len(values) else np.nan
+
+def forecast_wear(tires, readings, limit_mm=LEGAL_TREAD_LIMIT_MM, today=None):
+    """
+    Predicts km and date to `limit_mm` for every tire. Tires without a fitted rate use
+    their lifetime average (never-retreaded tires) or the median rate of their medida.
+    Dates are only predicted for tires in use, from their last reading and km/day.
+    Returns per-tire columns.
+    """
+    tire_count = len(tires['id'])
+    readings_index = tire_positions(tires['id'], readings['tireId'])
+    known = readings_index >= 0
+    rate, used, km_per_day, last_day = fit_wear_rates(
+        readings_index[known], readings['recapagem'][known], readings['dia'][known],
+        readings['odometro'][known], readings['sulco'][known], tire_count
+    )
+    method = np.where(np.isnan(rate), None, 'regressao').astype(object)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        lifetime = (tires['sulcoInicial'] - tires['sulcoAtual']) / tires['km']
+    lifetime = np.where((tires['recapagens'] == 0) & (tires['km'] > 0) & (lifetime > 0), lifetime, np.nan)
+    use_lifetime = np.isnan(rate) & ~np.isnan(lifetime)
+    rate = np.where(use_lifetime, lifetime, rate)
+    method[use_lifetime] = 'media_vida'
+
+    fleet_rate = _nanmedian(rate)
+    by_size = np.full(tire_count, fleet_rate)
+    for size in set(tires['medida'][np.isnan(rate)]):  # one pass per medida, not per tire
+        same = tires['medida'] == size
+        median = _nanmedian(rate[same])
+        by_size[same] = median if not np.isnan(median) else fleet_rate
+    use_fleet = np.isnan(rate) & ~np.isnan(by_size)
+    rate = np.where(use_fleet, by_size, rate)
+    method[use_fleet] = 'mediana_medida'
+
+    remaining = np.clip(tires['sulcoAtual'] - limit_mm, 0.0, None)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        km_to_limit = np.where(remaining == 0, 0.0, remaining / rate)
+    km_per_day = np.where(np.isnan(km_per_day), _nanmedian(km_per_day), km_per_day)
+    today = np.datetime64(today or 'today', 'D').astype(np.int64)
+    # projected from the last reading: a date already past means the tire is overdue for inspection
+    start = np.where(last_day >= 0, last_day, today)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        days_to_limit = np.where(remaining == 0, 0.0, km_to_limit / km_per_day)
+    in_use = tires['status'] == 'Em Uso'
+    limit_day = np.where(in_use & np.isfinite(days_to_limit), start + np.nan_to_num(np.ceil(days_to_limit)), np.nan)
+    limit_day = np.where(remaining == 0, today, limit_day)
+    return {'rate': rate, 'method': method, 'used': used, 'kmToLimit': km_to_limit, 'limitDay': limit_day,
+            'kmPerDay': km_per_day}
+
+def forecast_order(forecast, days=None, today=None):
+    """Tire positions, soonest limit date first (undated tires by km to limit), optionally within `days`."""
+    order = np.lexsort((np.nan_to_num(forecast['kmToLimit'], nan=np.inf),
+                        np.nan_to_num(forecast['limitDay'], nan=np.inf)))
+    if days is not None:
+        until = np.datetime64(today or 'today', 'D').astype(np.int64) + days
+        order = order[forecast['limitDay'][order] <= until]
+    return order
+
+def _column(values, digits):
+    rounded = np.round(values, digits).astype(object)
+    rounded[~np.isfinite(values)] = None
+    return rounded.tolist()
+
+def forecast_rows(tires, forecast, positions):
+    """Builds the payload rows of the tires at `positions`, in that order."""
+    limit_day = forecast['limitDay'][positions]
+    dates = np.full(len(positions), None, dtype=object)
+    dated = np.isfinite(limit_day)
+    dates[dated] = np.datetime_as_string(limit_day[dated].astype(np.int64).astype('datetime64[D]'))
+    columns = {
+        "sulcoAtual": _column(tires['sulcoAtual'][positions], 2),
+        "desgastePor1000Km": _column(forecast['rate'][positions] * 1000, 4),
+        "kmAteLimite": _column(forecast['kmToLimit'][positions], 0),
+    }
+    rows = []
+    for row, i in enumerate(positions.tolist()):
+        rows.append({
+            "tireId": tires['id'][i],
+            "numeroFogo": tires['numeroFogo'][i],
+            "marca": tires['marca'][i],
+            "modelo": tires['modelo'][i],
+            "medida": tires['medida'][i],
+            "statusInicial": tires['status'][i],
+            "placa": tires['placa'][i],
+            "sulcoAtual": columns['sulcoAtual'][row],
+            "desgastePor1000Km": columns['desgastePor1000Km'][row],
+            "metodo": forecast['method'][i],
+            "leituras": int(forecast['used'][i]),
+            "kmAteLimite": columns['kmAteLimite'][row],
+            "dataPrevistaLimite": dates[row],
+        })
+    return rows
+
+def _parse_forecast_args(args):
+    try:
+        limit_mm = float(args.get('limite', LEGAL_TREAD_LIMIT_MM))
+        limit = int(args.get('limit', FORECAST_DEFAULT_LIMIT))
+        days = int(args['dias']) if args.get('dias') else None
+    except ValueError:
+        return None
+    if not 0 < limit_mm < 30 or not 1 <= limit <= FORECAST_MAX_LIMIT or (days is not None and days < 0):
+        return None
+    return limit_mm, limit, days
+
+def get_wear_forecast(cliente_id, args=None):
+    """
+    Km and date at which each tire reaches the legal tread limit (`limite`, default
+    1.6 mm), soonest first. `dias` keeps only tires due within that many days and
+    `limit` caps the rows. Responses are cached per client until the next write.
+    """
+    parsed = _parse_forecast_args(args or {})
+    if parsed is None:
+        return jsonify({"message": f"Use limite entre 0 e 30 mm, limit entre 1 e {FORECAST_MAX_LIMIT} "
+                                   "e dias >= 0."}), 400
+    limit_mm, limit, days = parsed
+    key = cache_params(args)
+    body = tenant_cache.get(cliente_id, 'forecast', key)
+    if body is not None:
+        return json_body_response(body)
+    connection = get_db_connection(readonly=True)
+    if connection is None:
+        return jsonify({"message": "Erro de conexão com o banco de dados"}), 500
+    generation = tenant_cache.generation(cliente_id)
+    cursor = None
+    try:
+        cursor = connection.cursor()
+        tires = load_tires(cursor, cliente_id)
+        readings = load_readings(connection, cliente_id)
+        forecast = forecast_wear(tires, readings, limit_mm)
+        order = forecast_order(forecast, days)
+        body = current_app.json.dumps({
+            "limiteMm": limit_mm,
+            "total": len(order),
+            "pneus": forecast_rows(tires, forecast, order[:limit]),
+        })
+        tenant_cache.set(cliente_id, 'forecast', key, body, depends_on=('tires', 'events'), generation=generation)
+        return json_body_response(body)
+    except Exception as e:
+        print(f"Erro ao calcular previsão de desgaste: {e}")
+        return jsonify({"message": "Erro ao calcular previsão de desgaste."}), 500
+    finally:
+        if cursor is not None:
+            cursor.close()
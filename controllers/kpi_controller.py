@@ -0,0 +1,110 @@
+# controllers/kpi_controller.py
+from db.connection import get_db_connection
+from db.cache import tenant_cache
+from flask import jsonify
+
+# Same buckets the dashboard always shows, even when empty
+STATUS_BUCKETS = ('Em Estoque - Novo', 'Em Estoque - Recapado', 'Em Estoque - Usado',
+                  'Em Uso', 'Em Recapagem', 'Descartado', 'Outro')
+
+KPI_COUNTER_COLUMNS = ('total', 'custoAquisicao', 'quilometragem', 'recapados', 'recapagens', 'custoRecapagens')
+
+KPI_BY_STATUS_SQL = f"""
+        SELECT statusInicial, {', '.join(KPI_COUNTER_COLUMNS)}
+        FROM kpi_counters WHERE cliente_id = %s AND total <> 0
+"""
+
+def kpi_counters_sql(count=None, sign=1):
+    """
+    INSERT ... SELECT ... ON DUPLICATE KEY UPDATE that adds (sign 1) or subtracts
+    (sign -1) the tire_analytics rows of `count` tires of a tenant (all of them when
+    count is None) to the tenant's kpi_counters. Parameters: cliente_id, then the ids.
+    """
+    ids = f" AND a.tireId IN ({', '.join(['%s'] * count)})" if count else ""
+    minus = '-' if sign < 0 else ''
+    updates = ', '.join(f"{column} = kpi_counters.{column} + new.{column}" for column in KPI_COUNTER_COLUMNS)
+    return f"""
+    INSERT INTO kpi_counters (cliente_id, statusInicial, {', '.join(KPI_COUNTER_COLUMNS)})
+    SELECT * FROM (
+    SELECT a.cliente_id, COALESCE(a.statusInicial, '') AS statusInicial, {minus}COUNT(*) AS total,
+           {minus}SUM(a.custoAquisicao) AS custoAquisicao, {minus}SUM(a.quilometragem) AS quilometragem,
+           {minus}SUM(a.numeroRecapagens > 0) AS recapados, {minus}SUM(a.numeroRecapagens) AS recapagens,
+           {minus}SUM(a.custoRecapagens) AS custoRecapagens
+    FROM tire_analytics a
+    WHERE a.cliente_id = %s{ids}
+    GROUP BY a.cliente_id, COALESCE(a.statusInicial, '')
+    ) AS new
+    ON DUPLICATE KEY UPDATE {updates}
+    """
+
+def adjust_kpi_counters(cursor, cliente_id, tire_ids, sign):
+    """
+    Adds (1) or removes (-1) the given tires' analytics rows from the tenant's KPI
+    counters, inside the caller's transaction.
+    """
+    tire_ids = list(tire_ids)
+    if tire_ids:
+        cursor.execute(kpi_counters_sql(len(tire_ids), sign), [cliente_id, *tire_ids])
+
+def rebuild_kpi_counters(cursor, cliente_id):
+    """Recomputes a tenant's KPI counters from all of its analytics rows."""
+    cursor.execute("DELETE FROM kpi_counters WHERE cliente_id = %s", (cliente_id,))
+    cursor.execute(kpi_counters_sql(), (cliente_id,))
+
+def compute_kpis(cursor, cliente_id):
+    """Reads the fleet KPIs from the tenant's counters (one row per status)."""
+    cursor.execute(KPI_BY_STATUS_SQL, (cliente_id,))
+    return summarize_kpis(cursor.fetchall())
+
+def summarize_kpis(by_status):
+    """Builds the KPI payload from the per-status counters."""
+    pneus_por_status = {status: 0 for status in STATUS_BUCKETS}
+    total_pneus = 0
+    custo_aquisicao = 0.0
+    custo_recapagens = 0.0
+    quilometragem = 0.0
+    recapados = 0
+    recapagens = 0
+    for row in by_status:
+        status = row['statusInicial'] or 'Outro'
+        pneus_por_status[status] = pneus_por_status.get(status, 0) + int(row['total'])
+        total_pneus += int(row['total'])
+        custo_aquisicao += float(row['custoAquisicao'])
+        custo_recapagens += float(row['custoRecapagens'])
+        quilometragem += float(row['quilometragem'])
+        recapados += int(row['recapados'])
+        recapagens += int(row['recapagens'])
+
+    return {
+        "totalPneus": total_pneus,
+        "pneusPorStatus": pneus_por_status,
+        "custoTotalAquisicao": round(custo_aquisicao, 2),
+        "custoTotalRecapagens": round(custo_recapagens, 2),
+        "quilometragemTotalFrota": round(quilometragem, 2),
+        "totalRecapagens": recapagens,
+        "pneusRecapadosCount": recapados,
+        "mediaRecapagensPorPneu": recapagens / recapados if recapados else 0,
+        "cpk": (custo_aquisicao + custo_recapagens) / quilometragem if quilometragem else 0,
+    }
+
+def get_kpis(cliente_id):
+    """Returns the fleet KPIs for a client, served from the per-tenant cache when fresh."""
+    kpis = tenant_cache.get(cliente_id, 'kpis')
+    if kpis is not None:
+        return jsonify(kpis), 200
+    connection = get_db_connection(readonly=True)
+    if connection is None:
+        return jsonify({"message": "Erro de conexão com o banco de dados"}), 500
+    generation = tenant_cache.generation(cliente_id)
+    cursor = None
+    try:
+        cursor = connection.cursor(dictionary=True)
+        kpis = compute_kpis(cursor, cliente_id)
+        tenant_cache.set(cliente_id, 'kpis', (), kpis, depends_on=('tires', 'events'), generation=generation)
+        return jsonify(kpis), 200
+    except Exception as e:
+        print(f"Erro ao calcular KPIs: {e}")
+        return jsonify({"message": "Erro ao calcular KPIs."}), 500
+    finally:
+        if cursor is not None:
+            cursor.close()
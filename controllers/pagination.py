@@ -0,0 +1,160 @@
+# controllers/pagination.py
+import base64
+import json
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class ListParamsError(ValueError):
+    """Raised for invalid limit/after/sort/filter query parameters."""
+
+
+def _encode_cursor(sort_value, row_id):
+    if sort_value is not None and not isinstance(sort_value, (str, int, float)):
+        sort_value = str(sort_value)  # Decimal, date, datetime: MySQL compares the string form
+    raw = json.dumps([sort_value, row_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return sort_value, row_id
+    except Exception:
+        raise ListParamsError("Parâmetro 'after' inválido.")
+
+
+def parse_list_params(args, sortable, filterable, default_sort='id', default_order='asc', always_paginate=False):
+    """
+    Parses list query parameters from `request.args`.
+
+    Filters are exact matches (repeat the parameter to match any of several values;
+    an empty value matches NULL). `limit`/`after` switch the endpoint to keyset
+    pagination; `total=1` adds the filtered row count to the page.
+    """
+    args = args or {}
+    sort = args.get('sort', default_sort)
+    if sort not in sortable:
+        raise ListParamsError(f"Ordenação inválida: '{sort}'. Use uma de: {', '.join(sortable)}.")
+    order = args.get('order', default_order).lower()
+    if order not in ('asc', 'desc'):
+        raise ListParamsError("Parâmetro 'order' deve ser 'asc' ou 'desc'.")
+
+    filters = {}
+    for column in filterable:
+        values = args.getlist(column) if hasattr(args, 'getlist') else ([args[column]] if column in args else [])
+        if values:
+            filters[column] = values
+
+    paginate = always_paginate or 'limit' in args or 'after' in args
+    limit = None
+    after = None
+    if paginate:
+        try:
+            limit = int(args.get('limit', DEFAULT_PAGE_SIZE))
+        except (TypeError, ValueError):
+            raise ListParamsError("Parâmetro 'limit' deve ser um número inteiro.")
+        if limit < 1 or limit > MAX_PAGE_SIZE:
+            raise ListParamsError(f"Parâmetro 'limit' deve estar entre 1 e {MAX_PAGE_SIZE}.")
+        if args.get('after'):
+            after = _decode_cursor(args['after'])
+
+    total = paginate and args.get('total') in ('1', 'true')
+    return {"sort": sort, "order": order, "filters": filters, "paginate": paginate, "limit": limit, "after": after,
+            "total": total}
+
+
+def _filter_where(cliente_id, params, extra_where):
+    where = ["cliente_id = %s"]
+    values = [cliente_id]
+
+    for column, column_values in params['filters'].items():
+        non_null = [v for v in column_values if v != '']
+        clauses = []
+        if len(non_null) == 1:
+            clauses.append(f"{column} = %s")
+        elif non_null:
+            clauses.append(f"{column} IN ({', '.join(['%s'] * len(non_null))})")
+        if len(non_null) != len(column_values):
+            clauses.append(f"{column} IS NULL")
+        where.append(f"({' OR '.join(clauses)})")
+        values.extend(non_null)
+
+    for clause, clause_values in extra_where:
+        where.append(clause)
+        values.extend(clause_values)
+    return where, values
+
+
+def build_list_query(table, cliente_id, params, columns='*', extra_where=()):
+    """
+    Builds the SELECT for a tenant-scoped list.
+
+    Pages are ordered by (sort column, id) and continued from the `after` cursor, so
+    every page is an index range read rather than an OFFSET scan.
+    `extra_where` is a sequence of (clause, values) pairs ANDed to the filters.
+    """
+    sort, order = params['sort'], params['order']
+    where, values = _filter_where(cliente_id, params, extra_where)
+
+    if params['after'] is not None:
+        sort_value, last_id = params['after']
+        if sort == 'id':
+            where.append("id > %s" if order == 'asc' else "id < %s")
+            values.append(last_id)
+        elif order == 'asc':
+            # MySQL sorts NULLs first in ascending order
+            if sort_value is None:
+                where.append(f"(({sort} IS NULL AND id > %s) OR {sort} IS NOT NULL)")
+                values.append(last_id)
+            else:
+                where.append(f"({sort} > %s OR ({sort} = %s AND id > %s))")
+                values.extend([sort_value, sort_value, last_id])
+        else:
+            if sort_value is None:
+                where.append(f"({sort} IS NULL AND id < %s)")
+                values.append(last_id)
+            else:
+                where.append(f"({sort} < %s OR ({sort} = %s AND id < %s) OR {sort} IS NULL)")
+                values.extend([sort_value, sort_value, last_id])
+
+    direction = order.upper()
+    order_by = "id " + direction if sort == 'id' else f"{sort} {direction}, id {direction}"
+    sql = f"SELECT {columns} FROM {table} WHERE {' AND '.join(where)} ORDER BY {order_by}"
+    if params['paginate']:
+        sql += " LIMIT %s"
+        values.append(params['limit'] + 1)  # one extra row tells us whether there is a next page
+    return sql, values
+
+
+def build_count_query(table, cliente_id, params, extra_where=()):
+    """
+    Builds the COUNT of the filtered list (the `after` cursor aside) for `total=1`.
+    A separate query, so pages without it stay a LIMITed index range read instead of
+    a window over every matching row.
+    """
+    where, values = _filter_where(cliente_id, params, extra_where)
+    return f"SELECT COUNT(*) AS total FROM {table} WHERE {' AND '.join(where)}", values
+
+
+def count_total(cursor, table, cliente_id, params, extra_where=()):
+    """The filtered total when the request asked for it (`total=1`), else None. Needs a dictionary cursor."""
+    if not params['total']:
+        return None
+    cursor.execute(*build_count_query(table, cliente_id, params, extra_where))
+    return int(cursor.fetchone()['total'])
+
+
+def build_page(rows, params, total=None):
+    """Wraps fetched rows in the paginated envelope ({items, nextCursor, hasMore[, total]})."""
+    has_more = len(rows) > params['limit']
+    items = rows[:params['limit']]
+    page = {"items": items, "hasMore": has_more, "nextCursor": None}
+    if total is not None:
+        page["total"] = total
+    if has_more:
+        last = items[-1]
+        page["nextCursor"] = _encode_cursor(last[params['sort']], last['id'])
+    return page
@@ -0,0 +1,147 @@
+# controllers/search_controller.py
+"""
+Ranked search over a client's tires and vehicles.
+
+Substring matches come from the ngram FULLTEXT indexes (migration 0006), prefix
+matches on numeroFogo / placa from the (cliente_id, ...) B-tree indexes. Each index
+is probed by its own branch of a UNION, so no branch falls back to scanning the
+tenant's rows, and a hit keeps the best score of the branches that found it.
+"""
+import re
+
+from db.connection import get_db_connection
+from flask import jsonify
+
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+SEARCH_MAX_QUERY_LENGTH = 100
+NGRAM_TOKEN_SIZE = 2  # the server's ngram_token_size: shorter words only match by prefix
+SEARCH_TYPES = ('all', 'tires', 'vehicles')
+
+EXACT_SCORE = 1000
+PREFIX_SCORE = 500
+
+TIRE_SEARCH_COLUMNS = "numeroFogo, marca, modelo, medida, numeroNF"
+VEHICLE_SEARCH_COLUMNS = "placa, modelo"
+
+TIRE_HIT_FIELDS = "id, numeroFogo, marca, modelo, medida, numeroNF, statusInicial, currentVehicleId, currentVehiclePlaca"
+VEHICLE_HIT_FIELDS = "id, placa, modelo, ano, eixos"
+
+_BOOLEAN_OPERATORS = re.compile(r'[+\-<>()~*"@]+')
+
+class SearchParamsError(ValueError):
+    """Raised for an invalid q/type/limit/offset query parameter."""
+
+def parse_search_params(args):
+    query = ' '.join((args.get('q') or '').split())
+    if not query:
+        raise SearchParamsError("Informe o termo de busca em 'q'.")
+    if len(query) > SEARCH_MAX_QUERY_LENGTH:
+        raise SearchParamsError(f"O termo de busca deve ter até {SEARCH_MAX_QUERY_LENGTH} caracteres.")
+    kind = args.get('type', 'all')
+    if kind not in SEARCH_TYPES:
+        raise SearchParamsError(f"Parâmetro 'type' inválido. Use: {', '.join(SEARCH_TYPES)}.")
+    try:
+        limit = int(args.get('limit', SEARCH_DEFAULT_LIMIT))
+        offset = int(args.get('offset', 0))
+    except ValueError:
+        raise SearchParamsError("'limit' e 'offset' devem ser números inteiros.")
+    if not 1 <= limit <= SEARCH_MAX_LIMIT or offset < 0:
+        raise SearchParamsError(f"Use limit entre 1 e {SEARCH_MAX_LIMIT} e offset >= 0.")
+    return {'q': query, 'type': kind, 'limit': limit, 'offset': offset}
+
+def fulltext_query(query):
+    """
+    Boolean-mode query requiring every word as a phrase (a substring, with the ngram
+    parser). Returns None when no word is long enough to be in the index.
+    """
+    words = [word for word in _BOOLEAN_OPERATORS.sub(' ', query).split() if len(word) >= NGRAM_TOKEN_SIZE]
+    if not words:
+        return None
+    return ' '.join(f'+"{word}"' for word in words)
+
+def _like_prefix(query):
+    return query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+def _branches(table, kind, identifier, columns, cliente_id, query):
+    """SELECTs (sql, values) scoring one table: exact/prefix identifier match, then FULLTEXT."""
+    branches = [(
+        f"SELECT '{kind}' AS kind, id, IF({identifier} = %s, {EXACT_SCORE}, {PREFIX_SCORE}) AS score "
+        f"FROM {table} WHERE cliente_id = %s AND {identifier} LIKE %s",
+        [query, cliente_id, _like_prefix(query)],
+    )]
+    against = fulltext_query(query)
+    if against is not None:
+        branches.append((
+            f"SELECT '{kind}' AS kind, id, MATCH({columns}) AGAINST (%s IN BOOLEAN MODE) AS score "
+            f"FROM {table} WHERE MATCH({columns}) AGAINST (%s IN BOOLEAN MODE) AND cliente_id = %s",
+            [against, against, cliente_id],
+        ))
+    return branches
+
+def build_search_query(cliente_id, params):
+    """Returns (sql, values) for one page of ranked hits (kind, id, score), plus one extra row."""
+    branches = []
+    if params['type'] in ('all', 'tires'):
+        branches += _branches('tires', 'tire', 'numeroFogo', TIRE_SEARCH_COLUMNS, cliente_id, params['q'])
+    if params['type'] in ('all', 'vehicles'):
+        branches += _branches('vehicles', 'vehicle', 'placa', VEHICLE_SEARCH_COLUMNS, cliente_id, params['q'])
+    values = [value for _, branch_values in branches for value in branch_values]
+    sql = (
+        "SELECT kind, id, MAX(score) AS score FROM ("
+        + " UNION ALL ".join(sql for sql, _ in branches)
+        + ") hits GROUP BY kind, id ORDER BY score DESC, kind, id LIMIT %s OFFSET %s"
+    )
+    return sql, [*values, params['limit'] + 1, params['offset']]
+
+def _fetch_hits(cursor, table, fields, cliente_id, ids):
+    if not ids:
+        return {}
+    cursor.execute(
+        f"SELECT {fields} FROM {table} WHERE cliente_id = %s AND id IN ({', '.join(['%s'] * len(ids))})",
+        [cliente_id, *ids]
+    )
+    return {row['id']: row for row in cursor.fetchall()}
+
+def search(cliente_id, args=None):
+    """
+    Searches tires (numeroFogo, marca, modelo, medida, numeroNF) and vehicles (placa,
+    modelo) by prefix and substring. Exact and prefix matches on numeroFogo / placa
+    rank first. Returns {items, hasMore, nextOffset}; each item has `type` and `score`.
+    """
+    try:
+        params = parse_search_params(args or {})
+    except SearchParamsError as err:
+        return jsonify({"message": str(err)}), 400
+    connection = get_db_connection(readonly=True)
+    if connection is None:
+        return jsonify({"message": "Erro de conexão com o banco de dados"}), 500
+    cursor = None
+    try:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute(*build_search_query(cliente_id, params))
+        hits = cursor.fetchall()
+        has_more = len(hits) > params['limit']
+        hits = hits[:params['limit']]
+        found = {
+            'tire': _fetch_hits(cursor, 'tires', TIRE_HIT_FIELDS, cliente_id,
+                                [hit['id'] for hit in hits if hit['kind'] == 'tire']),
+            'vehicle': _fetch_hits(cursor, 'vehicles', VEHICLE_HIT_FIELDS, cliente_id,
+                                   [hit['id'] for hit in hits if hit['kind'] == 'vehicle']),
+        }
+        items = []
+        for hit in hits:
+            row = found[hit['kind']].get(hit['id'])
+            if row is not None:  # deleted between the two queries
+                items.append({"type": hit['kind'], "score": round(float(hit['score']), 4), **row})
+        return jsonify({
+            "items": items,
+            "hasMore": has_more,
+            "nextOffset": params['offset'] + params['limit'] if has_more else None,
+        }), 200
+    except Exception as e:
+        print(f"Erro ao buscar: {e}")
+        return jsonify({"message": "Erro ao realizar a busca."}), 500
+    finally:
+        if cursor is not None:
+            cursor.close()
@@ -0,0 +1,153 @@
+# controllers/sync_controller.py
+from db.connection import get_db_connection, replica_lag_margin
+from db.cache import tenant_cache
+from db.versions import list_versions_query, versions_from_rows
+from db.statements import select_list
+from controllers.event_controller import decode_event_details
+from flask import jsonify
+from datetime import datetime, timedelta
+import hashlib
+import json
+
+# resource -> (table, column bumped on every change)
+SYNC_RESOURCES = {
+    'tires': ('tires', 'updatedAt'),
+    'vehicles': ('vehicles', 'updatedAt'),
+    'events': ('tire_events', 'timestamp'),
+}
+
+# A row is stamped (updatedAt / timestamp / deletedAt) by the statement that writes it,
+# but only becomes visible when its transaction commits, which can be many seconds
+# later (event batches, imports, rebuilds). The watermark is therefore the start of the
+# oldest write transaction still open (or NOW() when there is none): every row stamped
+# before it has committed. `since` is inclusive, so a row may arrive twice but is not
+# skipped. Reading information_schema.innodb_trx needs the PROCESS privilege; without it
+# the watermark falls back to NOW() minus SYNC_WATERMARK_FALLBACK_SECONDS, which only
+# covers transactions shorter than that.
+SYNC_WATERMARK_SQL = """
+    SELECT LEAST(NOW(), COALESCE(MIN(trx_started), NOW())) AS now
+    FROM information_schema.innodb_trx WHERE trx_rows_modified > 0
+"""
+SYNC_WATERMARK_FALLBACK_SECONDS = 5
+WATERMARK_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_watermark_fallback_logged = False
+
+def next_watermark(now, margin=0):
+    return (now - timedelta(seconds=margin)).strftime(WATERMARK_FORMAT)
+
+def watermark_fallback(err):
+    """Logs (once per process) that the committed-data watermark is unavailable; returns the fallback query."""
+    global _watermark_fallback_logged
+    if not _watermark_fallback_logged:
+        _watermark_fallback_logged = True
+        print(f"Sync: watermark sem information_schema.innodb_trx (conceda PROCESS ao usuário): {err}")
+    return "SELECT NOW() AS now"
+
+def _row_now(row):
+    return row['now'] if isinstance(row, dict) else row[0]
+
+def read_watermark(cursor, margin=0):
+    """Reads the sync watermark (see SYNC_WATERMARK_SQL) on a primary connection."""
+    try:
+        cursor.execute(SYNC_WATERMARK_SQL)
+    except Exception as err:
+        cursor.execute(watermark_fallback(err))
+        margin += SYNC_WATERMARK_FALLBACK_SECONDS
+    return next_watermark(_row_now(cursor.fetchone()), margin)
+
+def sync_watermark():
+    """
+    Watermark for a full list about to be read, or None. Taken on the primary before
+    the list, widened by the replica lag margin since the list may come from a replica.
+    """
+    connection = get_db_connection()
+    if connection is None:
+        return None
+    cursor = connection.cursor()
+    try:
+        return read_watermark(cursor, replica_lag_margin())
+    except Exception as e:
+        print(f"Erro ao calcular watermark: {e}")
+        return None
+    finally:
+        cursor.close()
+
+def list_etag(cliente_id, resource, args, also=()):
+    """
+    Returns the ETag of a list response, or None if the versions could not be read.
+    It covers the query string and the list versions (db/versions.py) of `resource`
+    and of the `also` resources embedded in the response. Versions are cached until
+    a write to one of those resources and read from a replica when there is one.
+    """
+    names = (resource, *also)
+    versions = tenant_cache.get(cliente_id, 'list_versions', names)
+    if versions is None:
+        generation = tenant_cache.generation(cliente_id)
+        connection = get_db_connection(readonly=True)
+        if connection is None:
+            return None
+        cursor = connection.cursor()
+        try:
+            cursor.execute(*list_versions_query(cliente_id, names))
+            versions = versions_from_rows(cursor.fetchall(), names)
+        except Exception as e:
+            print(f"Erro ao calcular versão da lista: {e}")
+            return None
+        finally:
+            cursor.close()
+        tenant_cache.set(cliente_id, 'list_versions', names, versions, depends_on=names, generation=generation)
+    return version_etag(cliente_id, resource, args, versions)
+
+def version_etag(cliente_id, resource, args, version):
+    query = sorted((key, value) for key, value in args.items(multi=True) if key != 'cliente_id') if args else []
+    raw = json.dumps([cliente_id, resource, query, [str(part) for part in version]])
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+def parse_watermark(value):
+    try:
+        return datetime.strptime(value, WATERMARK_FORMAT)
+    except (TypeError, ValueError):
+        return None
+
+INVALID_SINCE_MESSAGE = "Parâmetro 'since' deve estar no formato AAAA-MM-DD HH:MM:SS."
+
+def changes_queries(cliente_id, resource, since_at):
+    """Returns the (sql, values) pairs for the changed rows and the tombstones since `since_at`."""
+    table, changed_column = SYNC_RESOURCES[resource]
+    return (
+        (f"SELECT {select_list(table)} FROM {table} WHERE cliente_id = %s AND {changed_column} >= %s ORDER BY {changed_column}, id",
+         (cliente_id, since_at)),
+        ("SELECT DISTINCT record_id FROM deleted_records WHERE cliente_id = %s AND resource = %s AND deletedAt >= %s",
+         (cliente_id, resource, since_at)),
+    )
+
+def get_changes(cliente_id, resource, since):
+    """
+    Returns the rows of `resource` changed at or after the `since` watermark, the ids
+    deleted since then, and the watermark to send on the next sync.
+    """
+    since_at = parse_watermark(since)
+    if since_at is None:
+        return jsonify({"message": INVALID_SINCE_MESSAGE}), 400
+    (items_sql, items_values), (deleted_sql, deleted_values) = changes_queries(cliente_id, resource, since_at)
+    connection = get_db_connection()
+    if connection is None:
+        return jsonify({"message": "Erro de conexão com o banco de dados"}), 500
+    cursor = None
+    try:
+        cursor = connection.cursor(dictionary=True)
+        watermark = read_watermark(cursor)
+        cursor.execute(items_sql, items_values)
+        items = cursor.fetchall()
+        if resource == 'events':
+            decode_event_details(items)
+        cursor.execute(deleted_sql, deleted_values)
+        deleted = [row['record_id'] for row in cursor.fetchall()]
+        return jsonify({"items": items, "deleted": deleted, "watermark": watermark}), 200
+    except Exception as e:
+        print(f"Erro ao buscar alterações: {e}")
+        return jsonify({"message": "Erro ao buscar alterações."}), 500
+    finally:
+        if cursor is not None:
+            cursor.close()
@@ -1,32 +1,78 @@
 # controllers/tire_controller.py
-from db.connection import create_db_connection
-from flask import jsonify
+from db.connection import get_db_connection
+from db.cache import tenant_cache, invalidate_tenant, cache_params, json_body_response
+from db.tombstones import record_tombstones, record_tire_event_tombstones
+from controllers.pagination import parse_list_params, build_list_query, build_page, count_total, ListParamsError
+from db.batch import build_case_update
+from db.statements import writable_changes, build_update, UnknownColumnError
+from controllers.tire_state import TIRE_STATE_COLUMNS
+from controllers.tire_projection import capture_bases, lock_tire_states, is_in_order, replay_tire
+from controllers.analytics_controller import refresh_tire_analytics
+from controllers.kpi_controller import adjust_kpi_counters
+from flask import jsonify, current_app
 import mysql.connector
 import json
 
-def get_all_tires(cliente_id):
-    """Fetches all tires from the database for a specific client."""
-    connection = create_db_connection()
+TIRE_SORTABLE = ('id', 'numeroFogo', 'marca', 'medida', 'statusInicial', 'dataAquisicao', 'createdAt', 'updatedAt')
+TIRE_FILTERABLE = ('statusInicial', 'marca', 'medida', 'currentVehicleId')
+DELETE_PROJECTION_BASE_SQL = "DELETE FROM tire_projection_bases WHERE tireId = %s AND cliente_id = %s"
+
+def get_all_tires(cliente_id, args=None):
+    """
+    Fetches the tires of a specific client, optionally filtered and sorted.
+    With `limit`/`after` the result is a keyset-paginated page instead of a plain list.
+    Serialized responses are cached per (cliente_id, query string) until a write invalidates them.
+    """
+    try:
+        params = parse_list_params(args, TIRE_SORTABLE, TIRE_FILTERABLE)
+    except ListParamsError as err:
+        return jsonify({"message": str(err)}), 400
+    key = cache_params(args)
+    body = tenant_cache.get(cliente_id, 'tires', key)
+    if body is not None:
+        return json_body_response(body)
+    connection = get_db_connection(readonly=True)
     if connection is None:
         return jsonify({"message": "Erro de conexão com o banco de dados"}), 500
+    cursor = None
     try:
+        generation = tenant_cache.generation(cliente_id)
         cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM tires WHERE cliente_id = %s", (cliente_id,))
+        sql, values = build_list_query("tires", cliente_id, params)
+        cursor.execute(sql, values)
         tires = cursor.fetchall()
-        return jsonify(tires), 200
+        if params['paginate']:
+            tires = build_page(tires, params, count_total(cursor, "tires", cliente_id, params))
+        body = current_app.json.dumps(tires)
+        tenant_cache.set(cliente_id, 'tires', key, body, depends_on=('tires',), generation=generation)
+        return json_body_response(body)
     except Exception as e:
         print(f"Erro ao buscar pneus: {e}")
         return jsonify({"message": "Erro ao buscar pneus."}), 500
     finally:
-        if connection and connection.is_connected():
+        if cursor is not None:
             cursor.close()
-            connection.close()
+
+def tire_insert_values(data, cliente_id):
+    """Maps a tire payload to the INSERT parameters (required keys raise KeyError)."""
+    return (
+        data['id'], data['numeroFogo'], data['marca'], data['modelo'], data.get('tipoPneu'),
+        data['medida'], data.get('capacidadeCarga'), data.get('desenhoBanda'),
+        data.get('profundidadeSulcoInicial'), data['custoAquisicao'], data['dataAquisicao'],
+        data['fornecedor'], data.get('numeroNF'), data['statusInicial'],
+        data.get('numeroRecapagens', 0),
+        data.get('quilometragemTotalPercorrida', 0),
+        data.get('ultimaLeituraHodometroRegistrada', 0),
+        data.get('profundidadeSulcoAtual', data.get('profundidadeSulcoInicial')),
+        cliente_id
+    )
 
 def create_tire(data, cliente_id):
     """Creates a new tire in the database for a specific client."""
-    connection = create_db_connection()
+    connection = get_db_connection()
     if connection is None:
         return jsonify({"message": "Erro de conexão com o banco de dados"}), 500
+    cursor = None
     try:
         cursor = connection.cursor()
         sql = """
@@ -37,19 +83,10 @@ def create_tire(data, cliente_id):
                            profundidadeSulcoAtual, cliente_id, createdAt, updatedAt)
         VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW(), NOW())
         """
-        values = (
-            data['id'], data['numeroFogo'], data['marca'], data['modelo'], data.get('tipoPneu'),
-            data['medida'], data.get('capacidadeCarga'), data.get('desenhoBanda'),
-            data.get('profundidadeSulcoInicial'), data['custoAquisicao'], data['dataAquisicao'],
-            data['fornecedor'], data.get('numeroNF'), data['statusInicial'],
-            data.get('numeroRecapagens', 0),
-            data.get('quilometragemTotalPercorrida', 0),
-            data.get('ultimaLeituraHodometroRegistrada', 0),
-            data.get('profundidadeSulcoAtual', data.get('profundidadeSulcoInicial')),
-            cliente_id
-        )
-        cursor.execute(sql, values)
+        cursor.execute(sql, tire_insert_values(data, cliente_id))
+        refresh_tire_analytics(cursor, cliente_id, [data['id']])
         connection.commit()
+        invalidate_tenant(cliente_id, 'tires')
         return jsonify({"message": "Pneu cadastrado com sucesso!", "id": data['id']}), 201
     except mysql.connector.Error as err:
         print(f"Erro MySQL ao cadastrar pneu: {err}")
@@ -58,37 +95,39 @@ def create_tire(data, cliente_id):
         print(f"Erro geral ao cadastrar pneu: {e}")
         return jsonify({"message": "Erro interno ao cadastrar pneu."}), 500
     finally:
-        if connection and connection.is_connected():
+        if cursor is not None:
             cursor.close()
-            connection.close()
 
 def update_tire(tire_id, data, cliente_id):
-    """Updates an existing tire in the database for a specific client."""
-    connection = create_db_connection()
+    """
+    Updates an existing tire in the database for a specific client.
+    Only columns of the tires table are accepted; they are written by a prepared
+    UPDATE whose SET list follows the schema order (db/statements.py).
+    """
+    try:
+        changes = writable_changes('tires', data)
+    except UnknownColumnError as err:
+        return jsonify({"message": str(err)}), 400
+    if not changes:
+        return jsonify({"message": "Nenhum dado para atualizar."}), 400
+    connection = get_db_connection()
     if connection is None:
         return jsonify({"message": "Erro de conexão com o banco de dados"}), 500
+    cursor = None
     try:
-        cursor = connection.cursor()
-        # Build the SET part of the SQL query dynamically
-        set_clauses = []
-        values = []
-        for key, value in data.items():
-            if key not in ['id', 'numeroFogo', 'createdAt', 'cliente_id']: # Prevent updating immutable fields
-                set_clauses.append(f"{key} = %s")
-                values.append(value)
-        set_clauses.append("updatedAt = NOW()")
-        
-        if not set_clauses:
-            return jsonify({"message": "Nenhum dado para atualizar."}), 400
-
-        sql = f"UPDATE tires SET {', '.join(set_clauses)} WHERE id = %s AND cliente_id = %s"
-        values.extend([tire_id, cliente_id])
-
-        cursor.execute(sql, values)
+        sql, values = build_update('tires', changes)
+        updated = connection.execute_prepared(sql, [*values, tire_id, cliente_id]).rowcount
+        if updated and any(key in TIRE_STATE_COLUMNS for key in changes):
+            # Edited by hand: the current state becomes the base at the next event
+            connection.execute_prepared(DELETE_PROJECTION_BASE_SQL, (tire_id, cliente_id))
+        if updated:
+            cursor = connection.cursor()
+            refresh_tire_analytics(cursor, cliente_id, [tire_id])
         connection.commit()
 
-        if cursor.rowcount == 0:
+        if updated == 0:
             return jsonify({"message": "Pneu não encontrado ou não pertence ao cliente."}), 404
+        invalidate_tenant(cliente_id, 'tires')
         return jsonify({"message": "Pneu atualizado com sucesso!"}), 200
     except mysql.connector.Error as err:
         print(f"Erro MySQL ao atualizar pneu: {err}")
@@ -97,35 +136,40 @@ def update_tire(tire_id, data, cliente_id):
         print(f"Erro geral ao atualizar pneu: {e}")
         return jsonify({"message": "Erro interno ao atualizar pneu."}), 500
     finally:
-        if connection and connection.is_connected():
+        if cursor is not None:
             cursor.close()
-            connection.close()
 
 def delete_tire(tire_id, cliente_id):
     """Deletes a tire from the database for a specific client."""
-    connection = create_db_connection()
+    connection = get_db_connection()
     if connection is None:
         return jsonify({"message": "Erro de conexão com o banco de dados"}), 500
+    cursor = None
     try:
         cursor = connection.cursor()
+        record_tire_event_tombstones(cursor, cliente_id, tire_id)
+        adjust_kpi_counters(cursor, cliente_id, [tire_id], -1)  # its analytics row goes by ON DELETE CASCADE
         cursor.execute("DELETE FROM tires WHERE id = %s AND cliente_id = %s", (tire_id, cliente_id))
-        connection.commit()
         if cursor.rowcount == 0:
+            connection.rollback()
             return jsonify({"message": "Pneu não encontrado ou não pertence ao cliente."}), 404
+        record_tombstones(cursor, cliente_id, 'tires', [tire_id])
+        connection.commit()
+        invalidate_tenant(cliente_id, 'tires', 'events') # events are removed by ON DELETE CASCADE
         return jsonify({"message": "Pneu excluído com sucesso!"}), 200
     except Exception as e:
         print(f"Erro ao excluir pneu: {e}")
         return jsonify({"message": "Erro ao excluir pneu."}), 500
     finally:
-        if connection and connection.is_connected():
+        if cursor is not None:
             cursor.close()
-            connection.close()
 
 def swap_tires(tire1_id, tire2_id, cliente_id):
     """Swaps the positions of two tires for a specific client."""
-    connection = create_db_connection()
+    connection = get_db_connection()
     if connection is None:
         return jsonify({"message": "Erro de conexão com o banco de dados"}), 500
+    cursor = None
     try:
         cursor = connection.cursor(dictionary=True)
         
@@ -156,6 +200,9 @@ def swap_tires(tire1_id, tire2_id, cliente_id):
             "position": tire2['currentPosition'],
         }
 
+        # The swap events below replay these moves, so the pre-swap state must be the base
+        capture_bases(cursor, cliente_id, [tire1_id, tire2_id])
+
         # Update tire1 with tire2's original location
         cursor.execute("""
             UPDATE tires SET
@@ -222,15 +269,194 @@ def swap_tires(tire1_id, tire2_id, cliente_id):
         create_event_internal(connection, event2_data)
 
         connection.commit()
+        invalidate_tenant(cliente_id, 'tires', 'events')
         return jsonify({"message": "Permuta de pneus realizada com sucesso!"}), 200
     except Exception as e:
         connection.rollback() # Rollback on error
         print(f"Erro ao permutar pneus: {e}")
         return jsonify({"message": f"Erro ao permutar pneus: {e}"}), 500
     finally:
-        if connection and connection.is_connected():
+        if cursor is not None:
+            cursor.close()
+
+ROTATION_PLAN_MAX_MOVES = 200
+ROTATION_EVENT_TYPE = "Rodízio/Permutação (Swap)"
+LOCATION_COLUMNS = ('currentVehicleId', 'currentVehiclePlaca', 'currentAxle', 'currentPosition')
+
+class RotationPlanError(ValueError):
+    """Raised when a rotation plan is malformed or is not a permutation of the tires' positions."""
+
+    def __init__(self, message, **extra):
+        super().__init__(message)
+        self.extra = extra
+
+def _slot(vehicle_id, axle, position):
+    return (str(vehicle_id), str(axle), str(position))
+
+def parse_rotation_moves(moves):
+    """
+    Validates the shape of a plan. Each move is {"tireId", "toTireId"} (take the position
+    that tire has now) or {"tireId", "vehicleId", "axle", "position"}.
+    """
+    if not isinstance(moves, list) or not moves:
+        raise RotationPlanError("Envie 'moves' com a lista de movimentos do rodízio.")
+    if len(moves) > ROTATION_PLAN_MAX_MOVES:
+        raise RotationPlanError(f"Limite de {ROTATION_PLAN_MAX_MOVES} movimentos por plano.")
+    parsed = []
+    seen = set()
+    for index, move in enumerate(moves):
+        if not isinstance(move, dict) or not move.get('tireId'):
+            raise RotationPlanError(f"Movimento {index + 1}: 'tireId' é obrigatório.")
+        if move['tireId'] in seen:
+            raise RotationPlanError(f"Movimento {index + 1}: o pneu {move['tireId']} aparece mais de uma vez.")
+        seen.add(move['tireId'])
+        if move.get('toTireId'):
+            parsed.append((move['tireId'], ('tire', move['toTireId'])))
+        elif all(move.get(key) not in (None, '') for key in ('vehicleId', 'axle', 'position')):
+            parsed.append((move['tireId'], ('slot', _slot(move['vehicleId'], move['axle'], move['position']))))
+        else:
+            raise RotationPlanError(
+                f"Movimento {index + 1}: informe 'toTireId' ou 'vehicleId', 'axle' e 'position' de destino."
+            )
+    return parsed
+
+def parse_rotation_date(value):
+    """The plan's event date as AAAA-MM-DD; today when not given."""
+    if value in (None, ''):
+        return datetime.now().strftime("%Y-%m-%d")
+    try:
+        return datetime.strptime(str(value), "%Y-%m-%d").strftime("%Y-%m-%d")
+    except ValueError:
+        raise RotationPlanError("Parâmetro 'data' deve estar no formato AAAA-MM-DD.")
+
+def resolve_rotation_plan(parsed, tires):
+    """
+    Maps each tire to its destination and checks the plan is a permutation: every
+    destination is a position one of the plan's tires occupies now, and no two tires
+    end up in the same one. Returns {tireId: (origin slot, destination slot)}.
+    """
+    origins = {}
+    for tire_id, _ in parsed:
+        tire = tires[tire_id]
+        if tire['statusInicial'] != 'Em Uso' or tire['currentVehicleId'] is None:
+            raise RotationPlanError(f"O pneu {tire['numeroFogo']} não está montado em um veículo.")
+        origins[tire_id] = _slot(tire['currentVehicleId'], tire['currentAxle'], tire['currentPosition'])
+
+    vacated = set(origins.values())
+    resolved = {}
+    taken = set()
+    for tire_id, (kind, target) in parsed:
+        if kind == 'tire':
+            if target not in origins:
+                raise RotationPlanError(f"'toTireId' {target} deve ser um dos pneus do plano.")
+            target = origins[target]
+        if target not in vacated:
+            raise RotationPlanError(
+                "O plano deve ser uma permutação das posições atuais dos pneus informados.",
+                posicao={"vehicleId": target[0], "axle": target[1], "position": target[2]},
+            )
+        if target in taken:
+            raise RotationPlanError(
+                "Dois pneus foram enviados para a mesma posição.",
+                posicao={"vehicleId": target[0], "axle": target[1], "position": target[2]},
+            )
+        taken.add(target)
+        resolved[tire_id] = (origins[tire_id], target)
+    return resolved
+
+def apply_rotation_plan(data, cliente_id):
+    """
+    Moves any number of mounted tires, across one or more vehicles, in one transaction:
+    one locking SELECT, one CASE UPDATE for the new positions and one multi-row INSERT
+    for the swap events. With "dryRun": true the plan is only validated. Tires whose
+    latest event is after the plan's 'data' are replayed with the swap in place.
+    """
+    from controllers.event_controller import BATCH_EVENT_INSERT_SQL # Import here to avoid circular dependency
+    data = data if isinstance(data, dict) else {}
+    try:
+        parsed = parse_rotation_moves(data.get('moves'))
+        event_date = parse_rotation_date(data.get('data'))
+    except RotationPlanError as err:
+        return jsonify({"message": str(err)}), 400
+
+    connection = get_db_connection()
+    if connection is None:
+        return jsonify({"message": "Erro de conexão com o banco de dados"}), 500
+    cursor = None
+    try:
+        cursor = connection.cursor(dictionary=True)
+        tire_ids = [tire_id for tire_id, _ in parsed]
+        tires = lock_tire_states(cursor, cliente_id, tire_ids)
+        missing = [tire_id for tire_id in tire_ids if tire_id not in tires]
+        if missing:
+            connection.rollback()
+            return jsonify({"message": "Pneus não encontrados ou não pertencem ao cliente.", "tireIds": missing}), 404
+        try:
+            resolved = resolve_rotation_plan(parsed, tires)
+        except RotationPlanError as err:
+            connection.rollback()
+            return jsonify({"message": str(err), **err.extra}), 400
+
+        # Each destination is the current position of the tire that leaves it
+        previous = {origin: tires[tire_id] for tire_id, (origin, _) in resolved.items()}
+        moved = {tire_id: previous[target] for tire_id, (origin, target) in resolved.items() if origin != target}
+        summary = [
+            {"tireId": tire_id, "numeroFogo": tires[tire_id]['numeroFogo'],
+             "de": {"vehicleId": tires[tire_id]['currentVehicleId'], "vehiclePlaca": tires[tire_id]['currentVehiclePlaca'],
+                    "axle": tires[tire_id]['currentAxle'], "position": tires[tire_id]['currentPosition']},
+             "para": {"vehicleId": displaced['currentVehicleId'], "vehiclePlaca": displaced['currentVehiclePlaca'],
+                      "axle": displaced['currentAxle'], "position": displaced['currentPosition']}}
+            for tire_id, displaced in moved.items()
+        ]
+        if data.get('dryRun'):
+            connection.rollback()
+            return jsonify({"message": "Plano de rodízio válido.", "moves": summary}), 200
+        if not moved:
+            connection.rollback()
+            return jsonify({"message": "Nenhum pneu muda de posição neste plano.", "moves": []}), 200
+
+        updates = {tire_id: {column: displaced[column] for column in LOCATION_COLUMNS} for tire_id, displaced in moved.items()}
+        sql, values = build_case_update("tires", updates, cliente_id)
+        cursor.execute(sql, values)
+
+        plan_id = generate_unique_id()
+        rows = []
+        for tire_id, displaced in moved.items():
+            detalhes = {
+                "veiculoId": displaced['currentVehicleId'],
+                "veiculoPlaca": displaced['currentVehiclePlaca'],
+                "eixo": displaced['currentAxle'],
+                "posicao": displaced['currentPosition'],
+                "pneuPermutadoId": displaced['id'],
+                "pneuPermutadoNumeroFogo": displaced['numeroFogo'],
+                "planoRodizioId": plan_id,
+            }
+            observacoes = data.get('observacoes') or (
+                f"Rodízio: posição anterior do pneu {displaced['numeroFogo']}. "
+                f"Nova posição: {detalhes['veiculoPlaca']} - {detalhes['eixo']} {detalhes['posicao']}."
+            )
+            rows.append((generate_unique_id(), tire_id, ROTATION_EVENT_TYPE, event_date, observacoes,
+                         json.dumps(detalhes), cliente_id))
+        cursor.executemany(BATCH_EVENT_INSERT_SQL, rows)
+        for tire_id in moved:
+            if not is_in_order(event_date, tires[tire_id]['latestEventData']):
+                replay_tire(cursor, cliente_id, tire_id)  # back-dated: later events decide the position
+        refresh_tire_analytics(cursor, cliente_id, moved)
+
+        connection.commit()
+        invalidate_tenant(cliente_id, 'tires', 'events')
+        return jsonify({"message": "Rodízio realizado com sucesso!", "planoRodizioId": plan_id, "moves": summary}), 200
+    except mysql.connector.Error as err:
+        connection.rollback()
+        print(f"Erro MySQL ao aplicar rodízio: {err}")
+        return jsonify({"message": f"Erro ao aplicar rodízio: {err.msg}"}), 500
+    except Exception as e:
+        connection.rollback()
+        print(f"Erro ao aplicar rodízio: {e}")
+        return jsonify({"message": "Erro interno ao aplicar rodízio."}), 500
+    finally:
+        if cursor is not None:
             cursor.close()
-            connection.close()
 
 # Helper to generate unique IDs (same logic as frontend)
 def generate_unique_id():
@@ -0,0 +1,159 @@
+# controllers/tire_import_controller.py
+from db.connection import get_db_connection
+from db.cache import invalidate_tenant
+from controllers.tire_controller import tire_insert_values, generate_unique_id
+from controllers.analytics_controller import refresh_tire_analytics
+from flask import jsonify
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+import mysql.connector
+import csv
+import io
+
+BULK_IMPORT_CHUNK_SIZE = 500
+BULK_IMPORT_MAX_ROWS = 50000
+
+REQUIRED_FIELDS = ('numeroFogo', 'marca', 'modelo', 'medida', 'custoAquisicao', 'dataAquisicao',
+                   'fornecedor', 'statusInicial')
+DECIMAL_FIELDS = ('profundidadeSulcoInicial', 'custoAquisicao', 'quilometragemTotalPercorrida',
+                  'ultimaLeituraHodometroRegistrada', 'profundidadeSulcoAtual')
+INT_FIELDS = ('numeroRecapagens',)
+
+# createdAt/updatedAt come from the column defaults: a NOW() in VALUES would stop
+# executemany() from rewriting the chunk into a single multi-row INSERT.
+BULK_INSERT_SQL = """
+INSERT INTO tires (id, numeroFogo, marca, modelo, tipoPneu, medida, capacidadeCarga,
+                   desenhoBanda, profundidadeSulcoInicial, custoAquisicao, dataAquisicao,
+                   fornecedor, numeroNF, statusInicial, numeroRecapagens,
+                   quilometragemTotalPercorrida, ultimaLeituraHodometroRegistrada,
+                   profundidadeSulcoAtual, cliente_id)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+# Spreadsheets exported by Excel on Windows are cp1252, not UTF-8
+CSV_ENCODINGS = ('utf-8-sig', 'cp1252')
+
+def decode_csv(data):
+    """Decodes an uploaded CSV trying CSV_ENCODINGS in order; raises UnicodeDecodeError if none fits."""
+    for encoding in CSV_ENCODINGS[:-1]:
+        try:
+            return data.decode(encoding)
+        except UnicodeDecodeError:
+            pass
+    return data.decode(CSV_ENCODINGS[-1])
+
+def parse_tires_csv(text):
+    """Parses a CSV (comma or semicolon separated, header with the tire field names) into dicts."""
+    sample = text[:4096]
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=',;')
+    except csv.Error:
+        dialect = csv.excel
+    return [dict(row) for row in csv.DictReader(io.StringIO(text), dialect=dialect)]
+
+def validate_tire_row(row):
+    """
+    Normalizes one imported row (blank cells are dropped so column defaults apply,
+    numbers and dates are parsed).
+    Returns (tire, None) or (None, error message).
+    """
+    if not isinstance(row, dict):
+        return None, "Linha deve ser um objeto JSON."
+    tire = {key.strip(): (value.strip() if isinstance(value, str) else value)
+            for key, value in row.items() if key}
+    tire = {key: value for key, value in tire.items() if value not in ('', None)}
+
+    missing = [field for field in REQUIRED_FIELDS if tire.get(field) is None]
+    if missing:
+        return None, f"Campos obrigatórios ausentes: {', '.join(missing)}."
+    for field in DECIMAL_FIELDS:
+        if tire.get(field) is not None:
+            try:
+                tire[field] = Decimal(str(tire[field]).replace(',', '.'))
+            except InvalidOperation:
+                return None, f"Valor numérico inválido em '{field}': {tire[field]}."
+    for field in INT_FIELDS:
+        if tire.get(field) is not None:
+            try:
+                tire[field] = int(tire[field])
+            except (TypeError, ValueError):
+                return None, f"Valor inteiro inválido em '{field}': {tire[field]}."
+    try:
+        datetime.strptime(str(tire['dataAquisicao']), "%Y-%m-%d")
+    except ValueError:
+        return None, f"Data inválida em 'dataAquisicao' (use AAAA-MM-DD): {tire['dataAquisicao']}."
+    if not tire.get('id'):
+        tire['id'] = generate_unique_id()
+    return tire, None
+
+def _insert_chunk(connection, cursor, chunk, cliente_id, errors):
+    """Inserts one chunk in its own transaction; on failure retries row by row to report the culprits."""
+    try:
+        cursor.executemany(BULK_INSERT_SQL, [tire_insert_values(tire, cliente_id) for _, tire in chunk])
+        refresh_tire_analytics(cursor, cliente_id, [tire['id'] for _, tire in chunk])
+        connection.commit()
+        return len(chunk)
+    except mysql.connector.Error:
+        connection.rollback()
+
+    inserted = []
+    for row_number, tire in chunk:
+        try:
+            cursor.execute(BULK_INSERT_SQL, tire_insert_values(tire, cliente_id))
+            inserted.append(tire['id'])
+        except mysql.connector.Error as err:
+            errors.append({"linha": row_number, "id": tire['id'], "message": err.msg})
+    refresh_tire_analytics(cursor, cliente_id, inserted)
+    connection.commit()
+    return len(inserted)
+
+def bulk_import_tires(rows, cliente_id):
+    """
+    Validates and inserts many tires for a specific client with batched INSERTs,
+    committing every BULK_IMPORT_CHUNK_SIZE rows. Returns a per-row error report.
+    """
+    if not isinstance(rows, list) or not rows:
+        return jsonify({"message": "Envie uma lista de pneus (JSON) ou um arquivo CSV."}), 400
+    if len(rows) > BULK_IMPORT_MAX_ROWS:
+        return jsonify({"message": f"Limite de {BULK_IMPORT_MAX_ROWS} pneus por importação."}), 400
+
+    errors = []
+    valid = []
+    seen_ids = set()
+    for row_number, row in enumerate(rows, start=1):
+        tire, error = validate_tire_row(row)
+        if error is None and tire['id'] in seen_ids:
+            error = f"ID duplicado no arquivo: {tire['id']}."
+        if error is not None:
+            errors.append({"linha": row_number, "id": (row.get('id') or None) if isinstance(row, dict) else None, "message": error})
+            continue
+        seen_ids.add(tire['id'])
+        valid.append((row_number, tire))
+
+    inserted = 0
+    if valid:
+        connection = get_db_connection()
+        if connection is None:
+            return jsonify({"message": "Erro de conexão com o banco de dados"}), 500
+        cursor = None
+        try:
+            cursor = connection.cursor()
+            for start in range(0, len(valid), BULK_IMPORT_CHUNK_SIZE):
+                inserted += _insert_chunk(connection, cursor, valid[start:start + BULK_IMPORT_CHUNK_SIZE],
+                                          cliente_id, errors)
+        except Exception as e:
+            print(f"Erro ao importar pneus: {e}")
+            return jsonify({"message": "Erro interno ao importar pneus.", "inserted": inserted}), 500
+        finally:
+            if cursor is not None:
+                cursor.close()
+            if inserted:
+                invalidate_tenant(cliente_id, 'tires')
+
+    errors.sort(key=lambda error: error['linha'])
+    report = {"total": len(rows), "inserted": inserted, "failed": len(errors), "errors": errors}
+    if inserted == 0:
+        return jsonify({"message": "Nenhum pneu importado.", **report}), 400
+    if errors:
+        return jsonify({"message": "Importação concluída com erros.", **report}), 200
+    return jsonify({"message": "Pneus importados com sucesso!", **report}), 201
@@ -0,0 +1,295 @@
+# controllers/tire_projection.py
+"""
+Event-sourced tire state.
+
+A tire's state columns (TIRE_STATE_COLUMNS) are its projection base, stored in
+tire_projection_bases, folded with the events inserted after the base was captured
+(seq > baseEventSeq) in (data, timestamp, seq) order. Tires created or edited by hand
+have no base: their current state is authoritative until the next event captures it.
+"""
+import json
+import time
+
+try:
+    import orjson
+except ImportError:  # optional: the replay is ~5x slower decoding 'detalhes' with json
+    orjson = None
+
+from db.connection import get_db_connection
+from db.cache import invalidate_tenant
+from db.batch import chunked, build_case_update
+from controllers.tire_state import TIRE_STATE_COLUMNS, event_tire_updates, apply_events
+from controllers.analytics_controller import refresh_tenant_analytics
+from flask import jsonify
+import mysql.connector
+
+PROJECTION_CHUNK_SIZE = 500
+REBUILD_FETCH_SIZE = 5000
+NUMERIC_STATE_COLUMNS = ('numeroRecapagens', 'quilometragemTotalPercorrida', 'ultimaLeituraHodometroRegistrada',
+                         'profundidadeSulcoAtual')
+
+_STATE = ', '.join(f"t.{column}" for column in TIRE_STATE_COLUMNS)
+_BASE = ', '.join(f"b.{column} AS base_{column}" for column in TIRE_STATE_COLUMNS)
+
+CAPTURE_BASES_SQL = f"""
+INSERT INTO tire_projection_bases (tireId, cliente_id, {', '.join(TIRE_STATE_COLUMNS)}, baseEventSeq)
+SELECT t.id, t.cliente_id, {_STATE}, (SELECT MAX(e.seq) FROM tire_events e WHERE e.tireId = t.id)
+FROM tires t
+WHERE t.cliente_id = %s AND t.id IN ({{ids}})
+  AND NOT EXISTS (SELECT 1 FROM tire_projection_bases b WHERE b.tireId = t.id)
+ON DUPLICATE KEY UPDATE tireId = tireId
+"""
+
+# Current state plus the date of the newest event not yet folded into the base,
+# which tells whether a new event can simply be applied on top.
+LOCK_STATES_SQL = f"""
+SELECT t.id, t.numeroFogo, {_STATE}, b.tireId IS NOT NULL AS hasBase,
+       (SELECT MAX(e.data) FROM tire_events e
+        WHERE e.cliente_id = t.cliente_id AND e.tireId = t.id AND e.seq > COALESCE(b.baseEventSeq, 0)) AS latestEventData
+FROM tires t LEFT JOIN tire_projection_bases b ON b.tireId = t.id
+WHERE t.cliente_id = %s AND t.id IN ({{ids}})
+FOR UPDATE OF t
+"""
+
+REPLAY_BASE_SQL = f"""
+SELECT t.id, {_STATE}, {_BASE}, b.baseEventSeq
+FROM tires t JOIN tire_projection_bases b ON b.tireId = t.id
+WHERE t.id = %s AND t.cliente_id = %s
+FOR UPDATE OF t
+"""
+
+REPLAY_EVENTS_SQL = """
+SELECT tipo, detalhes FROM tire_events
+WHERE cliente_id = %s AND tireId = %s AND seq > %s
+ORDER BY data, timestamp, seq
+"""
+
+REBUILD_BASES_SQL = f"""
+SELECT t.id, {_STATE}, {_BASE}, b.baseEventSeq
+FROM tires t JOIN tire_projection_bases b ON b.tireId = t.id
+WHERE t.cliente_id = %s
+FOR UPDATE OF t
+"""
+
+# Served in order by idx_tire_events_cliente_tire_order: no sort, rows streamed as read
+REBUILD_EVENTS_SQL = """
+SELECT tireId, seq, tipo, detalhes FROM tire_events
+WHERE cliente_id = %s
+ORDER BY tireId, data, timestamp, seq
+"""
+
+def _in_list(sql, ids):
+    return sql.format(ids=', '.join(['%s'] * len(ids)))
+
+_loads = orjson.loads if orjson is not None else json.loads
+
+def decode_details(detalhes):
+    if isinstance(detalhes, (bytes, bytearray, str)):
+        try:
+            return _loads(detalhes)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return {}
+    return detalhes or {}
+
+def is_in_order(event_date, latest_event_date):
+    """True when an event dated `event_date` sorts after every replayable event of its tire."""
+    return latest_event_date is None or str(event_date)[:10] >= str(latest_event_date)[:10]
+
+def capture_bases(cursor, cliente_id, tire_ids):
+    """
+    Captures the current state of the tires that have no projection base yet. Call it
+    before changing their state or inserting their events.
+    """
+    tire_ids = list(tire_ids)
+    for ids in chunked(tire_ids, PROJECTION_CHUNK_SIZE):
+        cursor.execute(_in_list(CAPTURE_BASES_SQL, ids), [cliente_id, *ids])
+
+def lock_tire_states(cursor, cliente_id, tire_ids):
+    """
+    Locks the tires (FOR UPDATE), captures missing projection bases and returns
+    {tireId: row} with TIRE_STATE_COLUMNS, numeroFogo and latestEventData.
+    `cursor` must be a dictionary cursor.
+    """
+    tires = {}
+    for ids in chunked(list(tire_ids), PROJECTION_CHUNK_SIZE):
+        cursor.execute(_in_list(LOCK_STATES_SQL, ids), [cliente_id, *ids])
+        tires.update((row['id'], row) for row in cursor.fetchall())
+    missing_base = [tire_id for tire_id, row in tires.items() if not row['hasBase']]
+    if missing_base:
+        capture_bases(cursor, cliente_id, missing_base)
+        for tire_id in missing_base:
+            # every event recorded so far is now part of the base
+            tires[tire_id]['latestEventData'] = None
+    return tires
+
+def _same_value(column, current, projected):
+    if column in NUMERIC_STATE_COLUMNS and current is not None and projected is not None:
+        try:
+            return round(float(current), 2) == round(float(projected), 2)
+        except (TypeError, ValueError):
+            pass
+    return current == projected
+
+def state_changes(row, state):
+    """Columns of `state` that differ from the tire's stored columns in `row`."""
+    return {column: state[column] for column in TIRE_STATE_COLUMNS if not _same_value(column, row[column], state[column])}
+
+def base_state(row):
+    return {column: row[f"base_{column}"] for column in TIRE_STATE_COLUMNS}
+
+def replay_tire(cursor, cliente_id, tire_id):
+    """
+    Recomputes one tire's state from its base and its remaining events and writes
+    the columns that changed. Returns the changes ({} when the tire has no base).
+    Raises KeyError/ValueError when an event lacks the details its type requires.
+    """
+    cursor.execute(REPLAY_BASE_SQL, (tire_id, cliente_id))
+    row = cursor.fetchone()
+    if row is None:
+        return {}
+    cursor.execute(REPLAY_EVENTS_SQL, (cliente_id, tire_id, row['baseEventSeq'] or 0))
+    state = base_state(row)
+    for event in cursor.fetchall():
+        state.update(event_tire_updates(state, {'tipo': event['tipo'], 'detalhes': decode_details(event['detalhes'])}))
+    changes = state_changes(row, state)
+    if changes:
+        sql, values = build_case_update("tires", {tire_id: changes}, cliente_id)
+        cursor.execute(sql, values)
+    return changes
+
+ACQUISITION_STATE_SQL = f"""
+SELECT t.id, {_STATE}, t.profundidadeSulcoInicial
+FROM tires t
+WHERE t.id = %s AND t.cliente_id = %s
+FOR UPDATE
+"""
+
+REBASE_SQL = f"""
+INSERT INTO tire_projection_bases (tireId, cliente_id, {', '.join(TIRE_STATE_COLUMNS)}, baseEventSeq)
+VALUES (%s, %s, {', '.join(['%s'] * len(TIRE_STATE_COLUMNS))}, 0) AS new
+ON DUPLICATE KEY UPDATE {', '.join(f"{column} = new.{column}" for column in TIRE_STATE_COLUMNS)},
+    baseEventSeq = 0, capturedAt = CURRENT_TIMESTAMP
+"""
+
+def acquisition_state(tire, events):
+    """
+    The state a tire had before its first event, as far as the tire row tells: in
+    stock, no km, odometer or location, tread at profundidadeSulcoInicial and only
+    the retreads its event history does not account for.
+    """
+    retreads = sum(1 for event in events if event['tipo'] == 'Retorno da Recapagem')
+    recapagens = max((tire['numeroRecapagens'] or 0) - retreads, 0)
+    state = dict.fromkeys(TIRE_STATE_COLUMNS)
+    state.update(statusInicial='Em Estoque - Recapado' if recapagens else 'Em Estoque - Novo',
+                 numeroRecapagens=recapagens, quilometragemTotalPercorrida=0, ultimaLeituraHodometroRegistrada=0,
+                 profundidadeSulcoAtual=tire['profundidadeSulcoInicial'])
+    return state
+
+def rebase_from_acquisition(cursor, cliente_id, tire_id):
+    """
+    Replaces a tire's projection base with its acquisition state (baseEventSeq 0), so
+    its whole history becomes replayable. Only done when replaying every event from
+    that state reproduces the tire's current state: a tire edited by hand or with an
+    incomplete history keeps its base. Returns True when rebased. `cursor` must be a
+    dictionary cursor.
+    """
+    cursor.execute(ACQUISITION_STATE_SQL, (tire_id, cliente_id))
+    tire = cursor.fetchone()
+    if tire is None:
+        return False
+    cursor.execute(REPLAY_EVENTS_SQL, (cliente_id, tire_id, 0))
+    events = [{'tipo': event['tipo'], 'detalhes': decode_details(event['detalhes'])} for event in cursor.fetchall()]
+    base = acquisition_state(tire, events)
+    try:
+        state, _ = apply_events(base, events)
+    except (KeyError, TypeError, ValueError):
+        return False
+    if state_changes(tire, state):
+        return False
+    cursor.execute(REBASE_SQL, [tire_id, cliente_id, *(base[column] for column in TIRE_STATE_COLUMNS)])
+    return True
+
+def rebuild_tenant_states(connection, cliente_id):
+    """
+    Replays a tenant's whole history in one pass: the bases are read (and locked) up
+    front, then the events are streamed from an unbuffered cursor in replay order and
+    folded per tire. Only tires whose stored state differs are written, with batched
+    CASE UPDATEs, then the tenant's analytics are recomputed. Does not commit.
+    Returns a summary dict.
+    """
+    started = time.perf_counter()
+    cursor = connection.cursor(dictionary=True)
+    try:
+        cursor.execute(REBUILD_BASES_SQL, (cliente_id,))
+        bases = {row['id']: row for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+    states = {tire_id: base_state(row) for tire_id, row in bases.items()}
+    horizons = {tire_id: row['baseEventSeq'] or 0 for tire_id, row in bases.items()}
+
+    errors = {}
+    replayed = 0
+    stream = connection.cursor()  # unbuffered: rows stay on the server until fetched
+    try:
+        stream.execute(REBUILD_EVENTS_SQL, (cliente_id,))
+        while True:
+            rows = stream.fetchmany(REBUILD_FETCH_SIZE)
+            if not rows:
+                break
+            for tire_id, seq, tipo, detalhes in rows:
+                state = states.get(tire_id)
+                if state is None or seq <= horizons[tire_id]:
+                    continue
+                try:
+                    state.update(event_tire_updates(state, {'tipo': tipo, 'detalhes': decode_details(detalhes)}))
+                except (KeyError, TypeError, ValueError) as err:
+                    errors[tire_id] = f"{tipo}: {err}"
+                    del states[tire_id]  # keep the stored state of a tire with an invalid event
+                    continue
+                replayed += 1
+    finally:
+        stream.close()
+
+    updates = {}
+    for tire_id, state in states.items():
+        changes = state_changes(bases[tire_id], state)
+        if changes:
+            updates[tire_id] = changes
+    cursor = connection.cursor()
+    try:
+        for chunk in chunked(list(updates.items()), PROJECTION_CHUNK_SIZE):
+            sql, values = build_case_update("tires", dict(chunk), cliente_id)
+            cursor.execute(sql, values)
+        refresh_tenant_analytics(cursor, cliente_id)
+    finally:
+        cursor.close()
+    return {
+        "tires": len(bases),
+        "events": replayed,
+        "tiresUpdated": len(updates),
+        "errors": [{"tireId": tire_id, "message": message} for tire_id, message in errors.items()],
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+def rebuild_tire_states(cliente_id):
+    """
+    Rebuilds every tire of a client from its projection base and the events after it
+    (e.g. after fixing or importing history). Events folded into a base are not replayed.
+    """
+    connection = get_db_connection()
+    if connection is None:
+        return jsonify({"message": "Erro de conexão com o banco de dados"}), 500
+    try:
+        summary = rebuild_tenant_states(connection, cliente_id)
+        connection.commit()
+        if summary['tiresUpdated']:
+            invalidate_tenant(cliente_id, 'tires')
+        return jsonify({"message": "Estado dos pneus reconstruído a partir dos eventos.", **summary}), 200
+    except mysql.connector.Error as err:
+        connection.rollback()
+        print(f"Erro MySQL ao reconstruir estado dos pneus: {err}")
+        return jsonify({"message": f"Erro ao reconstruir estado dos pneus: {err.msg}"}), 500
+    except Exception as e:
+        connection.rollback()
+        print(f"Erro geral ao reconstruir estado dos pneus: {e}")
+        return jsonify({"message": "Erro interno ao reconstruir estado dos pneus."}), 500
@@ -0,0 +1,78 @@
+# controllers/tire_state.py
+"""
+Rules for how each event type changes a tire.
+
+Kept free of database access so the single-event path, the batch ingestion and any
+replay of a tire's history all apply exactly the same logic.
+"""
+
+# Tire columns read and written by the event rules
+TIRE_STATE_COLUMNS = (
+    'statusInicial', 'numeroRecapagens', 'quilometragemTotalPercorrida',
+    'ultimaLeituraHodometroRegistrada', 'profundidadeSulcoAtual',
+    'currentVehicleId', 'currentVehiclePlaca', 'currentAxle', 'currentPosition',
+)
+
+LOCATION_CLEARED = {
+    'currentVehicleId': None,
+    'currentVehiclePlaca': None,
+    'currentAxle': None,
+    'currentPosition': None,
+}
+
+def event_tire_updates(tire, event):
+    """
+    Returns the column updates `event` implies for a tire whose current state is `tire`
+    (a dict with TIRE_STATE_COLUMNS). Raises KeyError when required 'detalhes' are missing.
+    """
+    tipo = event['tipo']
+    detalhes = event.get('detalhes') or {}
+    tire_updates = {}
+
+    if tipo == 'Retorno da Recapagem':
+        tire_updates['numeroRecapagens'] = (tire['numeroRecapagens'] or 0) + 1
+        tire_updates['statusInicial'] = 'Em Estoque - Recapado'
+        tire_updates['profundidadeSulcoAtual'] = detalhes['novaProfundidadeSulco']
+    elif tipo == 'Descarte (Fim de Vida)':
+        tire_updates['statusInicial'] = 'Descartado'
+        tire_updates.update(LOCATION_CLEARED)
+    elif tipo == 'Envio para Recapagem':
+        tire_updates['statusInicial'] = 'Em Recapagem'
+        tire_updates.update(LOCATION_CLEARED)
+    elif tipo in ['Montagem em Veículo', 'Rodízio/Permutação', 'Rodízio/Permutação (Swap)']:
+        tire_updates['statusInicial'] = 'Em Uso'
+        tire_updates['currentVehicleId'] = detalhes['veiculoId']
+        tire_updates['currentVehiclePlaca'] = detalhes['veiculoPlaca']
+        tire_updates['currentAxle'] = detalhes['eixo']
+        tire_updates['currentPosition'] = detalhes['posicao']
+    elif tipo == 'Remoção de Veículo':
+        tire_updates['statusInicial'] = 'Em Estoque - Usado'
+        tire_updates.update(LOCATION_CLEARED)
+    elif tipo == 'Registro de Quilometragem e Sulco':
+        nova_leitura_hodometro = float(detalhes['quilometragemVeiculo'])
+        ultima_leitura = float(tire['ultimaLeituraHodometroRegistrada'] or 0)
+
+        if nova_leitura_hodometro > ultima_leitura:
+            km_rodados = nova_leitura_hodometro - ultima_leitura
+            tire_updates['quilometragemTotalPercorrida'] = float(tire['quilometragemTotalPercorrida'] or 0) + km_rodados
+            tire_updates['ultimaLeituraHodometroRegistrada'] = nova_leitura_hodometro
+        elif ultima_leitura == 0 and nova_leitura_hodometro > 0:
+            tire_updates['quilometragemTotalPercorrida'] = 0 # Reset for this tire's accumulated mileage
+            tire_updates['ultimaLeituraHodometroRegistrada'] = nova_leitura_hodometro
+
+        tire_updates['profundidadeSulcoAtual'] = detalhes['profundidadeSulcoAtual']
+
+    return tire_updates
+
+def apply_events(tire, events):
+    """
+    Folds `events` (already in chronological order) into a copy of `tire`.
+    Returns (new state, set of columns that changed).
+    """
+    state = dict(tire)
+    changed = set()
+    for event in events:
+        updates = event_tire_updates(state, event)
+        state.update(updates)
+        changed.update(updates)
+    return state, changed
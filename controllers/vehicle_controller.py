@@ -1,31 +1,159 @@
 # controllers/vehicle_controller.py
-from db.connection import create_db_connection
-from flask import jsonify
+from db.connection import get_db_connection
+from db.cache import tenant_cache, invalidate_tenant, cache_params, json_body_response
+from db.tombstones import record_tombstones
+from db.statements import writable_changes, build_update, UnknownColumnError
+from controllers.pagination import parse_list_params, build_list_query, build_page, count_total, ListParamsError
+from flask import jsonify, current_app
 import mysql.connector
 
-def get_all_vehicles(cliente_id):
-    """Fetches all vehicles from the database for a specific client."""
-    connection = create_db_connection()
+VEHICLE_SORTABLE = ('id', 'placa', 'modelo', 'ano', 'createdAt', 'updatedAt')
+VEHICLE_FILTERABLE = ('modelo', 'ano', 'eixos')
+VEHICLE_INCLUDES = ('tireCounts', 'layout')
+
+# Same order the dashboard draws the axles in; unknown names go last, alphabetically
+AXLE_ORDER = ('Eixo Dianteiro', 'Eixo 1', 'Eixo 2', 'Eixo 3', 'Eixo 4', 'Eixo 5', 'Eixo Traseiro')
+LAYOUT_TIRE_COLUMNS = ('id', 'numeroFogo', 'marca', 'modelo', 'medida', 'statusInicial', 'profundidadeSulcoAtual',
+                       'quilometragemTotalPercorrida', 'numeroRecapagens', 'currentVehicleId', 'currentAxle',
+                       'currentPosition')
+
+def parse_vehicle_include(args):
+    """Returns the `include` option of the vehicle list (None, 'tireCounts' or 'layout')."""
+    include = (args or {}).get('include')
+    if include and include not in VEHICLE_INCLUDES:
+        raise ListParamsError(f"Parâmetro 'include' inválido. Use: {', '.join(VEHICLE_INCLUDES)}.")
+    return include or None
+
+def mounted_tires_query(cliente_id, include, vehicle_ids=None):
+    """
+    Returns the (sql, values) reading the tires mounted on `vehicle_ids` (every vehicle
+    of the tenant when None), served by the (cliente_id, currentVehicleId) index.
+    """
+    where = "cliente_id = %s AND currentVehicleId IS NOT NULL"
+    values = [cliente_id]
+    if vehicle_ids is not None:
+        where = f"cliente_id = %s AND currentVehicleId IN ({', '.join(['%s'] * len(vehicle_ids))})"
+        values.extend(vehicle_ids)
+    if include == 'tireCounts':
+        return f"SELECT currentVehicleId, COUNT(*) AS total FROM tires WHERE {where} GROUP BY currentVehicleId", values
+    return f"SELECT {', '.join(LAYOUT_TIRE_COLUMNS)} FROM tires WHERE {where}", values
+
+def group_tires_by_axle(tires):
+    """
+    Groups mounted tires as [{"axle", "positions": {position: tire}}] in AXLE_ORDER.
+    Tires without an axle or position are returned separately.
+    """
+    axles = {}
+    unplaced = []
+    for tire in tires:
+        if not tire.get('currentAxle') or not tire.get('currentPosition'):
+            unplaced.append(tire)
+            continue
+        axles.setdefault(tire['currentAxle'], {})[tire['currentPosition']] = tire
+    order = {axle: index for index, axle in enumerate(AXLE_ORDER)}
+    ordered = sorted(axles, key=lambda axle: (order.get(axle, len(AXLE_ORDER)), axle))
+    return [{"axle": axle, "positions": axles[axle]} for axle in ordered], unplaced
+
+def attach_mounted_tires(vehicles, rows, include):
+    """Adds `pneusMontados` (and, for 'layout', `layout`/`pneusSemPosicao`) to each vehicle."""
+    if include == 'tireCounts':
+        counts = {row['currentVehicleId']: int(row['total']) for row in rows}
+        for vehicle in vehicles:
+            vehicle['pneusMontados'] = counts.get(vehicle['id'], 0)
+        return vehicles
+    by_vehicle = {}
+    for tire in rows:
+        by_vehicle.setdefault(tire['currentVehicleId'], []).append(tire)
+    for vehicle in vehicles:
+        mounted = by_vehicle.get(vehicle['id'], [])
+        vehicle['pneusMontados'] = len(mounted)
+        vehicle['layout'], vehicle['pneusSemPosicao'] = group_tires_by_axle(mounted)
+    return vehicles
+
+def get_all_vehicles(cliente_id, args=None):
+    """
+    Fetches the vehicles of a specific client, optionally filtered and sorted.
+    With `limit`/`after` the result is a keyset-paginated page instead of a plain list;
+    `include=tireCounts` or `include=layout` adds the mounted tires of each vehicle.
+    Serialized responses are cached per (cliente_id, query string) until a write invalidates them.
+    """
+    try:
+        params = parse_list_params(args, VEHICLE_SORTABLE, VEHICLE_FILTERABLE)
+        include = parse_vehicle_include(args)
+    except ListParamsError as err:
+        return jsonify({"message": str(err)}), 400
+    key = cache_params(args)
+    body = tenant_cache.get(cliente_id, 'vehicles', key)
+    if body is not None:
+        return json_body_response(body)
+    connection = get_db_connection(readonly=True)
     if connection is None:
         return jsonify({"message": "Erro de conexão com o banco de dados"}), 500
+    cursor = None
     try:
+        generation = tenant_cache.generation(cliente_id)
         cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM vehicles WHERE cliente_id = %s", (cliente_id,))
+        sql, values = build_list_query("vehicles", cliente_id, params)
+        cursor.execute(sql, values)
         vehicles = cursor.fetchall()
-        return jsonify(vehicles), 200
+        payload = (build_page(vehicles, params, count_total(cursor, "vehicles", cliente_id, params))
+                   if params['paginate'] else vehicles)
+        if include:
+            listed = payload['items'] if params['paginate'] else vehicles
+            if listed:
+                ids = [vehicle['id'] for vehicle in listed] if params['paginate'] else None
+                cursor.execute(*mounted_tires_query(cliente_id, include, ids))
+                attach_mounted_tires(listed, cursor.fetchall(), include)
+        body = current_app.json.dumps(payload)
+        depends_on = ('vehicles', 'tires') if include else ('vehicles',)
+        tenant_cache.set(cliente_id, 'vehicles', key, body, depends_on=depends_on, generation=generation)
+        return json_body_response(body)
     except Exception as e:
         print(f"Erro ao buscar veículos: {e}")
         return jsonify({"message": "Erro ao buscar veículos."}), 500
     finally:
-        if connection and connection.is_connected():
+        if cursor is not None:
+            cursor.close()
+
+def get_vehicle_layout(vehicle_id, cliente_id):
+    """
+    Returns a vehicle with its mounted tires grouped by axle and position, read with
+    one join on the (cliente_id, currentVehicleId) index of tires.
+    """
+    connection = get_db_connection(readonly=True)
+    if connection is None:
+        return jsonify({"message": "Erro de conexão com o banco de dados"}), 500
+    cursor = None
+    try:
+        cursor = connection.cursor(dictionary=True)
+        tire_columns = ', '.join(f"t.{column} AS tire_{column}" for column in LAYOUT_TIRE_COLUMNS)
+        cursor.execute(f"""
+            SELECT v.id, v.placa, v.modelo, v.ano, v.eixos, {tire_columns}
+            FROM vehicles v
+            LEFT JOIN tires t ON t.cliente_id = v.cliente_id AND t.currentVehicleId = v.id
+            WHERE v.id = %s AND v.cliente_id = %s
+        """, (vehicle_id, cliente_id))
+        rows = cursor.fetchall()
+        if not rows:
+            return jsonify({"message": "Veículo não encontrado ou não pertence ao cliente."}), 404
+        vehicle = {column: rows[0][column] for column in ('id', 'placa', 'modelo', 'ano', 'eixos')}
+        tires = [{column: row[f"tire_{column}"] for column in LAYOUT_TIRE_COLUMNS}
+                 for row in rows if row['tire_id'] is not None]
+        axles, unplaced = group_tires_by_axle(tires)
+        return jsonify({"vehicle": vehicle, "pneusMontados": len(tires), "layout": axles, "pneusSemPosicao": unplaced}), 200
+    except Exception as e:
+        print(f"Erro ao buscar layout do veículo: {e}")
+        return jsonify({"message": "Erro ao buscar layout do veículo."}), 500
+    finally:
+        if cursor is not None:
             cursor.close()
-            connection.close()
 
 def create_vehicle(data, cliente_id):
     """Creates a new vehicle in the database for a specific client."""
-    connection = create_db_connection()
+    connection = get_db_connection()
     if connection is None:
         return jsonify({"message": "Erro de conexão com o banco de dados"}), 500
+    cursor = None
     try:
         cursor = connection.cursor()
         sql = """
@@ -37,6 +165,7 @@ def create_vehicle(data, cliente_id):
         )
         cursor.execute(sql, values)
         connection.commit()
+        invalidate_tenant(cliente_id, 'vehicles')
         return jsonify({"message": "Veículo cadastrado com sucesso!", "id": data['id']}), 201
     except mysql.connector.Error as err:
         print(f"Erro MySQL ao cadastrar veículo: {err}")
@@ -45,36 +174,31 @@ def create_vehicle(data, cliente_id):
         print(f"Erro geral ao cadastrar veículo: {e}")
         return jsonify({"message": "Erro interno ao cadastrar veículo."}), 500
     finally:
-        if connection and connection.is_connected():
+        if cursor is not None:
             cursor.close()
-            connection.close()
 
 def update_vehicle(vehicle_id, data, cliente_id):
-    """Updates an existing vehicle in the database for a specific client."""
-    connection = create_db_connection()
+    """
+    Updates an existing vehicle in the database for a specific client.
+    Only columns of the vehicles table are accepted (see update_tire).
+    """
+    try:
+        changes = writable_changes('vehicles', data)
+    except UnknownColumnError as err:
+        return jsonify({"message": str(err)}), 400
+    if not changes:
+        return jsonify({"message": "Nenhum dado para atualizar."}), 400
+    connection = get_db_connection()
     if connection is None:
         return jsonify({"message": "Erro de conexão com o banco de dados"}), 500
     try:
-        cursor = connection.cursor()
-        set_clauses = []
-        values = []
-        for key, value in data.items():
-            if key not in ['id', 'createdAt', 'cliente_id']: # Prevent updating immutable fields
-                set_clauses.append(f"{key} = %s")
-                values.append(value)
-        set_clauses.append("updatedAt = NOW()")
-
-        if not set_clauses:
-            return jsonify({"message": "Nenhum dado para atualizar."}), 400
-
-        sql = f"UPDATE vehicles SET {', '.join(set_clauses)} WHERE id = %s AND cliente_id = %s"
-        values.extend([vehicle_id, cliente_id])
-
-        cursor.execute(sql, values)
+        sql, values = build_update('vehicles', changes)
+        updated = connection.execute_prepared(sql, [*values, vehicle_id, cliente_id]).rowcount
         connection.commit()
 
-        if cursor.rowcount == 0:
+        if updated == 0:
             return jsonify({"message": "Veículo não encontrado ou não pertence ao cliente."}), 404
+        invalidate_tenant(cliente_id, 'vehicles')
         return jsonify({"message": "Veículo atualizado com sucesso!"}), 200
     except mysql.connector.Error as err:
         print(f"Erro MySQL ao atualizar veículo: {err}")
@@ -82,27 +206,38 @@ def update_vehicle(vehicle_id, data, cliente_id):
     except Exception as e:
         print(f"Erro geral ao atualizar veículo: {e}")
         return jsonify({"message": "Erro interno ao atualizar veículo."}), 500
-    finally:
-        if connection and connection.is_connected():
-            cursor.close()
-            connection.close()
 
 def delete_vehicle(vehicle_id, cliente_id):
     """Deletes a vehicle from the database for a specific client."""
-    connection = create_db_connection()
+    connection = get_db_connection()
     if connection is None:
         return jsonify({"message": "Erro de conexão com o banco de dados"}), 500
+    cursor = None
     try:
         cursor = connection.cursor()
+        # ON DELETE SET NULL does not fire ON UPDATE CURRENT_TIMESTAMP; touch the mounted
+        # tires so delta sync picks up their cleared currentVehicleId
+        cursor.execute("UPDATE tires SET updatedAt = NOW() WHERE cliente_id = %s AND currentVehicleId = %s",
+                       (cliente_id, vehicle_id))
+        # Their events would put them back on the deleted vehicle: rebase them on the next event
+        cursor.execute(
+            "DELETE b FROM tire_projection_bases b JOIN tires t ON t.id = b.tireId "
+            "WHERE t.cliente_id = %s AND t.currentVehicleId = %s",
+            (cliente_id, vehicle_id)
+        )
+        cursor.execute("UPDATE tire_analytics SET currentVehicleId = NULL WHERE cliente_id = %s AND currentVehicleId = %s",
+                       (cliente_id, vehicle_id))
         cursor.execute("DELETE FROM vehicles WHERE id = %s AND cliente_id = %s", (vehicle_id, cliente_id))
-        connection.commit()
         if cursor.rowcount == 0:
+            connection.rollback()
             return jsonify({"message": "Veículo não encontrado ou não pertence ao cliente."}), 404
+        record_tombstones(cursor, cliente_id, 'vehicles', [vehicle_id])
+        connection.commit()
+        invalidate_tenant(cliente_id, 'vehicles', 'tires') # mounted tires lose currentVehicleId (ON DELETE SET NULL)
         return jsonify({"message": "Veículo excluído com sucesso!"}), 200
     except Exception as e:
         print(f"Erro ao excluir veículo: {e}")
         return jsonify({"message": "Erro ao excluir veículo."}), 500
     finally:
-        if connection and connection.is_connected():
+        if cursor is not None:
             cursor.close()
-            connection.close()
@@ -0,0 +1,68 @@
+# db/async_connection.py
+import asyncio
+from contextlib import asynccontextmanager
+
+import aiomysql
+
+from db.connection import load_database_config
+
+_pool = None
+_acquire_timeout = None
+
+
+async def init_async_pool():
+    """Creates the process-wide aiomysql pool (ASGI startup)."""
+    global _pool, _acquire_timeout
+    if _pool is None:
+        config = load_database_config()
+        _acquire_timeout = config['pool_timeout']
+        _pool = await aiomysql.create_pool(
+            host=config['host'],
+            port=config['port'],
+            user=config['user'],
+            password=config['password'],
+            db=config['database'],
+            minsize=0,
+            maxsize=config.get('async_pool_size', config['pool_size']),
+            pool_recycle=config['pool_recycle'],
+            autocommit=False,
+            charset='utf8mb4',
+        )
+    return _pool
+
+
+async def close_async_pool():
+    """Closes the pool and waits for its connections (ASGI shutdown)."""
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        await _pool.wait_closed()
+        _pool = None
+
+
+def async_pool_stats():
+    if _pool is None:
+        return {"size": 0, "open": 0, "idle": 0, "in_use": 0}
+    return {"size": _pool.maxsize, "open": _pool.size, "idle": _pool.freesize, "in_use": _pool.size - _pool.freesize}
+
+
+@asynccontextmanager
+async def async_db_cursor(dictionary=True, unbuffered=False):
+    """
+    Yields a cursor on a pooled connection for the duration of the block.
+    Waits at most `pool_timeout` seconds for a free connection. The transaction the
+    reads opened is rolled back before the connection goes back to the pool (aiomysql
+    closes a connection released mid-transaction, e.g. after an error).
+    """
+    pool = await init_async_pool()
+    connection = await asyncio.wait_for(pool.acquire(), _acquire_timeout)
+    if unbuffered:
+        cursor_class = aiomysql.SSDictCursor if dictionary else aiomysql.SSCursor
+    else:
+        cursor_class = aiomysql.DictCursor if dictionary else aiomysql.Cursor
+    try:
+        async with connection.cursor(cursor_class) as cursor:
+            yield cursor
+        await connection.rollback()
+    finally:
+        pool.release(connection)
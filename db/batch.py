@@ -0,0 +1,37 @@
+# db/batch.py
+
+
+def chunked(items, size):
+    """Yields consecutive slices of `items` with at most `size` elements."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def build_case_update(table, rows, cliente_id, touch_updated_at=True):
+    """
+    Builds one UPDATE that writes different values to many rows of a tenant:
+
+        UPDATE t SET col = CASE id WHEN %s THEN %s ... ELSE col END, ...
+        WHERE cliente_id = %s AND id IN (...)
+
+    `rows` maps row id -> {column: value}; a row only changes the columns it lists.
+    Column names must come from trusted code, never from the request.
+    """
+    columns = sorted({column for changes in rows.values() for column in changes})
+    set_clauses = []
+    values = []
+    for column in columns:
+        whens = []
+        for row_id, changes in rows.items():
+            if column in changes:
+                whens.append("WHEN %s THEN %s")
+                values.extend([row_id, changes[column]])
+        set_clauses.append(f"{column} = CASE id {' '.join(whens)} ELSE {column} END")
+    if touch_updated_at:
+        set_clauses.append("updatedAt = NOW()")
+    ids = list(rows)
+    values.append(cliente_id)
+    values.extend(ids)
+    sql = (f"UPDATE {table} SET {', '.join(set_clauses)} "
+           f"WHERE cliente_id = %s AND id IN ({', '.join(['%s'] * len(ids))})")
+    return sql, values
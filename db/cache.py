@@ -0,0 +1,273 @@
+# db/cache.py
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from flask import Response
+
+DEFAULT_CACHE_CONFIG = {
+    'enabled': True,
+    'max_bytes': 64 * 1024 * 1024,
+    'default_ttl': 60,
+    'backend': 'local',
+    'redis_url': 'redis://localhost:6379/0',
+    'redis_channel': 'gestao_pneus:cache_invalidation',
+}
+
+
+def load_cache_config():
+    """Returns CACHE_CONFIG from config.py merged over the defaults."""
+    config = dict(DEFAULT_CACHE_CONFIG)
+    try:
+        from config import CACHE_CONFIG
+        config.update(CACHE_CONFIG)
+    except ImportError:
+        pass
+    return config
+
+
+def _sizeof(value):
+    if isinstance(value, (str, bytes, bytearray)):
+        return len(value)
+    return len(json.dumps(value, default=str))
+
+
+class TenantCache:
+    """
+    In-process LRU cache of per-tenant reads (list bodies, aggregates, snapshots).
+
+    Entries are keyed by (cliente_id, name, params) and record which resources
+    ('tires', 'vehicles', 'events') they were computed from, so a write only drops
+    the entries of that tenant that actually depend on what changed. Once the cached
+    values exceed `max_bytes` the least recently used entries are evicted. Entries
+    also carry a TTL that bounds how long another Gunicorn worker can serve a value
+    computed before a write when invalidations are not propagated between workers.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_CONFIG['max_bytes'], default_ttl=DEFAULT_CACHE_CONFIG['default_ttl'],
+                 enabled=True):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.enabled = enabled
+        self.bus = None  # RedisInvalidationBus, subscribed before the first lookup of each process
+        self._entries = OrderedDict()  # key -> (value, depends_on, expires_at, size)
+        self._generations = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def generation(self, cliente_id):
+        """Read before computing a value; pass it to set() so a concurrent write wins."""
+        with self._lock:
+            return self._generations.get(cliente_id, 0)
+
+    def get(self, cliente_id, name, params=()):
+        if not self.enabled:
+            return None
+        if self.bus is not None:
+            self.bus.start()  # a worker that never wrote must still hear the others' writes
+        key = (cliente_id, name, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] < time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, cliente_id, name, params, value, depends_on, ttl=None, generation=None):
+        if not self.enabled:
+            return
+        size = _sizeof(value)
+        if size > self.max_bytes // 4:
+            return  # one very large tenant must not flush everybody else
+        key = (cliente_id, name, params)
+        expires_at = time.monotonic() + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            if generation is not None and generation != self._generations.get(cliente_id, 0):
+                return  # invalidated while the value was being computed
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, frozenset(depends_on), expires_at, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        self._bytes -= self._entries.pop(key)[3]
+
+    def invalidate(self, cliente_id, resources):
+        resources = set(resources)
+        with self._lock:
+            self._generations[cliente_id] = self._generations.get(cliente_id, 0) + 1
+            stale = [key for key, entry in self._entries.items()
+                     if key[0] == cliente_id and entry[1] & resources]
+            for key in stale:
+                self._remove(key)
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+class RedisInvalidationBus:
+    """
+    Broadcasts invalidations to the other Gunicorn workers through Redis pub/sub
+    (a local redis-server is enough). Without the `redis` package or a reachable
+    server the cache stays process-local and the TTL bounds staleness.
+    """
+
+    def __init__(self, cache, url, channel):
+        self.cache = cache
+        self.url = url
+        self.channel = channel
+        self._client = None
+        self._pid = None
+        self._origin = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        # Started lazily per process: the listener thread does not survive Gunicorn's fork
+        if self._pid == os.getpid():
+            return self._client
+        with self._lock:
+            if self._pid == os.getpid():
+                return self._client
+            self._origin = uuid.uuid4().hex
+            try:
+                import redis
+                self._client = redis.Redis.from_url(self.url)
+                pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                threading.Thread(target=self._listen, args=(pubsub,), daemon=True).start()
+            except Exception as e:
+                print(f"Cache: invalidação entre workers desativada: {e}")
+                self._client = None
+            self._pid = os.getpid()
+            return self._client
+
+    def _listen(self, pubsub):
+        try:
+            for message in pubsub.listen():
+                payload = json.loads(message['data'])
+                if payload['origin'] != self._origin:
+                    self.cache.invalidate(payload['cliente_id'], payload['resources'])
+                    _notify_invalidation(payload['cliente_id'], payload['resources'])
+        except Exception as e:
+            print(f"Cache: assinatura de invalidações encerrada: {e}")
+
+    def start(self):
+        self._ensure_started()
+
+    def publish(self, cliente_id, resources):
+        client = self._ensure_started()
+        if client is None:
+            return
+        try:
+            client.publish(self.channel, json.dumps(
+                {"origin": self._origin, "cliente_id": cliente_id, "resources": list(resources)}
+            ))
+        except Exception as e:
+            print(f"Cache: falha ao publicar invalidação: {e}")
+
+
+_config = load_cache_config()
+tenant_cache = TenantCache(max_bytes=_config['max_bytes'], default_ttl=_config['default_ttl'],
+                           enabled=_config['enabled'])
+invalidation_bus = None
+if _config['backend'] == 'redis':
+    invalidation_bus = RedisInvalidationBus(tenant_cache, _config['redis_url'], _config['redis_channel'])
+    tenant_cache.bus = invalidation_bus
+
+
+def start_invalidation_bus():
+    """Subscribes this process to the other workers' invalidations (no-op when local or already subscribed)."""
+    if invalidation_bus is not None:
+        invalidation_bus.start()
+
+
+def init_app(app):
+    # Checked on every request: the subscription is per process and Gunicorn forks after import
+    app.before_request(start_invalidation_bus)
+
+
+_invalidation_listeners = []
+_write_listeners = []
+
+
+def add_invalidation_listener(listener):
+    """Registers listener(cliente_id, resources), called for local and relayed invalidations."""
+    if listener not in _invalidation_listeners:
+        _invalidation_listeners.append(listener)
+
+
+def add_write_listener(listener):
+    """
+    Registers listener(cliente_id, resources), called for this process's own writes
+    before their cache entries are dropped (not for invalidations relayed by Redis).
+    """
+    if listener not in _write_listeners:
+        _write_listeners.append(listener)
+
+
+def _notify(listeners, cliente_id, resources):
+    for listener in listeners:
+        try:
+            listener(cliente_id, resources)
+        except Exception as e:
+            print(f"Cache: erro no ouvinte de invalidação: {e}")
+
+
+def _notify_invalidation(cliente_id, resources):
+    _notify(_invalidation_listeners, cliente_id, resources)
+
+
+def invalidate_tenant(cliente_id, *resources):
+    """Called by the write paths after commit with the resources they modified."""
+    _notify(_write_listeners, cliente_id, resources)
+    tenant_cache.invalidate(cliente_id, resources)
+    _notify_invalidation(cliente_id, resources)
+    if invalidation_bus is not None:
+        invalidation_bus.publish(cliente_id, resources)
+
+
+def cache_stats():
+    stats = tenant_cache.stats()
+    stats["backend"] = 'redis' if invalidation_bus is not None else 'local'
+    return stats
+
+
+def cache_params(args, exclude=('cliente_id',)):
+    """Canonical, hashable form of a request's query parameters for cache keys."""
+    if not args:
+        return ()
+    items = args.items(multi=True) if hasattr(args, 'getlist') else args.items()
+    return tuple(sorted((key, value) for key, value in items if key not in exclude))
+
+
+def json_body_response(body, status=200):
+    """Wraps an already-serialized JSON body (e.g. a cache hit) in a response."""
+    return Response(body, mimetype='application/json'), status
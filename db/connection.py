@@ -1,17 +1,195 @@
 # db/connection.py
+import threading
+
 import mysql.connector
 from mysql.connector import Error
+from flask import g, has_app_context, has_request_context, request
+
+from db.pool import ConnectionPool
+from db.replicas import DEFAULT_REPLICA_SETTINGS, REPLICA_SETTINGS, build_replica_set
+import db.cache
+from db.cache import add_invalidation_listener, add_write_listener
+from db.versions import bump_list_versions
+
+# Usado quando não existe config.py (copie config.example.py para config.py)
+DEFAULT_DATABASE_CONFIG = {
+    'host': "34.68.169.112",      # Ou o IP/hostname do seu servidor MySQL
+    'user': "root",
+    'password': "adminpass!!",
+    'database': "tire_management_db",
+    'port': 3306,
+    'pool_size': 10,
+    'pool_timeout': 30,
+    'pool_recycle': 1800,
+    'pool_health_check_interval': 30,
+    'pool_statement_cache_size': 64,
+    **DEFAULT_REPLICA_SETTINGS,
+}
+
+POOL_SETTINGS = ('pool_size', 'pool_timeout', 'pool_recycle', 'pool_health_check_interval',
+                 'pool_statement_cache_size', 'async_pool_size', *REPLICA_SETTINGS)
+
+_pool = None
+_replicas = None
+_replicas_loaded = False
+_pool_lock = threading.Lock()
+
+
+def load_database_config():
+    """Returns DATABASE_CONFIG from config.py merged over the defaults."""
+    config = dict(DEFAULT_DATABASE_CONFIG)
+    try:
+        from config import DATABASE_CONFIG
+        config.update(DATABASE_CONFIG)
+    except ImportError:
+        pass
+    return config
+
+
+def _connect_args(config):
+    return {key: value for key, value in config.items() if key not in POOL_SETTINGS}
+
+
+def _pool_settings(config):
+    return {
+        'size': config['pool_size'],
+        'timeout': config['pool_timeout'],
+        'recycle': config['pool_recycle'],
+        'health_check_interval': config['pool_health_check_interval'],
+        'statement_cache_size': config['pool_statement_cache_size'],
+    }
+
+
+def get_pool():
+    """Returns the process-wide connection pool, creating it on first use (after fork)."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                config = load_database_config()
+                _pool = ConnectionPool(_connect_args(config), **_pool_settings(config))
+    return _pool
+
+
+def get_replicas():
+    """Returns the process-wide ReplicaSet, or None when DATABASE_CONFIG has no replicas."""
+    global _replicas, _replicas_loaded
+    if not _replicas_loaded:
+        with _pool_lock:
+            if not _replicas_loaded:
+                config = load_database_config()
+                _replicas = build_replica_set(config, _connect_args(config), _pool_settings(config))
+                if _replicas is not None:
+                    add_invalidation_listener(_replicas.note_write)
+                    if db.cache.invalidation_bus is None:
+                        print("Réplicas: com CACHE_CONFIG['backend'] = 'local', a leitura das próprias escritas só "
+                              "vale no worker que escreveu; use o backend 'redis' com mais de um worker.")
+                _replicas_loaded = True
+    return _replicas
+
+
+def _request_cliente_id():
+    if not has_request_context():
+        return None
+    cliente_id = request.args.get('cliente_id')
+    if not cliente_id and request.is_json:
+        body = request.get_json(silent=True)
+        if isinstance(body, dict):
+            cliente_id = body.get('cliente_id')
+    return cliente_id
+
+
+def _get_read_connection():
+    """A replica connection for the current request, or None to read from the primary."""
+    replicas = get_replicas()
+    if replicas is None:
+        return None
+    if has_app_context() and 'db_read_connection' in g:
+        return g.db_read_connection
+    replica = replicas.choose(_request_cliente_id())
+    if replica is None:
+        return None
+    try:
+        connection = replica.pool.acquire()
+    except Exception as err:
+        replica.healthy = False  # until the next check; this read goes to the primary
+        print(f"Erro ao obter conexão da réplica {replica.name}: '{err}'")
+        return None
+    if has_app_context():
+        g.db_read_connection = connection
+    return connection
+
+
+def get_db_connection(readonly=False):
+    """
+    Returns a pooled connection. Inside a Flask request the same connection is
+    reused by every controller and released by `release_db_connection` at teardown.
+    With `readonly=True` (list and report queries that never write) the connection
+    may come from a read replica; see db/replicas.py.
+    """
+    try:
+        if readonly:
+            connection = _get_read_connection()
+            if connection is not None:
+                return connection
+        if not has_app_context():
+            return get_pool().acquire()
+        if 'db_connection' not in g:
+            g.db_connection = get_pool().acquire()
+        return g.db_connection
+    except Exception as err:
+        print(f"Erro ao obter conexão do pool: '{err}'")
+        return None
+
+
+def release_db_connection(exception=None):
+    """Teardown handler: returns the request's connections to their pools."""
+    for key in ('db_connection', 'db_read_connection'):
+        connection = g.pop(key, None)
+        if connection is not None:
+            connection.close()
+
+
+def replica_lag_margin():
+    """Seconds a replica read may trail the primary: the lag allowed plus its growth until the next check."""
+    replicas = get_replicas()
+    return replicas.max_lag + replicas.check_interval if replicas is not None else 0
+
+
+def _bump_list_versions(cliente_id, resources):
+    """Write listener: bumps the list versions (ETags) on the connection the write committed on."""
+    connection = get_db_connection()
+    if connection is None:
+        return
+    try:
+        bump_list_versions(connection, cliente_id, resources)
+    except Exception as err:
+        print(f"Erro ao atualizar versão das listas: '{err}'")
+    finally:
+        if not has_app_context():
+            connection.close()
+
+
+add_write_listener(_bump_list_versions)
+
+
+def replica_stats():
+    replicas = get_replicas()
+    return replicas.stats() if replicas is not None else None
+
+
+def init_app(app):
+    app.teardown_appcontext(release_db_connection)
+    # Before the first request (and before Gunicorn forks): writes made before this
+    # worker's first replica read must already pin their tenant to the primary
+    get_replicas()
+
 
 def create_db_connection():
+    """Opens a dedicated (non-pooled) connection, for scripts such as setup.py."""
     connection = None
     try:
-        connection = mysql.connector.connect(
-            host="34.68.169.112",      # Ou o IP/hostname do seu servidor MySQL
-            user="root",
-            passwd="adminpass!!",
-            database="tire_management_db"
-        )
-        print("Conexão com o banco de dados MySQL bem-sucedida")
+        connection = mysql.connector.connect(**_connect_args(load_database_config()))
     except Error as err:
         print(f"Erro: '{err}'")
     return connection
@@ -20,4 +198,5 @@ def create_db_connection():
 if __name__ == "__main__":
     conn = create_db_connection()
     if conn:
-        conn.close()
\ No newline at end of file
+        print("Conexão com o banco de dados MySQL bem-sucedida")
+        conn.close()
@@ -0,0 +1,157 @@
+# db/instrumentation.py
+"""
+Hooks for observing database work without touching the controllers.
+
+PooledConnection.cursor() wraps every cursor in an InstrumentedCursor, which times
+each statement, including the fetches of its rows (with an unbuffered cursor most of
+a scan's time is spent there, after execute() returned), and reports it to the
+registered statement observers once its result is read; every fetch is also
+reported to the fetch observers. The pool reports connection checkout waits to the
+acquire observers. With no observers the cost is two perf_counter() calls per
+statement.
+"""
+import time
+
+statement_observers = []
+fetch_observers = []
+acquire_observers = []
+
+
+def add_statement_observer(observer):
+    """
+    Registers observer(statement, params, seconds, error) for every executed statement;
+    `seconds` covers execute() and the fetches of its rows.
+    """
+    if observer not in statement_observers:
+        statement_observers.append(observer)
+
+
+def add_fetch_observer(observer):
+    """Registers observer(seconds) for every fetchone()/fetchmany()/fetchall() on a pooled cursor."""
+    if observer not in fetch_observers:
+        fetch_observers.append(observer)
+
+
+def add_acquire_observer(observer):
+    """Registers observer(seconds) for every connection checked out of the pool."""
+    if observer not in acquire_observers:
+        acquire_observers.append(observer)
+
+
+def notify_acquire(seconds):
+    for observer in acquire_observers:
+        try:
+            observer(seconds)
+        except Exception as e:
+            print(f"Erro no observador de conexões: {e}")
+
+
+def _notify_fetch(seconds):
+    for observer in fetch_observers:
+        try:
+            observer(seconds)
+        except Exception as e:
+            print(f"Erro no observador de leitura: {e}")
+
+
+def _notify_statement(statement, params, seconds, error):
+    for observer in statement_observers:
+        try:
+            observer(statement, params, seconds, error)
+        except Exception as e:
+            print(f"Erro no observador de SQL: {e}")
+
+
+class InstrumentedCursor:
+    """
+    Cursor proxy that times execute()/executemany() and the row fetches. A statement
+    is reported once, with its execute() time plus the time spent fetching its rows:
+    when it returns no rows, when its result is exhausted, or when the cursor runs
+    another statement or is closed.
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._pending = None  # [statement, params, seconds, error] of the result being read
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        if fetch_observers or statement_observers:
+            return iter(self.fetchone, None)
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _report(self):
+        pending, self._pending = self._pending, None
+        if pending is not None and statement_observers:
+            _notify_statement(*pending)
+
+    def _timed(self, method, statement, params):
+        self._report()
+        if not statement_observers:
+            return method(statement, params)
+        started = time.perf_counter()
+        error = None
+        try:
+            return method(statement, params)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._pending = [statement, params, time.perf_counter() - started, error]
+            if error is not None or not getattr(self._cursor, 'with_rows', True):
+                self._report()
+
+    def execute(self, statement, params=None, *args, **kwargs):
+        if args or kwargs:
+            return self._timed(lambda s, p: self._cursor.execute(s, p, *args, **kwargs), statement, params)
+        return self._timed(self._cursor.execute, statement, params)
+
+    def executemany(self, statement, seq_params):
+        result = self._timed(self._cursor.executemany, statement, seq_params)
+        self._report()
+        return result
+
+    def _timed_fetch(self, method, exhausted):
+        if not fetch_observers and self._pending is None:
+            return method()
+        started = time.perf_counter()
+        rows = None
+        try:
+            rows = method()
+            return rows
+        except Exception as e:
+            if self._pending is not None:
+                self._pending[3] = e
+            rows = None
+            raise
+        finally:
+            seconds = time.perf_counter() - started
+            if fetch_observers:
+                _notify_fetch(seconds)
+            if self._pending is not None:
+                self._pending[2] += seconds
+                if rows is None or exhausted(rows):
+                    self._report()
+
+    def fetchone(self):
+        return self._timed_fetch(self._cursor.fetchone, lambda row: False)
+
+    def fetchmany(self, size=None):
+        if size is None:
+            size = getattr(self._cursor, 'arraysize', 1)
+        return self._timed_fetch(lambda: self._cursor.fetchmany(size), lambda rows: len(rows) < size)
+
+    def fetchall(self):
+        return self._timed_fetch(self._cursor.fetchall, lambda rows: True)
+
+    def close(self):
+        self._report()
+        return self._cursor.close()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Executa as migrações versionadas do banco de dados (db/migrations/NNNN_nome.py).
+
+Cada migração define as listas UP e DOWN com os comandos SQL. As versões aplicadas
+ficam registradas na tabela schema_migrations.
+
+Uso:
+    python -m db.migrate status
+    python -m db.migrate up [--to N] [--dry-run]
+    python -m db.migrate down [--to N] [--dry-run]   # sem --to desfaz apenas a última
+"""
+
+import argparse
+import importlib.util
+import os
+import re
+import sys
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+MIGRATION_FILE = re.compile(r'^(\d{4})_(\w+)\.py$')
+
+TRACKING_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INT PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+
+class Migration:
+    def __init__(self, version, name, path):
+        self.version = version
+        self.name = name
+        self.path = path
+        self._module = None
+
+    @property
+    def module(self):
+        if self._module is None:
+            spec = importlib.util.spec_from_file_location(f"migration_{self.version:04d}", self.path)
+            self._module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(self._module)
+        return self._module
+
+    @property
+    def up(self):
+        return self.module.UP
+
+    @property
+    def down(self):
+        return self.module.DOWN
+
+    def __repr__(self):
+        return f"{self.version:04d}_{self.name}"
+
+
+def discover_migrations(directory=MIGRATIONS_DIR):
+    """Returns the migrations found on disk, ordered by version."""
+    migrations = []
+    for filename in os.listdir(directory):
+        match = MIGRATION_FILE.match(filename)
+        if match:
+            migrations.append(Migration(int(match.group(1)), match.group(2), os.path.join(directory, filename)))
+    migrations.sort(key=lambda m: m.version)
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError("Há migrações com o mesmo número de versão.")
+    return migrations
+
+
+def applied_versions(cursor, create=True):
+    if create:
+        cursor.execute(TRACKING_TABLE_SQL)
+    else:
+        cursor.execute("SELECT COUNT(*) FROM information_schema.tables "
+                       "WHERE table_schema = DATABASE() AND table_name = 'schema_migrations'")
+        if not cursor.fetchone()[0]:
+            return set()
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def plan(direction, migrations, applied, target=None):
+    """Returns the migrations to run, in execution order, for `up`/`down` to `target`."""
+    if direction == 'up':
+        return [m for m in migrations
+                if m.version not in applied and (target is None or m.version <= target)]
+    pending = [m for m in reversed(migrations) if m.version in applied]
+    if target is None:
+        return pending[:1]
+    return [m for m in pending if m.version > target]
+
+
+def run(connection, direction, target=None, dry_run=False, out=print):
+    """Applies (or, with dry_run, prints) the planned migrations. Returns the list run."""
+    cursor = connection.cursor()
+    try:
+        applied = applied_versions(cursor, create=not dry_run)
+        steps = plan(direction, discover_migrations(), applied, target)
+        for migration in steps:
+            statements = migration.up if direction == 'up' else migration.down
+            out(f"{'[dry-run] ' if dry_run else ''}{direction} {migration}")
+            for statement in statements:
+                if dry_run:
+                    out("    " + " ".join(statement.split()) + ";")
+                    continue
+                cursor.execute(statement)
+            if dry_run:
+                continue
+            # MySQL DDL commits implicitly, so each migration is recorded as soon as it finishes
+            if direction == 'up':
+                cursor.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)",
+                               (migration.version, migration.name))
+            else:
+                cursor.execute("DELETE FROM schema_migrations WHERE version = %s", (migration.version,))
+            connection.commit()
+        return steps
+    finally:
+        cursor.close()
+
+
+def status(connection, out=print):
+    cursor = connection.cursor()
+    try:
+        applied = applied_versions(cursor, create=False)
+    finally:
+        cursor.close()
+    for migration in discover_migrations():
+        out(f"{'[x]' if migration.version in applied else '[ ]'} {migration}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migrações do banco de dados")
+    parser.add_argument('command', choices=['status', 'up', 'down'])
+    parser.add_argument('--to', type=int, dest='target', help="versão alvo")
+    parser.add_argument('--dry-run', action='store_true', help="apenas mostra o SQL que seria executado")
+    args = parser.parse_args(argv)
+
+    from db.connection import create_db_connection
+    connection = create_db_connection()
+    if connection is None:
+        return 1
+    try:
+        if args.command == 'status':
+            status(connection)
+        else:
+            steps = run(connection, args.command, args.target, args.dry_run)
+            if not steps:
+                print("Nenhuma migração a executar.")
+        return 0
+    except Exception as e:
+        print(f"❌ Erro ao executar migrações: {e}")
+        return 1
+    finally:
+        connection.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""Baseline schema: the tables previously created by setup.py."""
+
+UP = [
+    """
+    CREATE TABLE IF NOT EXISTS vehicles (
+        id VARCHAR(255) PRIMARY KEY,
+        placa VARCHAR(20) NOT NULL,
+        modelo VARCHAR(100),
+        ano INT,
+        eixos INT,
+        cliente_id VARCHAR(255) NOT NULL DEFAULT 'default_client',
+        createdAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tires (
+        id VARCHAR(255) PRIMARY KEY,
+        numeroFogo VARCHAR(50) NOT NULL,
+        marca VARCHAR(100),
+        modelo VARCHAR(100),
+        tipoPneu VARCHAR(50),
+        medida VARCHAR(50),
+        capacidadeCarga VARCHAR(50),
+        desenhoBanda VARCHAR(100),
+        profundidadeSulcoInicial DECIMAL(5,2),
+        custoAquisicao DECIMAL(10,2),
+        dataAquisicao DATE,
+        fornecedor VARCHAR(100),
+        numeroNF VARCHAR(50),
+        statusInicial VARCHAR(50),
+        numeroRecapagens INT DEFAULT 0,
+        quilometragemTotalPercorrida DECIMAL(10,2) DEFAULT 0,
+        ultimaLeituraHodometroRegistrada DECIMAL(10,2) DEFAULT 0,
+        profundidadeSulcoAtual DECIMAL(5,2),
+        currentVehicleId VARCHAR(255),
+        currentVehiclePlaca VARCHAR(20),
+        currentAxle VARCHAR(50),
+        currentPosition VARCHAR(50),
+        cliente_id VARCHAR(255) NOT NULL DEFAULT 'default_client',
+        createdAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        FOREIGN KEY (currentVehicleId) REFERENCES vehicles(id) ON DELETE SET NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS tire_events (
+        id VARCHAR(255) PRIMARY KEY,
+        tireId VARCHAR(255) NOT NULL,
+        tipo VARCHAR(100) NOT NULL,
+        data DATE NOT NULL,
+        observacoes TEXT,
+        detalhes JSON,
+        cliente_id VARCHAR(255) NOT NULL DEFAULT 'default_client',
+        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (tireId) REFERENCES tires(id) ON DELETE CASCADE
+    )
+    """,
+]
+
+DOWN = [
+    "DROP TABLE IF EXISTS tire_events",
+    "DROP TABLE IF EXISTS tires",
+    "DROP TABLE IF EXISTS vehicles",
+]
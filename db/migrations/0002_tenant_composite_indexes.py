@@ -0,0 +1,28 @@
+"""
+Composite indexes led by cliente_id for the controllers' hot queries.
+
+Lookups by (id, cliente_id) are already served by the primary key on id, and every
+index below also covers plain `WHERE cliente_id = %s` scans.
+"""
+
+UP = [
+    # get_all_tires filters / KPI GROUP BY statusInicial
+    "CREATE INDEX idx_tires_cliente_status ON tires (cliente_id, statusInicial)",
+    # tires mounted on a vehicle
+    "CREATE INDEX idx_tires_cliente_vehicle ON tires (cliente_id, currentVehicleId)",
+    "CREATE INDEX idx_tires_cliente_marca ON tires (cliente_id, marca)",
+    "CREATE INDEX idx_vehicles_cliente_placa ON vehicles (cliente_id, placa)",
+    # a tire's history in date order
+    "CREATE INDEX idx_tire_events_cliente_tire_data ON tire_events (cliente_id, tireId, data)",
+    # KPI retread cost sum
+    "CREATE INDEX idx_tire_events_cliente_tipo ON tire_events (cliente_id, tipo)",
+]
+
+DOWN = [
+    "DROP INDEX idx_tire_events_cliente_tipo ON tire_events",
+    "DROP INDEX idx_tire_events_cliente_tire_data ON tire_events",
+    "DROP INDEX idx_vehicles_cliente_placa ON vehicles",
+    "DROP INDEX idx_tires_cliente_marca ON tires",
+    "DROP INDEX idx_tires_cliente_vehicle ON tires",
+    "DROP INDEX idx_tires_cliente_status ON tires",
+]
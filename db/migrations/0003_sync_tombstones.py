@@ -0,0 +1,27 @@
+"""
+Delta sync support: tombstones for hard-deleted rows and indexes on the change
+columns, so `?since=` and the list ETags are index range reads.
+"""
+
+UP = [
+    """
+    CREATE TABLE deleted_records (
+        id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        cliente_id VARCHAR(255) NOT NULL,
+        resource VARCHAR(20) NOT NULL,
+        record_id VARCHAR(255) NOT NULL,
+        deletedAt TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        INDEX idx_deleted_records_cliente_resource (cliente_id, resource, deletedAt)
+    )
+    """,
+    "CREATE INDEX idx_tires_cliente_updated ON tires (cliente_id, updatedAt)",
+    "CREATE INDEX idx_vehicles_cliente_updated ON vehicles (cliente_id, updatedAt)",
+    "CREATE INDEX idx_tire_events_cliente_timestamp ON tire_events (cliente_id, timestamp)",
+]
+
+DOWN = [
+    "DROP INDEX idx_tire_events_cliente_timestamp ON tire_events",
+    "DROP INDEX idx_vehicles_cliente_updated ON vehicles",
+    "DROP INDEX idx_tires_cliente_updated ON tires",
+    "DROP TABLE deleted_records",
+]
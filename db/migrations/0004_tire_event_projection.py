@@ -0,0 +1,52 @@
+"""
+Event-sourced tire state: a tire's state columns are its projection base folded with
+the events inserted after the base was captured.
+
+`tire_events.seq` gives every event an insertion order, so the base records which
+events it already contains (`baseEventSeq`). Existing tires are backfilled with their
+current state as base, i.e. the history recorded so far is treated as already folded.
+"""
+
+UP = [
+    "ALTER TABLE tire_events ADD COLUMN seq BIGINT NOT NULL AUTO_INCREMENT, ADD UNIQUE KEY uq_tire_events_seq (seq)",
+    # a tire's history in replay order; also serves the (cliente_id, tireId, data) lookups
+    "CREATE INDEX idx_tire_events_cliente_tire_order ON tire_events (cliente_id, tireId, data, timestamp, seq)",
+    "DROP INDEX idx_tire_events_cliente_tire_data ON tire_events",
+    """
+    CREATE TABLE tire_projection_bases (
+        tireId VARCHAR(255) PRIMARY KEY,
+        cliente_id VARCHAR(255) NOT NULL,
+        statusInicial VARCHAR(50),
+        numeroRecapagens INT,
+        quilometragemTotalPercorrida DECIMAL(10,2),
+        ultimaLeituraHodometroRegistrada DECIMAL(10,2),
+        profundidadeSulcoAtual DECIMAL(5,2),
+        currentVehicleId VARCHAR(255),
+        currentVehiclePlaca VARCHAR(20),
+        currentAxle VARCHAR(50),
+        currentPosition VARCHAR(50),
+        baseEventSeq BIGINT NULL,
+        capturedAt TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        INDEX idx_tire_projection_bases_cliente (cliente_id),
+        FOREIGN KEY (tireId) REFERENCES tires(id) ON DELETE CASCADE
+    )
+    """,
+    """
+    INSERT INTO tire_projection_bases (tireId, cliente_id, statusInicial, numeroRecapagens,
+                                       quilometragemTotalPercorrida, ultimaLeituraHodometroRegistrada,
+                                       profundidadeSulcoAtual, currentVehicleId, currentVehiclePlaca,
+                                       currentAxle, currentPosition, baseEventSeq)
+    SELECT t.id, t.cliente_id, t.statusInicial, t.numeroRecapagens, t.quilometragemTotalPercorrida,
+           t.ultimaLeituraHodometroRegistrada, t.profundidadeSulcoAtual, t.currentVehicleId,
+           t.currentVehiclePlaca, t.currentAxle, t.currentPosition,
+           (SELECT MAX(e.seq) FROM tire_events e WHERE e.tireId = t.id)
+    FROM tires t
+    """,
+]
+
+DOWN = [
+    "DROP TABLE tire_projection_bases",
+    "CREATE INDEX idx_tire_events_cliente_tire_data ON tire_events (cliente_id, tireId, data)",
+    "DROP INDEX idx_tire_events_cliente_tire_order ON tire_events",
+    "ALTER TABLE tire_events DROP INDEX uq_tire_events_seq, DROP COLUMN seq",
+]
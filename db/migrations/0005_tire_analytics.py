@@ -0,0 +1,79 @@
+"""
+Per-tire cost and wear analytics, kept current by the write paths
+(controllers/analytics_controller.refresh_tire_analytics) and backfilled here.
+
+Tread lost is the sum of the drops between consecutive tread readings, starting from
+profundidadeSulcoInicial; a retread raises the depth again and does not count.
+"""
+
+UP = [
+    """
+    CREATE TABLE tire_analytics (
+        tireId VARCHAR(255) PRIMARY KEY,
+        cliente_id VARCHAR(255) NOT NULL,
+        marca VARCHAR(100),
+        modelo VARCHAR(100),
+        medida VARCHAR(50),
+        fornecedor VARCHAR(100),
+        currentVehicleId VARCHAR(255),
+        statusInicial VARCHAR(50),
+        quilometragem DECIMAL(12,2) NOT NULL DEFAULT 0,
+        numeroRecapagens INT NOT NULL DEFAULT 0,
+        custoAquisicao DECIMAL(12,2) NOT NULL DEFAULT 0,
+        custoRecapagens DECIMAL(12,2) NOT NULL DEFAULT 0,
+        sulcoInicial DECIMAL(5,2),
+        sulcoAtual DECIMAL(5,2),
+        desgasteMm DECIMAL(7,2) NOT NULL DEFAULT 0,
+        custoTotal DECIMAL(13,2) AS (custoAquisicao + custoRecapagens) STORED,
+        cpk DECIMAL(16,6) AS ((custoAquisicao + custoRecapagens) / NULLIF(quilometragem, 0)) STORED,
+        desgastePor1000Km DECIMAL(12,4) AS (desgasteMm * 1000 / NULLIF(quilometragem, 0)) STORED,
+        updatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+        INDEX idx_tire_analytics_cliente_marca (cliente_id, marca),
+        INDEX idx_tire_analytics_cliente_modelo (cliente_id, modelo),
+        INDEX idx_tire_analytics_cliente_medida (cliente_id, medida),
+        INDEX idx_tire_analytics_cliente_fornecedor (cliente_id, fornecedor),
+        INDEX idx_tire_analytics_cliente_vehicle (cliente_id, currentVehicleId),
+        INDEX idx_tire_analytics_cliente_cpk (cliente_id, cpk),
+        FOREIGN KEY (tireId) REFERENCES tires(id) ON DELETE CASCADE
+    )
+    """,
+    """
+    INSERT INTO tire_analytics (tireId, cliente_id, marca, modelo, medida, fornecedor, currentVehicleId,
+                                statusInicial, quilometragem, numeroRecapagens, custoAquisicao,
+                                custoRecapagens, sulcoInicial, sulcoAtual, desgasteMm)
+    SELECT t.id, t.cliente_id, t.marca, t.modelo, t.medida, t.fornecedor, t.currentVehicleId, t.statusInicial,
+           COALESCE(t.quilometragemTotalPercorrida, 0), COALESCE(t.numeroRecapagens, 0),
+           COALESCE(t.custoAquisicao, 0), COALESCE(c.custoRecapagens, 0),
+           t.profundidadeSulcoInicial, t.profundidadeSulcoAtual, COALESCE(w.desgasteMm, 0)
+    FROM tires t
+    LEFT JOIN (
+        SELECT d.tireId, SUM(GREATEST(COALESCE(d.anterior, d.sulcoInicial) - d.sulco, 0)) AS desgasteMm
+        FROM (
+            SELECT s.tireId, s.sulcoInicial, s.sulco,
+                   LAG(s.sulco) OVER (PARTITION BY s.tireId ORDER BY s.data, s.timestamp, s.seq) AS anterior
+            FROM (
+                SELECT e.tireId, e.data, e.timestamp, e.seq, ti.profundidadeSulcoInicial AS sulcoInicial,
+                       CAST(NULLIF(NULLIF(JSON_UNQUOTE(JSON_EXTRACT(e.detalhes,
+                            IF(e.tipo = 'Retorno da Recapagem', '$.novaProfundidadeSulco', '$.profundidadeSulcoAtual'))),
+                            'null'), '') AS DECIMAL(5,2)) AS sulco
+                FROM tire_events e JOIN tires ti ON ti.id = e.tireId
+                WHERE e.tipo IN ('Registro de Quilometragem e Sulco', 'Retorno da Recapagem')
+            ) s
+            WHERE s.sulco IS NOT NULL
+        ) d
+        GROUP BY d.tireId
+    ) w ON w.tireId = t.id
+    LEFT JOIN (
+        SELECT e.tireId,
+               SUM(CAST(NULLIF(NULLIF(JSON_UNQUOTE(JSON_EXTRACT(e.detalhes, '$.custoRecapagem')), 'null'), '')
+                        AS DECIMAL(12,2))) AS custoRecapagens
+        FROM tire_events e
+        WHERE e.tipo = 'Retorno da Recapagem'
+        GROUP BY e.tireId
+    ) c ON c.tireId = t.id
+    """,
+]
+
+DOWN = [
+    "DROP TABLE tire_analytics",
+]
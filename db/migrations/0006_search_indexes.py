@@ -0,0 +1,20 @@
+"""
+Indexes behind /api/search (controllers/search_controller.py).
+
+The FULLTEXT indexes use the ngram parser, so a quoted term matches any substring of
+two or more characters (ngram_token_size, default 2) and InnoDB keeps them in sync on
+every write. Prefix matches on numeroFogo and placa use the B-tree indexes led by
+cliente_id. Adding the first FULLTEXT index to a table rebuilds it.
+"""
+
+UP = [
+    "CREATE FULLTEXT INDEX ft_tires_search ON tires (numeroFogo, marca, modelo, medida, numeroNF) WITH PARSER ngram",
+    "CREATE FULLTEXT INDEX ft_vehicles_search ON vehicles (placa, modelo) WITH PARSER ngram",
+    "CREATE INDEX idx_tires_cliente_numero_fogo ON tires (cliente_id, numeroFogo)",
+]
+
+DOWN = [
+    "DROP INDEX idx_tires_cliente_numero_fogo ON tires",
+    "DROP INDEX ft_vehicles_search ON vehicles",
+    "DROP INDEX ft_tires_search ON tires",
+]
@@ -0,0 +1,22 @@
+"""
+Per-tenant list versions behind the list ETags (db/versions.py).
+
+One row per (cliente_id, resource), bumped after every committed write, so checking
+whether a list changed is a primary-key read instead of COUNT/MAX over the tenant's
+rows. A missing row is version 0.
+"""
+
+UP = [
+    """
+    CREATE TABLE list_versions (
+        cliente_id VARCHAR(255) NOT NULL,
+        resource VARCHAR(20) NOT NULL,
+        version BIGINT UNSIGNED NOT NULL DEFAULT 0,
+        PRIMARY KEY (cliente_id, resource)
+    )
+    """,
+]
+
+DOWN = [
+    "DROP TABLE list_versions",
+]
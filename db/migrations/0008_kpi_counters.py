@@ -0,0 +1,37 @@
+"""
+Per-tenant KPI counters behind GET /api/kpis (controllers/kpi_controller.py).
+
+One row per (cliente_id, statusInicial) with the sums of the tenant's tire_analytics
+rows in that status. The write paths subtract a tire's analytics row before
+refreshing it and add it back afterwards (refresh_tire_analytics), so reading the
+KPIs is a primary-key range read instead of aggregating every tire and retread
+event. A NULL status is stored as ''.
+"""
+
+UP = [
+    """
+    CREATE TABLE kpi_counters (
+        cliente_id VARCHAR(255) NOT NULL,
+        statusInicial VARCHAR(50) NOT NULL,
+        total BIGINT NOT NULL DEFAULT 0,
+        custoAquisicao DECIMAL(16,2) NOT NULL DEFAULT 0,
+        quilometragem DECIMAL(16,2) NOT NULL DEFAULT 0,
+        recapados BIGINT NOT NULL DEFAULT 0,
+        recapagens BIGINT NOT NULL DEFAULT 0,
+        custoRecapagens DECIMAL(16,2) NOT NULL DEFAULT 0,
+        PRIMARY KEY (cliente_id, statusInicial)
+    )
+    """,
+    """
+    INSERT INTO kpi_counters (cliente_id, statusInicial, total, custoAquisicao, quilometragem, recapados,
+                              recapagens, custoRecapagens)
+    SELECT a.cliente_id, COALESCE(a.statusInicial, ''), COUNT(*), SUM(a.custoAquisicao), SUM(a.quilometragem),
+           SUM(a.numeroRecapagens > 0), SUM(a.numeroRecapagens), SUM(a.custoRecapagens)
+    FROM tire_analytics a
+    GROUP BY a.cliente_id, COALESCE(a.statusInicial, '')
+    """,
+]
+
+DOWN = [
+    "DROP TABLE kpi_counters",
+]
@@ -0,0 +1,202 @@
+# db/pool.py
+import threading
+import time
+from collections import deque
+
+import mysql.connector
+
+from db.instrumentation import InstrumentedCursor, notify_acquire
+from db.statements import DEFAULT_STATEMENT_CACHE_SIZE, PreparedStatementCache
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection could be checked out within the pool timeout."""
+
+
+class PooledConnection:
+    """Proxy around a raw MySQL connection that hands it back to the pool on close()."""
+
+    def __init__(self, pool, raw, created_at, statements):
+        self._pool = pool
+        self._raw = raw
+        self.statements = statements
+        self._released = False
+        self.created_at = created_at
+        self.last_used = time.monotonic()
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._raw.cursor(*args, **kwargs))
+
+    def execute_prepared(self, sql, params=()):
+        """
+        Executes `sql` as a server-side prepared statement kept prepared on this
+        connection and returns its cursor, for rowcount or fetchall(). The cursor
+        belongs to the statement cache: read it completely and do not close it.
+        """
+        sql, cursor, hit = self.statements.lookup(sql)
+        self._pool.note_statement(hit)
+        cursor = InstrumentedCursor(cursor)
+        cursor.execute(sql, params)
+        return cursor
+
+    def close(self):
+        """Returns the connection to the pool (idempotent)."""
+        if not self._released:
+            self._released = True
+            self._pool.release(self)
+
+
+class ConnectionPool:
+    """
+    Fixed-size, thread-safe pool of mysql.connector connections.
+
+    Connections are created lazily up to `size`, health-checked with a ping when
+    they sat idle longer than `health_check_interval` and recycled once older than
+    `recycle` seconds. Callers block up to `timeout` seconds when the pool is full.
+    Each connection keeps up to `statement_cache_size` prepared statements.
+    """
+
+    def __init__(self, connect_args, size=10, timeout=30, recycle=1800, health_check_interval=30,
+                 statement_cache_size=DEFAULT_STATEMENT_CACHE_SIZE):
+        self.connect_args = dict(connect_args)
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.health_check_interval = health_check_interval
+        self.statement_cache_size = statement_cache_size
+
+        self._idle = deque()  # (raw, created_at, last_used, statements)
+        self._open = 0
+        self._in_use = 0
+        self._waiting = 0
+        self._cond = threading.Condition()
+
+        self._acquires = 0
+        self._timeouts = 0
+        self._recycled = 0
+        self._failed_health_checks = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._statement_hits = 0
+        self._statement_misses = 0
+
+    def _connect(self):
+        return mysql.connector.connect(**self.connect_args)
+
+    def _discard(self, raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def acquire(self):
+        """Checks out a connection, creating, recycling or revalidating it as needed."""
+        started = time.perf_counter()
+        deadline = started + self.timeout
+        raw = None
+        created_at = None
+        statements = None
+        with self._cond:
+            self._waiting += 1
+            try:
+                while True:
+                    if self._idle:
+                        raw, created_at, last_used, statements = self._idle.pop()
+                        break
+                    if self._open < self.size:
+                        self._open += 1
+                        break
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeoutError(
+                            f"Nenhuma conexão livre no pool após {self.timeout}s ({self.size} em uso)"
+                        )
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+            self._in_use += 1
+
+        try:
+            now = time.monotonic()
+            if raw is not None and now - created_at > self.recycle:
+                self._discard(raw)
+                raw = None
+                with self._cond:
+                    self._recycled += 1
+            elif raw is not None and now - last_used > self.health_check_interval:
+                try:
+                    raw.ping(reconnect=False)
+                except Exception:
+                    self._discard(raw)
+                    raw = None
+                    with self._cond:
+                        self._failed_health_checks += 1
+            if raw is None:
+                raw = self._connect()
+                created_at = time.monotonic()
+                statements = PreparedStatementCache(raw, self.statement_cache_size)
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        waited = time.perf_counter() - started
+        with self._cond:
+            self._acquires += 1
+            self._wait_total += waited
+            if waited > self._wait_max:
+                self._wait_max = waited
+        notify_acquire(waited)
+        return PooledConnection(self, raw, created_at, statements)
+
+    def release(self, conn):
+        """Resets a checked-out connection and puts it back in the idle queue."""
+        raw = conn._raw
+        keep = True
+        try:
+            if raw.in_transaction:
+                raw.rollback()
+        except Exception:
+            # Unread results or a dropped socket: the session is unusable.
+            keep = False
+        with self._cond:
+            self._in_use -= 1
+            if keep:
+                self._idle.append((raw, conn.created_at, time.monotonic(), conn.statements))
+            else:
+                self._open -= 1
+            self._cond.notify()
+        if not keep:
+            self._discard(raw)
+
+    def note_statement(self, hit):
+        with self._cond:
+            if hit:
+                self._statement_hits += 1
+            else:
+                self._statement_misses += 1
+
+    def stats(self):
+        """Returns a snapshot of pool usage and checkout wait times."""
+        with self._cond:
+            return {
+                "size": self.size,
+                "open": self._open,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "acquires": self._acquires,
+                "timeouts": self._timeouts,
+                "recycled": self._recycled,
+                "failed_health_checks": self._failed_health_checks,
+                "wait_avg_ms": round(self._wait_total / self._acquires * 1000, 3) if self._acquires else 0.0,
+                "wait_max_ms": round(self._wait_max * 1000, 3),
+                "prepared_statement_hits": self._statement_hits,
+                "prepared_statement_misses": self._statement_misses,
+            }
@@ -0,0 +1,162 @@
+# db/replicas.py
+"""
+Read replicas for the read-only controller paths (get_db_connection(readonly=True)).
+
+Each replica gets its own ConnectionPool. A per-process thread checks every replica
+each `replica_check_interval` seconds (ping + Seconds_Behind_Source); only replicas
+that answered and lag at most `replica_max_lag` seconds receive reads, round-robin.
+A tenant that just wrote (any invalidate_tenant call, including the ones relayed by
+the Redis bus) reads from the primary for `replica_sticky_seconds`, so its own
+writes are visible. Without healthy replicas every read falls back to the primary.
+"""
+import itertools
+import os
+import threading
+import time
+
+from db.pool import ConnectionPool
+
+DEFAULT_REPLICA_SETTINGS = {
+    'replicas': [],
+    'replica_max_lag': 5,
+    'replica_check_interval': 5,
+    'replica_sticky_seconds': 10,
+}
+
+REPLICA_SETTINGS = tuple(DEFAULT_REPLICA_SETTINGS)
+
+_STATUS_QUERIES = (
+    ("SHOW REPLICA STATUS", 'Seconds_Behind_Source'),  # MySQL 8.0.22+
+    ("SHOW SLAVE STATUS", 'Seconds_Behind_Master'),
+)
+
+
+class Replica:
+    """One replica: its pool and the result of the last health check."""
+
+    def __init__(self, name, pool):
+        self.name = name
+        self.pool = pool
+        self.healthy = False
+        self.lag = None
+        self.error = None
+        self.checked_at = None
+
+    def check(self):
+        """Pings the replica and reads its replication lag; stopped replication counts as unhealthy."""
+        connection = None
+        try:
+            connection = self.pool.acquire()
+            cursor = connection._raw.cursor(dictionary=True)  # not instrumented: not a request statement
+            try:
+                lag, error = None, "replicação não configurada"
+                for query, column in _STATUS_QUERIES:
+                    try:
+                        cursor.execute(query)
+                    except Exception as e:  # older servers / missing REPLICATION CLIENT privilege
+                        error = str(e)
+                        continue
+                    row = cursor.fetchone()
+                    cursor.fetchall()
+                    if row is not None:
+                        lag = row.get(column)
+                        error = None if lag is not None else "replicação parada"
+                    break
+            finally:
+                cursor.close()
+            self.lag, self.error, self.healthy = lag, error, lag is not None
+        except Exception as e:
+            self.lag, self.error, self.healthy = None, str(e), False
+        finally:
+            if connection is not None:
+                connection.close()
+            self.checked_at = time.time()
+
+    def stats(self):
+        return {"name": self.name, "healthy": self.healthy, "lagSeconds": self.lag, "error": self.error,
+                "checkedAt": self.checked_at, "pool": self.pool.stats()}
+
+
+class ReplicaSet:
+    """The configured replicas, their health-check thread and the tenants pinned to the primary."""
+
+    def __init__(self, replicas, max_lag=5, check_interval=5, sticky_seconds=10):
+        self.replicas = replicas
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        # a tenant is only served by a replica once the writes it made can have reached it
+        self.sticky_seconds = max(sticky_seconds, max_lag)
+        self._round_robin = itertools.count()
+        self._last_writes = {}
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def _ensure_started(self):
+        # Started lazily per process: the checker thread does not survive Gunicorn's fork
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._check_loop, daemon=True).start()
+
+    def _check_loop(self):
+        while True:
+            self.check()
+            time.sleep(self.check_interval)
+
+    def check(self):
+        for replica in self.replicas:
+            replica.check()
+
+    def note_write(self, cliente_id, resources=()):
+        """Invalidation listener: routes the tenant's reads to the primary for sticky_seconds."""
+        now = time.monotonic()
+        with self._lock:
+            self._last_writes[cliente_id] = now
+            if len(self._last_writes) > 10000:
+                self._last_writes = {tenant: at for tenant, at in self._last_writes.items()
+                                     if now - at < self.sticky_seconds}
+
+    def is_sticky(self, cliente_id):
+        written_at = self._last_writes.get(cliente_id)
+        return written_at is not None and time.monotonic() - written_at < self.sticky_seconds
+
+    def choose(self, cliente_id=None):
+        """Returns a healthy, caught-up replica for the tenant, or None to read from the primary."""
+        self._ensure_started()
+        if cliente_id is not None and self.is_sticky(cliente_id):
+            return None
+        candidates = [replica for replica in self.replicas if replica.healthy and replica.lag <= self.max_lag]
+        if not candidates:
+            return None
+        return candidates[next(self._round_robin) % len(candidates)]
+
+    def stats(self):
+        return {
+            "maxLagSeconds": self.max_lag,
+            "stickySeconds": self.sticky_seconds,
+            "stickyTenants": sum(1 for cliente_id in list(self._last_writes) if self.is_sticky(cliente_id)),
+            "replicas": [replica.stats() for replica in self.replicas],
+        }
+
+
+def build_replica_set(config, connect_args, pool_settings):
+    """
+    Builds the ReplicaSet described by DATABASE_CONFIG['replicas'] (None when empty).
+    Each entry overrides the primary's connection arguments (usually just host/port)
+    and may set its own pool_size.
+    """
+    if not config.get('replicas'):
+        return None
+    replicas = []
+    for entry in config['replicas']:
+        args = {**connect_args, **{key: value for key, value in entry.items() if key not in ('name', 'pool_size')}}
+        pool = ConnectionPool(args, size=entry.get('pool_size', pool_settings['size']),
+                              timeout=pool_settings['timeout'], recycle=pool_settings['recycle'],
+                              health_check_interval=pool_settings['health_check_interval'],
+                              statement_cache_size=pool_settings['statement_cache_size'])
+        replicas.append(Replica(entry.get('name') or f"{args.get('host')}:{args.get('port', 3306)}", pool))
+    return ReplicaSet(replicas, max_lag=config['replica_max_lag'], check_interval=config['replica_check_interval'],
+                      sticky_seconds=config['replica_sticky_seconds'])
@@ -0,0 +1,235 @@
+# db/slow_queries.py
+"""
+Slow-query log fed by the statement observers of db/instrumentation.py.
+
+Statements slower than SLOW_QUERY_CONFIG['threshold_ms'] are grouped by fingerprint
+(literals and placeholders replaced by `?`, IN lists and VALUES tuples collapsed),
+logged with redacted parameters, tenant and route, and kept for the top-N report
+served by GET /api/db/slow-queries. The first slow run of each SELECT fingerprint
+is EXPLAINed by a single background worker on its own dedicated connection (not a
+pool slot), fed through a bounded queue: when the queue is full the EXPLAIN is
+skipped and retried on a later slow run.
+"""
+import os
+import queue
+import re
+import threading
+from datetime import datetime
+
+from flask import has_request_context, request
+
+from db.instrumentation import add_statement_observer
+
+DEFAULT_SLOW_QUERY_CONFIG = {
+    'enabled': True,
+    'threshold_ms': 200,
+    'explain': True,
+    'explain_queue_size': 20,
+    'max_fingerprints': 500,
+    'log': True,
+}
+
+REPORT_ORDERS = ('total', 'max', 'count')
+
+_COMMENTS = re.compile(r'/\*.*?\*/|--[^\n]*', re.S)
+_STRINGS = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+_NUMBERS = re.compile(r'(?<![\w`])-?\d+(?:\.\d+)?(?![\w`])')
+_PLACEHOLDERS = re.compile(r'%\(\w+\)s|%s|\?')
+_IN_LISTS = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.I)
+_VALUES_TUPLES = re.compile(r'(\(\s*\?(?:\s*,\s*\?)*\s*\))(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))+')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def load_slow_query_config():
+    """Returns SLOW_QUERY_CONFIG from config.py merged over the defaults."""
+    config = dict(DEFAULT_SLOW_QUERY_CONFIG)
+    try:
+        from config import SLOW_QUERY_CONFIG
+        config.update(SLOW_QUERY_CONFIG)
+    except ImportError:
+        pass
+    return config
+
+
+def fingerprint(statement):
+    """Normalizes a statement so every execution of the same shape groups together."""
+    text = _COMMENTS.sub(' ', statement)
+    text = _STRINGS.sub('?', text)
+    text = _NUMBERS.sub('?', text)
+    text = _PLACEHOLDERS.sub('?', text)
+    text = _IN_LISTS.sub('IN (?+)', text)
+    text = _VALUES_TUPLES.sub(r'\1, ...', text)
+    return _WHITESPACE.sub(' ', text).strip()
+
+
+def _redact_value(value):
+    if value is None:
+        return None
+    if isinstance(value, (bool, int, float)):
+        return f"<{type(value).__name__}>"
+    return f"<{type(value).__name__}:{len(str(value))}>"
+
+
+def redact_params(params):
+    """Replaces parameter values with their type (and length), keeping the shape."""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: _redact_value(value) for key, value in params.items()}
+    if isinstance(params, (list, tuple)):
+        if params and isinstance(params[0], (list, tuple, dict)):
+            return {"rows": len(params), "first": redact_params(params[0])}
+        return [_redact_value(value) for value in params]
+    return _redact_value(params)
+
+
+def _request_context():
+    """Returns (cliente_id, route) of the current Flask request, if any."""
+    if not has_request_context():
+        return None, None
+    route = request.url_rule.rule if request.url_rule is not None else request.path
+    cliente_id = request.args.get('cliente_id')
+    if not cliente_id and request.is_json:
+        body = request.get_json(silent=True)
+        cliente_id = body.get('cliente_id') if isinstance(body, dict) else None
+    return cliente_id, f"{request.method} {route}"
+
+
+class SlowQueryLog:
+    """Per-fingerprint aggregates of slow statements, bounded to `max_fingerprints` entries."""
+
+    def __init__(self, threshold_ms=200, explain=True, max_fingerprints=500, log=True, explain_queue_size=20):
+        self.threshold = threshold_ms / 1000.0
+        self.explain = explain
+        self.max_fingerprints = max_fingerprints
+        self.log = log
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._explain_queue = queue.Queue(maxsize=explain_queue_size)
+        self._worker_pid = None
+        self._worker_lock = threading.Lock()
+
+    def observe(self, statement, params, seconds, error):
+        """Statement observer: records the execution if it crossed the threshold."""
+        if seconds < self.threshold or statement.lstrip()[:7].upper() == 'EXPLAIN':
+            return
+        key = fingerprint(statement)
+        cliente_id, route = _request_context()
+        redacted = redact_params(params)
+        elapsed_ms = round(seconds * 1000, 3)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                if len(self._entries) >= self.max_fingerprints:
+                    self._evict()
+                entry = self._entries[key] = {
+                    "fingerprint": key, "count": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0,
+                    "first_seen": datetime.now().isoformat(timespec='seconds'), "explain": None,
+                    "_explaining": False,
+                }
+            entry["count"] += 1
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            if error is not None:
+                entry["errors"] += 1
+            entry.update(last_ms=elapsed_ms, last_seen=datetime.now().isoformat(timespec='seconds'),
+                         last_params=redacted, last_cliente_id=cliente_id, last_route=route)
+            run_explain = (self.explain and error is None and not entry["_explaining"]
+                           and key[:6].upper() == 'SELECT')
+            if run_explain:
+                entry["_explaining"] = True
+        if self.log:
+            print(f"Consulta lenta ({elapsed_ms} ms) cliente={cliente_id} rota={route}: {key} params={redacted}")
+        if run_explain:
+            self._enqueue_explain(key, statement, params)
+
+    def _evict(self):
+        """Drops the fingerprint with the least accumulated time (lock held)."""
+        coldest = min(self._entries.values(), key=lambda entry: entry["total_ms"])
+        del self._entries[coldest["fingerprint"]]
+
+    def _enqueue_explain(self, key, statement, params):
+        """Hands the statement to the EXPLAIN worker; dropped (and retried later) when the queue is full."""
+        self._ensure_worker()
+        try:
+            self._explain_queue.put_nowait((key, statement, params))
+        except queue.Full:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry["_explaining"] = False
+
+    def _ensure_worker(self):
+        # One worker per process: the thread does not survive Gunicorn's fork
+        if self._worker_pid == os.getpid():
+            return
+        with self._worker_lock:
+            if self._worker_pid == os.getpid():
+                return
+            threading.Thread(target=self._explain_worker, daemon=True).start()
+            self._worker_pid = os.getpid()
+
+    def _explain_worker(self):
+        """Runs the queued EXPLAINs one at a time on a dedicated, uninstrumented connection."""
+        from db.connection import create_db_connection
+        connection = None
+        while True:
+            key, statement, params = self._explain_queue.get()
+            try:
+                if connection is None or not connection.is_connected():
+                    connection = create_db_connection()
+                if connection is None:
+                    raise RuntimeError("sem conexão com o banco de dados")
+                cursor = connection.cursor(dictionary=True)
+                try:
+                    cursor.execute(f"EXPLAIN {statement}", params)
+                    plan = cursor.fetchall()
+                finally:
+                    cursor.close()
+            except Exception as e:
+                plan = {"error": str(e)}
+                try:
+                    if connection is not None:
+                        connection.close()
+                except Exception:
+                    pass
+                connection = None
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry["explain"] = plan
+                    entry["explained_at"] = datetime.now().isoformat(timespec='seconds')
+
+    def report(self, limit=20, order='total'):
+        """Returns the `limit` slowest fingerprints by total time, max time or count."""
+        sort_key = {"total": "total_ms", "max": "max_ms", "count": "count"}[order]
+        with self._lock:
+            entries = sorted(self._entries.values(), key=lambda entry: entry[sort_key], reverse=True)[:limit]
+            rows = []
+            for entry in entries:
+                row = {key: value for key, value in entry.items() if not key.startswith('_')}
+                row["total_ms"] = round(row["total_ms"], 3)
+                row["avg_ms"] = round(entry["total_ms"] / entry["count"], 3)
+                rows.append(row)
+        return {"threshold_ms": self.threshold * 1000, "fingerprints": len(self._entries), "statements": rows}
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_config = load_slow_query_config()
+slow_query_log = SlowQueryLog(
+    threshold_ms=_config['threshold_ms'],
+    explain=_config['explain'],
+    explain_queue_size=_config['explain_queue_size'],
+    max_fingerprints=_config['max_fingerprints'],
+    log=_config['log'],
+)
+
+
+def init_app(app):
+    """Registers the slow-query observer on the pooled cursors."""
+    if _config['enabled']:
+        add_statement_observer(slow_query_log.observe)
+    return app
@@ -0,0 +1,117 @@
+# db/statements.py
+"""
+Statement shapes for the hot write paths, and the per-connection prepared-statement cache.
+
+UPDATEs built from a request payload only name columns of the table's schema
+whitelist, always in schema order, so a given set of edited fields maps to one SQL
+text however the client orders its keys. PooledConnection.execute_prepared() runs
+such a text as a server-side prepared statement that stays prepared on that
+connection (PreparedStatementCache, LRU): the server parses it once per connection
+and parameters travel in the binary protocol.
+"""
+from collections import OrderedDict
+
+# Columns of each table in schema order (migrations 0001 and 0004)
+TABLE_COLUMNS = {
+    'vehicles': ('id', 'placa', 'modelo', 'ano', 'eixos', 'cliente_id', 'createdAt', 'updatedAt'),
+    'tires': (
+        'id', 'numeroFogo', 'marca', 'modelo', 'tipoPneu', 'medida', 'capacidadeCarga', 'desenhoBanda',
+        'profundidadeSulcoInicial', 'custoAquisicao', 'dataAquisicao', 'fornecedor', 'numeroNF',
+        'statusInicial', 'numeroRecapagens', 'quilometragemTotalPercorrida', 'ultimaLeituraHodometroRegistrada',
+        'profundidadeSulcoAtual', 'currentVehicleId', 'currentVehiclePlaca', 'currentAxle', 'currentPosition',
+        'cliente_id', 'createdAt', 'updatedAt',
+    ),
+    'tire_events': ('id', 'tireId', 'tipo', 'data', 'observacoes', 'detalhes', 'cliente_id', 'timestamp', 'seq'),
+}
+
+# Never written from a payload: keys, ownership and the timestamps the server sets
+IMMUTABLE_COLUMNS = {
+    'vehicles': ('id', 'cliente_id', 'createdAt', 'updatedAt'),
+    'tires': ('id', 'numeroFogo', 'cliente_id', 'createdAt', 'updatedAt'),
+}
+
+WRITABLE_COLUMNS = {
+    table: tuple(column for column in TABLE_COLUMNS[table] if column not in immutable)
+    for table, immutable in IMMUTABLE_COLUMNS.items()
+}
+
+_KNOWN_COLUMNS = {table: frozenset(columns) for table, columns in TABLE_COLUMNS.items()}
+
+DEFAULT_STATEMENT_CACHE_SIZE = 64
+
+
+class UnknownColumnError(ValueError):
+    """Raised when a payload names columns its table does not have."""
+
+    def __init__(self, table, columns):
+        super().__init__(f"Campos desconhecidos: {', '.join(columns)}.")
+        self.table = table
+        self.columns = columns
+
+
+def select_list(table, exclude=()):
+    """The table's columns, by name and in schema order, for a SELECT."""
+    return ', '.join(column for column in TABLE_COLUMNS[table] if column not in exclude)
+
+
+def writable_changes(table, data):
+    """
+    Returns {column: value} for the writable columns in `data`, in schema order.
+    Immutable columns are dropped (clients send whole records back); any key that
+    is not a column of the table raises UnknownColumnError.
+    """
+    unknown = sorted(key for key in data if key not in _KNOWN_COLUMNS[table])
+    if unknown:
+        raise UnknownColumnError(table, unknown)
+    return {column: data[column] for column in WRITABLE_COLUMNS[table] if column in data}
+
+
+def build_update(table, changes, where=('id', 'cliente_id')):
+    """
+    Builds UPDATE `table` SET <changes>, updatedAt = NOW() WHERE <where> = %s AND ...
+    with the SET columns in schema order. Returns (sql, values) without the WHERE
+    values, which the caller appends in `where` order. Column names must be in
+    TABLE_COLUMNS (KeyError otherwise).
+    """
+    columns = [column for column in TABLE_COLUMNS[table] if column in changes]
+    if len(columns) != len(changes):
+        raise KeyError(f"Colunas fora do esquema de {table}: {sorted(set(changes) - set(columns))}")
+    set_clauses = [f"{column} = %s" for column in columns]
+    set_clauses.append("updatedAt = NOW()")
+    sql = f"UPDATE {table} SET {', '.join(set_clauses)} WHERE {' AND '.join(f'{column} = %s' for column in where)}"
+    return sql, [changes[column] for column in columns]
+
+
+class PreparedStatementCache:
+    """
+    The prepared statements of one MySQL connection: one prepared cursor per SQL
+    text, least recently used closed (deallocated on the server) beyond `size`.
+    Lives as long as the raw connection, across pool checkouts.
+    """
+
+    def __init__(self, raw, size=DEFAULT_STATEMENT_CACHE_SIZE):
+        self._raw = raw
+        self.size = size
+        self._entries = OrderedDict()  # sql -> (sql, cursor)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def lookup(self, sql):
+        """
+        Returns (sql, cursor, hit). Execute the returned `sql` object, not an equal
+        string: mysql.connector re-prepares unless the text is the very same object.
+        """
+        entry = self._entries.get(sql)
+        if entry is not None:
+            self._entries.move_to_end(sql)
+            return entry[0], entry[1], True
+        while len(self._entries) >= self.size:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            try:
+                evicted.close()
+            except Exception:
+                pass  # a broken connection is discarded by the pool anyway
+        cursor = self._raw.cursor(prepared=True)
+        self._entries[sql] = (sql, cursor)
+        return sql, cursor, False
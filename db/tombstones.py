@@ -0,0 +1,19 @@
+# db/tombstones.py
+"""Tombstones for hard-deleted rows, read by the delta sync (`?since=`) endpoints."""
+
+
+def record_tombstones(cursor, cliente_id, resource, record_ids):
+    """Records hard-deleted ids so delta sync can report them. Call inside the deleting transaction."""
+    if record_ids:
+        cursor.executemany(
+            "INSERT INTO deleted_records (cliente_id, resource, record_id) VALUES (%s, %s, %s)",
+            [(cliente_id, resource, record_id) for record_id in record_ids]
+        )
+
+
+def record_tire_event_tombstones(cursor, cliente_id, tire_id):
+    """Tombstones the events a tire deletion removes through ON DELETE CASCADE."""
+    cursor.execute("""
+        INSERT INTO deleted_records (cliente_id, resource, record_id)
+        SELECT cliente_id, 'events', id FROM tire_events WHERE cliente_id = %s AND tireId = %s
+    """, (cliente_id, tire_id))
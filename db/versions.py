@@ -0,0 +1,50 @@
+# db/versions.py
+"""
+Per-tenant list versions: the source of the list ETags (migration 0007).
+
+Every write bumps the versions of the resources it changed once its transaction has
+committed and before the read cache drops the tenant's entries, so a version read
+after the new rows are visible is already the bumped one. Two edits in the same
+second still produce two versions, and reading one is a primary-key lookup however
+many rows the tenant has.
+"""
+
+LIST_VERSION_RESOURCES = ('tires', 'vehicles', 'events')
+
+
+def bump_list_versions(connection, cliente_id, resources):
+    """
+    Increments the tenant's versions of `resources` in a transaction of its own.
+    Runs after the write committed (invalidate_tenant's contract): anything still
+    uncommitted on the connection belongs to a failed write and is rolled back first.
+    """
+    # sorted: concurrent bumps lock the rows in the same order
+    resources = sorted(set(resources) & set(LIST_VERSION_RESOURCES))
+    if not resources:
+        return
+    if connection.in_transaction:
+        connection.rollback()
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            "INSERT INTO list_versions (cliente_id, resource, version) VALUES "
+            + ', '.join(['(%s, %s, 1)'] * len(resources))
+            + " ON DUPLICATE KEY UPDATE version = version + 1",
+            [value for resource in resources for value in (cliente_id, resource)]
+        )
+        connection.commit()
+    finally:
+        cursor.close()
+
+
+def list_versions_query(cliente_id, resources):
+    """Returns (sql, values) reading (resource, version) rows of the tenant."""
+    return (f"SELECT resource, version FROM list_versions "
+            f"WHERE cliente_id = %s AND resource IN ({', '.join(['%s'] * len(resources))})",
+            [cliente_id, *resources])
+
+
+def versions_from_rows(rows, resources):
+    """The versions of `resources`, in order, from (resource, version) rows (0 when missing)."""
+    found = {row[0]: row[1] for row in rows}
+    return tuple(int(found.get(resource, 0)) for resource in resources)
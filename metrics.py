@@ -0,0 +1,305 @@
+# metrics.py
+"""
+Request and database metrics in the Prometheus text format (GET /metrics).
+
+A minimal in-process registry: every Gunicorn worker keeps its own series, so
+scrape each worker (or aggregate by instance) as with any per-process exporter.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+from flask import g, request, has_request_context, Response
+
+from db.instrumentation import add_statement_observer, add_fetch_observer, add_acquire_observer
+
+DEFAULT_METRICS_CONFIG = {
+    'enabled': True,
+    'per_tenant': False,  # request duration by cliente_id (one series per tenant: enable only for few tenants)
+}
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+SQL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def load_metrics_config():
+    """Returns METRICS_CONFIG from config.py merged over the defaults."""
+    config = dict(DEFAULT_METRICS_CONFIG)
+    try:
+        from config import METRICS_CONFIG
+        config.update(METRICS_CONFIG)
+    except ImportError:
+        pass
+    return config
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labelvalues, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labelvalues)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative histogram; observe() is one bisect and a few additions under a lock."""
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series = {}  # labelvalues -> [per-bucket counts (+Inf last), sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = sorted((labelvalues, (list(s[0]), s[1], s[2])) for labelvalues, s in self._series.items())
+        for labelvalues, (counts, total, count) in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                le = 'le="+Inf"' if bound == '+Inf' else f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labelvalues, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labelvalues)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labelvalues)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        """collector() returns exposition lines computed at scrape time (gauges)."""
+        self.collectors.append(collector)
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for collector in self.collectors:
+            try:
+                lines.extend(collector())
+            except Exception as e:
+                print(f"Erro ao coletar métricas: {e}")
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+REQUEST_DURATION = registry.register(Histogram(
+    'http_request_duration_seconds', 'Time to produce the response, by route.', ('method', 'route', 'status')))
+TENANT_REQUEST_DURATION = registry.register(Histogram(
+    'http_tenant_request_duration_seconds', 'Time to produce the response, by tenant.', ('cliente_id',)))
+RESPONSE_SIZE = registry.register(Histogram(
+    'http_response_size_bytes', 'Response body size as sent (after compression), by route.', ('route',),
+    buckets=SIZE_BUCKETS))
+REQUEST_SQL_STATEMENTS = registry.register(Histogram(
+    'db_request_statements', 'SQL statements executed per request, by route.', ('route',), buckets=SQL_COUNT_BUCKETS))
+REQUEST_SQL_DURATION = registry.register(Histogram(
+    'db_request_duration_seconds', 'Total SQL time per request (statements and row fetches), by route.', ('route',),
+    buckets=SQL_LATENCY_BUCKETS))
+STATEMENT_DURATION = registry.register(Histogram(
+    'db_statement_duration_seconds', 'Duration of each SQL statement (execute and row fetches), by operation.',
+    ('operation',),
+    buckets=SQL_LATENCY_BUCKETS))
+STATEMENT_ERRORS = registry.register(Counter(
+    'db_statement_errors_total', 'SQL statements that raised, by operation.', ('operation',)))
+FETCH_SECONDS = registry.register(Counter(
+    'db_fetch_seconds_total', 'Time spent fetching result rows, after the statements returned.'))
+ACQUIRE_WAIT = registry.register(Histogram(
+    'db_pool_acquire_wait_seconds', 'Wait to check a connection out of the pool.', buckets=SQL_LATENCY_BUCKETS))
+
+
+def statement_operation(statement):
+    """First keyword of a statement (SELECT, INSERT, ...), used as a low-cardinality label."""
+    head = statement.lstrip()[:12].split(None, 1)
+    return head[0].upper() if head else 'OTHER'
+
+
+def observe_statement(statement, params, seconds, error):
+    operation = statement_operation(statement)
+    STATEMENT_DURATION.observe(seconds, operation)
+    if error is not None:
+        STATEMENT_ERRORS.inc(operation)
+    if has_request_context():
+        g.sql_statements = g.get('sql_statements', 0) + 1
+        g.sql_seconds = g.get('sql_seconds', 0.0) + seconds
+
+
+def observe_fetch(seconds):
+    FETCH_SECONDS.inc(amount=seconds)  # also part of the statement's time in observe_statement
+
+
+def observe_acquire(seconds):
+    ACQUIRE_WAIT.observe(seconds)
+
+
+def _route_label():
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+
+def record_request(response, started, per_tenant):
+    """Records the request histograms for a finished response."""
+    elapsed = time.perf_counter() - started
+    route = _route_label()
+    REQUEST_DURATION.observe(elapsed, request.method, route, response.status_code)
+    if per_tenant:
+        cliente_id = request.args.get('cliente_id')
+        if cliente_id:
+            TENANT_REQUEST_DURATION.observe(elapsed, cliente_id)
+    if response.content_length is not None:
+        RESPONSE_SIZE.observe(response.content_length, route)
+
+
+def record_request_sql(state, route):
+    """Records the SQL histograms from the request's `g` (statement count and SQL time)."""
+    REQUEST_SQL_STATEMENTS.observe(state.get('sql_statements', 0), route)
+    REQUEST_SQL_DURATION.observe(state.get('sql_seconds', 0.0), route)
+
+
+def pool_collector():
+    from db.connection import get_pool
+    stats = get_pool().stats()
+    lines = []
+    for key in ('size', 'open', 'in_use', 'idle', 'waiting'):
+        lines.append(f"# TYPE db_pool_{key} gauge")
+        lines.append(f"db_pool_{key} {stats[key]}")
+    for key in ('acquires', 'timeouts', 'recycled', 'failed_health_checks'):
+        lines.append(f"# TYPE db_pool_{key}_total counter")
+        lines.append(f"db_pool_{key}_total {stats[key]}")
+    return lines
+
+
+def cache_collector():
+    from db.cache import cache_stats
+    stats = cache_stats()
+    lines = []
+    for key in ('hits', 'misses', 'evictions', 'invalidations'):
+        lines.append(f"# TYPE tenant_cache_{key}_total counter")
+        lines.append(f"tenant_cache_{key}_total {stats[key]}")
+    for key in ('entries', 'bytes'):
+        lines.append(f"# TYPE tenant_cache_{key} gauge")
+        lines.append(f"tenant_cache_{key} {stats[key]}")
+    return lines
+
+
+registry.add_collector(pool_collector)
+registry.add_collector(cache_collector)
+
+
+def metrics_response():
+    return Response(registry.render(), mimetype=None, content_type=CONTENT_TYPE)
+
+
+def init_app(app):
+    """
+    Installs the request middleware and the SQL/pool observers on the Flask app.
+    Register it before hooks that rewrite the body (compression) so the size
+    recorded is the one sent.
+    """
+    config = load_metrics_config()
+    if not config['enabled']:
+        return app
+    add_statement_observer(observe_statement)
+    add_fetch_observer(observe_fetch)
+    add_acquire_observer(observe_acquire)
+    per_tenant = config['per_tenant']
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            record_request(response, started, per_tenant)
+            route = _route_label()
+            if response.is_streamed:
+                # The rows of a streamed body are fetched while it is sent, after this
+                # hook: record the SQL time once the server has closed the response
+                state = g._get_current_object()
+                response.call_on_close(lambda: record_request_sql(state, route))
+            else:
+                record_request_sql(g, route)
+        return response
+
+    return app
+
+
+def init_async_app(app):
+    """Request duration and size for the async routes of asgi.py (their SQL runs on aiomysql)."""
+    from quart import request as async_request, g as async_g
+    config = load_metrics_config()
+    if not config['enabled']:
+        return app
+    per_tenant = config['per_tenant']
+
+    @app.before_request
+    async def start_request_timer():
+        async_g.request_started = time.perf_counter()
+
+    @app.after_request
+    async def record_request_metrics(response):
+        started = getattr(async_g, 'request_started', None)
+        if started is not None:
+            elapsed = time.perf_counter() - started
+            route = async_request.url_rule.rule if async_request.url_rule is not None else 'unmatched'
+            REQUEST_DURATION.observe(elapsed, async_request.method, route, response.status_code)
+            cliente_id = async_request.args.get('cliente_id')
+            if per_tenant and cliente_id:
+                TENANT_REQUEST_DURATION.observe(elapsed, cliente_id)
+            if response.content_length is not None:
+                RESPONSE_SIZE.observe(response.content_length, route)
+        return response
+
+    return app
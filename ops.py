@@ -0,0 +1,76 @@
+# ops.py
+"""
+Access control for the operational endpoints (/metrics, pool, cache and
+slow-query reports, tenant-wide rebuilds): they are not part of the client API and must not be
+reachable with just a cliente_id.
+
+A request is let through when it carries OPS_CONFIG['token'] in the X-Ops-Token
+header (or as "Authorization: Bearer <token>"), or, with 'allow_localhost', when
+it comes from the loopback interface. Behind a reverse proxy every request comes
+from the proxy's address: set a token and leave 'allow_localhost' off there.
+"""
+import hmac
+from functools import wraps
+
+from flask import jsonify, request
+
+DEFAULT_OPS_CONFIG = {
+    'token': None,             # shared secret for the ops endpoints; None accepts no token
+    'allow_localhost': True,   # also accept requests from 127.0.0.1 / ::1 without a token
+}
+
+LOOPBACK_ADDRESSES = ('127.0.0.1', '::1')
+
+
+def load_ops_config():
+    """Returns OPS_CONFIG from config.py merged over the defaults."""
+    config = dict(DEFAULT_OPS_CONFIG)
+    try:
+        from config import OPS_CONFIG
+        config.update(OPS_CONFIG)
+    except ImportError:
+        pass
+    return config
+
+
+_config = load_ops_config()
+
+
+def _request_token(current):
+    token = current.headers.get('X-Ops-Token')
+    if token:
+        return token
+    scheme, _, credentials = current.headers.get('Authorization', '').partition(' ')
+    return credentials.strip() if scheme.lower() == 'bearer' else None
+
+
+def is_ops_request(current=None):
+    """True when the current request (Flask's, or the given one) may use the operational endpoints."""
+    current = request if current is None else current
+    expected = _config['token']
+    token = _request_token(current)
+    if expected and token and hmac.compare_digest(token.encode(), str(expected).encode()):
+        return True
+    return bool(_config['allow_localhost']) and current.remote_addr in LOOPBACK_ADDRESSES
+
+
+def require_ops(view):
+    """Decorator: answers 403 unless is_ops_request()."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not is_ops_request():
+            return jsonify({"message": "Acesso restrito à operação (X-Ops-Token ou localhost)."}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def require_ops_async(view):
+    """require_ops for the Quart routes in asgi.py."""
+    from quart import jsonify as quart_jsonify, request as quart_request
+
+    @wraps(view)
+    async def wrapper(*args, **kwargs):
+        if not is_ops_request(quart_request):
+            return quart_jsonify({"message": "Acesso restrito à operação (X-Ops-Token ou localhost)."}), 403
+        return await view(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,153 @@
+# responses.py
+"""
+Response encoding shared by the Flask (app.py) and ASGI (asgi.py) apps: the JSON
+provider every controller serializes through (jsonify / current_app.json.dumps)
+and the gzip/brotli compression of large bodies.
+"""
+import gzip
+from datetime import date
+from decimal import Decimal
+from functools import lru_cache
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider, _default
+from werkzeug.http import http_date
+
+try:
+    import orjson
+except ImportError:  # falls back to the standard library encoder
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+DEFAULT_RESPONSE_CONFIG = {
+    'json_serializer': 'orjson',   # 'orjson' or 'std'
+    'date_format': 'http',         # 'http' (Flask's format, e.g. "Mon, 01 Jan 2024 00:00:00 GMT") or 'iso'
+    'compression_min_size': 1024,  # bytes; smaller bodies are sent as-is
+    'gzip_level': 6,
+    'brotli_quality': 4,
+}
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/csv', 'text/html', 'text/plain')
+
+
+def load_response_config():
+    """Returns RESPONSE_CONFIG from config.py merged over the defaults."""
+    config = dict(DEFAULT_RESPONSE_CONFIG)
+    try:
+        from config import RESPONSE_CONFIG
+        config.update(RESPONSE_CONFIG)
+    except ImportError:
+        pass
+    return config
+
+
+# Dates repeat a lot across rows (acquisition dates, createdAt of imported batches)
+_cached_http_date = lru_cache(maxsize=8192)(http_date)
+
+
+def _orjson_default(o):
+    if isinstance(o, Decimal):
+        return str(o)
+    if isinstance(o, date):
+        return _cached_http_date(o)
+    return _default(o)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    JSON provider backed by orjson. Keys are sorted like Flask's provider so cached
+    bodies and ETags stay stable. Decimals are sent as strings and, with date_format
+    'http', dates keep Flask's wire format; 'iso' lets orjson encode dates natively.
+    """
+
+    date_format = 'http'
+
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+        if self.date_format == 'http':
+            option |= orjson.OPT_PASSTHROUGH_DATETIME
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_orjson_default, option=option).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+def json_provider_class(config=None):
+    """Returns the JSON provider class selected by RESPONSE_CONFIG."""
+    config = config or load_response_config()
+    if config['json_serializer'] != 'orjson' or orjson is None:
+        return DefaultJSONProvider
+    return type('ConfiguredOrjsonProvider', (OrjsonProvider,), {'date_format': config['date_format']})
+
+
+def negotiate_encoding(accept_encodings):
+    """Picks 'br' or 'gzip' from the request's Accept-Encoding (honouring q-values), or None."""
+    offered = ('br', 'gzip') if brotli is not None else ('gzip',)
+    return accept_encodings.best_match(offered)
+
+
+def compress_body(data, encoding, config):
+    if encoding == 'br':
+        return brotli.compress(data, quality=config['brotli_quality'])
+    return gzip.compress(data, compresslevel=config['gzip_level'])
+
+
+def should_compress(response, config):
+    # Streamed bodies (e.g. /api/events?stream=1) have no Content-Length and are left alone
+    return (
+        response.status_code == 200
+        and 'Content-Encoding' not in response.headers
+        and response.mimetype in COMPRESSIBLE_MIMETYPES
+        and (response.content_length or 0) >= config['compression_min_size']
+    )
+
+
+def apply_compression(response, data, encoding, config):
+    """Replaces the body with its compressed form and fixes the related headers."""
+    response.set_data(compress_body(data, encoding, config))
+    response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)  # same resource version, different bytes per encoding
+
+
+def init_app(app):
+    """Installs the configured JSON provider and the compression hook on a Flask app."""
+    config = load_response_config()
+    app.json = json_provider_class(config)(app)
+
+    @app.after_request
+    def compress_response(response):
+        if response.direct_passthrough or not should_compress(response, config):
+            return response
+        encoding = negotiate_encoding(request.accept_encodings)
+        if encoding:
+            apply_compression(response, response.get_data(), encoding, config)
+        return response
+
+    return app
+
+
+def init_async_app(app):
+    """Same as init_app for the Quart app in asgi.py (its body accessors are coroutines)."""
+    from quart import request as async_request
+    config = load_response_config()
+    app.json = json_provider_class(config)(app)
+
+    @app.after_request
+    async def compress_response(response):
+        if not should_compress(response, config):
+            return response
+        encoding = negotiate_encoding(async_request.accept_encodings)
+        if encoding:
+            apply_compression(response, await response.get_data(), encoding, config)
+        return response
+
+    return app
@@ -46,93 +46,22 @@ def test_database_connection():
         return False
 
 def create_database_tables():
-    """Cria as tabelas necessárias no banco de dados"""
+    """Cria/atualiza as tabelas aplicando as migrações pendentes (db/migrations)"""
     try:
-        print("🗄️ Criando tabelas no banco de dados...")
+        print("🗄️ Aplicando migrações no banco de dados...")
         from db.connection import create_db_connection
+        from db.migrate import run as run_migrations
         connection = create_db_connection()
         
         if not connection:
             print("❌ Não foi possível conectar ao banco")
             return False
-            
-        cursor = connection.cursor()
         
-        # Scripts SQL para criar as tabelas
-        sql_scripts = [
-            """
-            CREATE TABLE IF NOT EXISTS vehicles (
-                id VARCHAR(255) PRIMARY KEY,
-                placa VARCHAR(20) NOT NULL,
-                modelo VARCHAR(100),
-                ano INT,
-                eixos INT,
-                cliente_id VARCHAR(255) NOT NULL DEFAULT 'default_client',
-                createdAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
-            )
-            """,
-            """
-            CREATE TABLE IF NOT EXISTS tires (
-                id VARCHAR(255) PRIMARY KEY,
-                numeroFogo VARCHAR(50) NOT NULL,
-                marca VARCHAR(100),
-                modelo VARCHAR(100),
-                tipoPneu VARCHAR(50),
-                medida VARCHAR(50),
-                capacidadeCarga VARCHAR(50),
-                desenhoBanda VARCHAR(100),
-                profundidadeSulcoInicial DECIMAL(5,2),
-                custoAquisicao DECIMAL(10,2),
-                dataAquisicao DATE,
-                fornecedor VARCHAR(100),
-                numeroNF VARCHAR(50),
-                statusInicial VARCHAR(50),
-                numeroRecapagens INT DEFAULT 0,
-                quilometragemTotalPercorrida DECIMAL(10,2) DEFAULT 0,
-                ultimaLeituraHodometroRegistrada DECIMAL(10,2) DEFAULT 0,
-                profundidadeSulcoAtual DECIMAL(5,2),
-                currentVehicleId VARCHAR(255),
-                currentVehiclePlaca VARCHAR(20),
-                currentAxle VARCHAR(50),
-                currentPosition VARCHAR(50),
-                cliente_id VARCHAR(255) NOT NULL DEFAULT 'default_client',
-                createdAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                FOREIGN KEY (currentVehicleId) REFERENCES vehicles(id) ON DELETE SET NULL
-            )
-            """,
-            """
-            CREATE TABLE IF NOT EXISTS tire_events (
-                id VARCHAR(255) PRIMARY KEY,
-                tireId VARCHAR(255) NOT NULL,
-                tipo VARCHAR(100) NOT NULL,
-                data DATE NOT NULL,
-                observacoes TEXT,
-                detalhes JSON,
-                cliente_id VARCHAR(255) NOT NULL DEFAULT 'default_client',
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (tireId) REFERENCES tires(id) ON DELETE CASCADE
-            )
-            """,
-            """
-            CREATE INDEX IF NOT EXISTS idx_tires_cliente_id ON tires(cliente_id);
-            """,
-            """
-            CREATE INDEX IF NOT EXISTS idx_vehicles_cliente_id ON vehicles(cliente_id);
-            """,
-            """
-            CREATE INDEX IF NOT EXISTS idx_tire_events_cliente_id ON tire_events(cliente_id);
-            """
-        ]
-        
-        for script in sql_scripts:
-            cursor.execute(script)
-        
-        connection.commit()
+        try:
+            run_migrations(connection, 'up', out=lambda line: print("   " + line))
+        finally:
+            connection.close()
         print("✅ Tabelas criadas com sucesso")
-        cursor.close()
-        connection.close()
         return True
         
     except Error as e:
@@ -172,7 +101,7 @@ def main():
     
     # Testar conexão com banco
     if not test_database_connection():
-        print("⚠️  Configure as credenciais do banco em db/connection.py")
+        print("⚠️  Configure as credenciais do banco em config.py (veja config.example.py)")
         sys.exit(1)
     
     # Criar tabelas
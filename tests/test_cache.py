@@ -0,0 +1,81 @@
+import pytest
+
+from db.cache import TenantCache
+
+
+@pytest.fixture
+def cache():
+    return TenantCache(max_bytes=400, default_ttl=60)
+
+
+def test_hit_and_miss(cache):
+    assert cache.get('c1', 'tires') is None
+    cache.set('c1', 'tires', (), 'x' * 10, depends_on=('tires',))
+    assert cache.get('c1', 'tires') == 'x' * 10
+    assert cache.get('c2', 'tires') is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_params_are_part_of_the_key(cache):
+    cache.set('c1', 'tires', (('limit', '10'),), 'page', depends_on=('tires',))
+    assert cache.get('c1', 'tires', (('limit', '10'),)) == 'page'
+    assert cache.get('c1', 'tires') is None
+
+
+def test_least_recently_used_is_evicted_over_the_byte_budget(cache):
+    for name in ('a', 'b', 'c', 'd'):
+        cache.set('c1', name, (), 'x' * 100, depends_on=('tires',))
+    cache.get('c1', 'a')  # 'b' is now the least recently used
+    cache.set('c1', 'e', (), 'x' * 100, depends_on=('tires',))
+    assert cache.get('c1', 'b') is None
+    assert all(cache.get('c1', name) is not None for name in ('a', 'c', 'd', 'e'))
+    stats = cache.stats()
+    assert stats['bytes'] == 400 and stats['entries'] == 4 and stats['evictions'] == 1
+
+
+def test_value_over_a_quarter_of_the_budget_is_not_cached(cache):
+    cache.set('c1', 'big', (), 'x' * 101, depends_on=('tires',))
+    assert cache.get('c1', 'big') is None
+    assert cache.stats()['bytes'] == 0
+
+
+def test_replacing_an_entry_keeps_the_byte_count(cache):
+    cache.set('c1', 'a', (), 'x' * 50, depends_on=('tires',))
+    cache.set('c1', 'a', (), 'x' * 20, depends_on=('tires',))
+    assert cache.stats()['bytes'] == 20
+
+
+def test_invalidation_drops_only_dependent_entries_of_the_tenant(cache):
+    cache.set('c1', 'tires', (), 't', depends_on=('tires',))
+    cache.set('c1', 'vehicles', (), 'v', depends_on=('vehicles',))
+    cache.set('c1', 'bootstrap', (), 'b', depends_on=('tires', 'vehicles'))
+    cache.set('c2', 'tires', (), 't', depends_on=('tires',))
+    cache.invalidate('c1', ['tires'])
+    assert cache.get('c1', 'tires') is None
+    assert cache.get('c1', 'bootstrap') is None
+    assert cache.get('c1', 'vehicles') == 'v'
+    assert cache.get('c2', 'tires') == 't'
+
+
+def test_stale_generation_is_not_stored(cache):
+    generation = cache.generation('c1')
+    cache.invalidate('c1', ['tires'])  # a write lands while the value is computed
+    cache.set('c1', 'tires', (), 'stale', depends_on=('tires',), generation=generation)
+    assert cache.get('c1', 'tires') is None
+    assert cache.generation('c1') == generation + 1
+    assert cache.generation('c2') == 0
+    cache.set('c1', 'tires', (), 'fresh', depends_on=('tires',), generation=cache.generation('c1'))
+    assert cache.get('c1', 'tires') == 'fresh'
+
+
+def test_expired_entry_is_a_miss(cache):
+    cache.set('c1', 'kpis', (), {'total': 1}, depends_on=('tires',), ttl=-1)
+    assert cache.get('c1', 'kpis') is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_disabled_cache_stores_and_counts_nothing():
+    cache = TenantCache(enabled=False)
+    cache.set('c1', 'tires', (), 'x', depends_on=('tires',))
+    assert cache.get('c1', 'tires') is None
+    assert cache.stats()['misses'] == 0 and cache.stats()['entries'] == 0
@@ -0,0 +1,56 @@
+import numpy as np
+
+from controllers.forecast_controller import fit_wear_rates
+
+
+def fit(rows, tire_count):
+    """rows: (tire index, retread, day, odometer, depth) ordered by tire and time."""
+    tire_index, retread, day, odometer, depth = (np.array(column) for column in zip(*rows))
+    return fit_wear_rates(tire_index.astype(np.int64), retread.astype(bool), day.astype(np.int64),
+                          odometer.astype(np.float64), depth.astype(np.float64), tire_count)
+
+
+def test_linear_wear_is_recovered_per_tire():
+    rows = [
+        (0, False, 0, 100000, 16.0), (0, False, 10, 105000, 15.0), (0, False, 20, 110000, 14.0),
+        (1, False, 0, 0, 12.0), (1, False, 30, 20000, 11.0),
+    ]
+    rate, readings, km_per_day, last_day = fit(rows, 2)
+    np.testing.assert_allclose(rate, [0.0002, 0.00005])
+    assert readings.tolist() == [3, 2]
+    np.testing.assert_allclose(km_per_day, [500.0, 20000 / 30])
+    assert last_day.tolist() == [20, 30]
+
+
+def test_only_the_life_after_the_last_retread_is_fitted():
+    rows = [
+        (0, False, 0, 0, 16.0), (0, False, 10, 10000, 10.0),
+        (0, True, 20, np.nan, np.nan),
+        (0, False, 30, 20000, 14.0), (0, False, 40, 30000, 13.0), (0, False, 50, 40000, 12.0),
+    ]
+    rate, readings, _, last_day = fit(rows, 1)
+    np.testing.assert_allclose(rate, [0.0001])
+    assert readings.tolist() == [3]
+    assert last_day.tolist() == [50]
+
+
+def test_odometer_going_back_does_not_add_km():
+    rows = [(0, False, 0, 48000, 15.0), (0, False, 10, 50000, 14.0), (0, False, 20, 1000, 14.0),
+            (0, False, 30, 3000, 13.0)]
+    rate, *_ = fit(rows, 1)
+    # km 0, 2000, 2000, 4000: the drop to 1000 neither adds nor subtracts km
+    np.testing.assert_allclose(rate, [0.0005])
+
+
+def test_unfittable_tires_are_nan():
+    rows = [
+        (0, False, 0, 1000, 15.0),                              # single reading
+        (1, False, 0, 1000, 12.0), (1, False, 5, 1000, 11.0),   # no km between readings
+        (2, False, 0, 1000, 10.0), (2, False, 5, 2000, 11.0),   # depth went up
+        (3, False, 0, 1000, np.nan), (3, False, 5, 2000, np.nan),
+    ]
+    rate, readings, km_per_day, last_day = fit(rows, 5)
+    assert np.isnan(rate).all()
+    assert readings.tolist() == [1, 2, 2, 0, 0]
+    assert np.isnan(km_per_day[[0, 1, 3, 4]]).all()
+    assert last_day.tolist() == [0, 5, 5, -1, -1]
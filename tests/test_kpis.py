@@ -0,0 +1,32 @@
+from decimal import Decimal
+
+from controllers.kpi_controller import kpi_counters_sql, summarize_kpis, STATUS_BUCKETS
+
+
+def counters(status, total, custo=0, km=0, recapados=0, recapagens=0, custo_recapagens=0):
+    return {'statusInicial': status, 'total': total, 'custoAquisicao': Decimal(custo), 'quilometragem': Decimal(km),
+            'recapados': recapados, 'recapagens': recapagens, 'custoRecapagens': Decimal(custo_recapagens)}
+
+
+def test_summary_adds_up_the_status_counters():
+    kpis = summarize_kpis([counters('Em Uso', 3, 3000, 60000, 1, 2, 800), counters('', 1, 500, 0),
+                           counters('Sucata', 2, 100)])
+    assert kpis['totalPneus'] == 6
+    assert kpis['pneusPorStatus']['Outro'] == 1 and kpis['pneusPorStatus']['Sucata'] == 2
+    assert set(STATUS_BUCKETS) <= set(kpis['pneusPorStatus'])
+    assert kpis['custoTotalRecapagens'] == 800
+    assert kpis['mediaRecapagensPorPneu'] == 2
+    assert kpis['cpk'] == (3600 + 800) / 60000
+
+
+def test_empty_tenant():
+    kpis = summarize_kpis([])
+    assert kpis['totalPneus'] == 0 and kpis['cpk'] == 0 and kpis['mediaRecapagensPorPneu'] == 0
+
+
+def test_counter_deltas():
+    added, removed = kpi_counters_sql(2), kpi_counters_sql(2, -1)
+    assert added.count('%s') == removed.count('%s') == 3
+    assert '-COUNT(*)' in removed and '-COUNT(*)' not in added
+    assert 'total = kpi_counters.total + new.total' in added
+    assert 'IN (' not in kpi_counters_sql()
@@ -0,0 +1,115 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from werkzeug.datastructures import MultiDict
+
+from controllers.pagination import (_encode_cursor, _decode_cursor, parse_list_params, build_list_query,
+                                    build_count_query, build_page, ListParamsError, MAX_PAGE_SIZE)
+
+SORTABLE = ('id', 'marca', 'dataAquisicao')
+FILTERABLE = ('statusInicial', 'marca')
+
+
+def params(**args):
+    return parse_list_params(MultiDict(args), SORTABLE, FILTERABLE)
+
+
+@pytest.mark.parametrize('sort_value, expected', [
+    ('Michelin', 'Michelin'),
+    (42, 42),
+    (None, None),
+    (Decimal('12.50'), '12.50'),
+    (date(2024, 1, 15), '2024-01-15'),
+])
+def test_cursor_round_trip(sort_value, expected):
+    cursor = _encode_cursor(sort_value, 'tire_9')
+    assert '=' not in cursor
+    assert _decode_cursor(cursor) == (expected, 'tire_9')
+
+
+@pytest.mark.parametrize('cursor', ['not a cursor', 'e30', '!!!'])
+def test_invalid_cursor(cursor):
+    with pytest.raises(ListParamsError):
+        _decode_cursor(cursor)
+
+
+def test_without_limit_the_list_is_not_paginated():
+    sql, values = build_list_query('tires', 'c1', params())
+    assert sql == "SELECT * FROM tires WHERE cliente_id = %s ORDER BY id ASC"
+    assert values == ['c1']
+
+
+def test_limit_fetches_one_extra_row():
+    sql, values = build_list_query('tires', 'c1', params(limit='10', sort='marca'))
+    assert sql.endswith("ORDER BY marca ASC, id ASC LIMIT %s")
+    assert values == ['c1', 11]
+
+
+@pytest.mark.parametrize('limit', ['0', str(MAX_PAGE_SIZE + 1), 'ten'])
+def test_limit_bounds(limit):
+    with pytest.raises(ListParamsError):
+        params(limit=limit)
+
+
+def test_unknown_sort_is_rejected():
+    with pytest.raises(ListParamsError):
+        params(sort='custoAquisicao')
+
+
+def test_empty_filter_value_matches_null():
+    sql, values = build_list_query('tires', 'c1', parse_list_params(
+        MultiDict([('marca', 'Pirelli'), ('marca', ''), ('statusInicial', 'Em Uso')]), SORTABLE, FILTERABLE))
+    assert "(statusInicial = %s)" in sql
+    assert "(marca = %s OR marca IS NULL)" in sql
+    assert values == ['c1', 'Em Uso', 'Pirelli']
+
+
+def test_after_cursor_on_id():
+    sql, values = build_list_query('tires', 'c1', params(limit='5', after=_encode_cursor('t5', 't5'), order='desc'))
+    assert "id < %s" in sql
+    assert values == ['c1', 't5', 6]
+
+
+def test_after_cursor_with_value_ascending_excludes_nulls():
+    # NULLs sort first ascending, so they are all before a non-NULL cursor
+    sql, values = build_list_query('tires', 'c1', params(limit='5', sort='marca', after=_encode_cursor('Goodyear', 't3')))
+    assert "(marca > %s OR (marca = %s AND id > %s))" in sql
+    assert values == ['c1', 'Goodyear', 'Goodyear', 't3', 6]
+
+
+def test_after_null_cursor_ascending_continues_into_non_null():
+    sql, values = build_list_query('tires', 'c1', params(limit='5', sort='marca', after=_encode_cursor(None, 't3')))
+    assert "((marca IS NULL AND id > %s) OR marca IS NOT NULL)" in sql
+    assert values == ['c1', 't3', 6]
+
+
+def test_after_cursor_descending_reaches_nulls_last():
+    sql, _ = build_list_query('tires', 'c1', params(limit='5', sort='marca', order='desc',
+                                                     after=_encode_cursor('Goodyear', 't3')))
+    assert "(marca < %s OR (marca = %s AND id < %s) OR marca IS NULL)" in sql
+    sql, values = build_list_query('tires', 'c1', params(limit='5', sort='marca', order='desc',
+                                                          after=_encode_cursor(None, 't3')))
+    assert "(marca IS NULL AND id < %s)" in sql
+    assert values == ['c1', 't3', 6]
+
+
+def test_total_is_opt_in_and_ignores_the_cursor():
+    assert not params(limit='5')['total']
+    assert not params(total='1')['total']  # only paginated lists carry a total
+    listed = params(limit='5', total='1', marca='Pirelli', after=_encode_cursor('Pirelli', 't3'), sort='marca')
+    assert listed['total']
+    sql, values = build_count_query('tires', 'c1', listed)
+    assert sql == "SELECT COUNT(*) AS total FROM tires WHERE cliente_id = %s AND (marca = %s)"
+    assert values == ['c1', 'Pirelli']
+
+
+def test_build_page():
+    listed = params(limit='2', sort='marca')
+    rows = [{'id': 't1', 'marca': 'A'}, {'id': 't2', 'marca': None}, {'id': 't3', 'marca': 'C'}]
+    page = build_page(rows, listed, total=7)
+    assert page['items'] == rows[:2]
+    assert page['hasMore'] and page['total'] == 7
+    assert _decode_cursor(page['nextCursor']) == (None, 't2')
+    last = build_page(rows[:1], listed)
+    assert last == {'items': rows[:1], 'hasMore': False, 'nextCursor': None}
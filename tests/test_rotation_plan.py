@@ -0,0 +1,94 @@
+import pytest
+
+from controllers.tire_controller import (parse_rotation_moves, parse_rotation_date, resolve_rotation_plan,
+                                         RotationPlanError, ROTATION_PLAN_MAX_MOVES)
+
+
+def mounted(tire_id, position, vehicle_id='v1', axle='Eixo 1'):
+    return {'id': tire_id, 'numeroFogo': tire_id.upper(), 'statusInicial': 'Em Uso', 'currentVehicleId': vehicle_id,
+            'currentAxle': axle, 'currentPosition': position}
+
+
+TIRES = {
+    't1': mounted('t1', 'Esquerda Externa'),
+    't2': mounted('t2', 'Esquerda Interna'),
+    't3': mounted('t3', 'Direita Interna'),
+    't4': mounted('t4', 'Simples Esquerda', vehicle_id='v2', axle='Eixo Dianteiro'),
+}
+
+
+def slot(tire_id):
+    tire = TIRES[tire_id]
+    return (tire['currentVehicleId'], tire['currentAxle'], tire['currentPosition'])
+
+
+def test_swap_by_tire():
+    parsed = parse_rotation_moves([{'tireId': 't1', 'toTireId': 't2'}, {'tireId': 't2', 'toTireId': 't1'}])
+    assert resolve_rotation_plan(parsed, TIRES) == {'t1': (slot('t1'), slot('t2')), 't2': (slot('t2'), slot('t1'))}
+
+
+def test_cycle_across_vehicles_by_slot():
+    moves = [
+        {'tireId': 't1', 'toTireId': 't3'},
+        {'tireId': 't3', 'vehicleId': 'v2', 'axle': 'Eixo Dianteiro', 'position': 'Simples Esquerda'},
+        {'tireId': 't4', 'toTireId': 't1'},
+    ]
+    resolved = resolve_rotation_plan(parse_rotation_moves(moves), TIRES)
+    assert {tire_id: target for tire_id, (_, target) in resolved.items()} == {
+        't1': slot('t3'), 't3': slot('t4'), 't4': slot('t1')}
+
+
+def test_slots_compare_as_strings():
+    tires = {'a': mounted('a', 1), 'b': mounted('b', 2)}
+    parsed = parse_rotation_moves([{'tireId': 'a', 'vehicleId': 'v1', 'axle': 'Eixo 1', 'position': '2'},
+                                   {'tireId': 'b', 'toTireId': 'a'}])
+    assert resolve_rotation_plan(parsed, tires)['a'][1] == ('v1', 'Eixo 1', '2')
+
+
+@pytest.mark.parametrize('moves', [
+    None,
+    [],
+    [{'toTireId': 't2'}],
+    [{'tireId': 't1', 'toTireId': 't2'}, {'tireId': 't1', 'toTireId': 't3'}],
+    [{'tireId': 't1', 'vehicleId': 'v1', 'axle': 'Eixo 1'}],
+    [{'tireId': f't{index}', 'toTireId': 't1'} for index in range(ROTATION_PLAN_MAX_MOVES + 1)],
+])
+def test_malformed_plans_are_rejected(moves):
+    with pytest.raises(RotationPlanError):
+        parse_rotation_moves(moves)
+
+
+def test_destination_outside_the_plan_is_rejected():
+    # t3's position is not vacated: t3 is not part of the plan
+    parsed = parse_rotation_moves([{'tireId': 't1', 'vehicleId': 'v1', 'axle': 'Eixo 1', 'position': 'Direita Interna'}])
+    with pytest.raises(RotationPlanError, match="permutação"):
+        resolve_rotation_plan(parsed, TIRES)
+
+
+def test_target_tire_must_be_in_the_plan():
+    parsed = parse_rotation_moves([{'tireId': 't1', 'toTireId': 't9'}])
+    with pytest.raises(RotationPlanError, match="toTireId"):
+        resolve_rotation_plan(parsed, TIRES)
+
+
+def test_two_tires_to_the_same_position_are_rejected():
+    parsed = parse_rotation_moves([{'tireId': 't1', 'toTireId': 't2'}, {'tireId': 't2', 'toTireId': 't2'}])
+    with pytest.raises(RotationPlanError, match="mesma posição") as error:
+        resolve_rotation_plan(parsed, TIRES)
+    assert error.value.extra['posicao'] == {'vehicleId': 'v1', 'axle': 'Eixo 1', 'position': 'Esquerda Interna'}
+
+
+def test_unmounted_tire_is_rejected():
+    tires = dict(TIRES, t5={'id': 't5', 'numeroFogo': 'T5', 'statusInicial': 'Em Estoque - Novo',
+                            'currentVehicleId': None, 'currentAxle': None, 'currentPosition': None})
+    parsed = parse_rotation_moves([{'tireId': 't5', 'toTireId': 't1'}, {'tireId': 't1', 'toTireId': 't5'}])
+    with pytest.raises(RotationPlanError, match="T5"):
+        resolve_rotation_plan(parsed, tires)
+
+
+def test_plan_date_must_be_a_date():
+    assert parse_rotation_date('2024-05-01') == '2024-05-01'
+    assert len(parse_rotation_date(None)) == 10
+    for value in ('01/05/2024', '2024-05-01T10:00:00', "2024-05-01'; --"):
+        with pytest.raises(RotationPlanError, match="AAAA-MM-DD"):
+            parse_rotation_date(value)
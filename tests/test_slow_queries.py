@@ -0,0 +1,139 @@
+import time
+
+import pytest
+
+from db import instrumentation
+from db.instrumentation import InstrumentedCursor
+from db.slow_queries import fingerprint, redact_params, SlowQueryLog
+
+
+@pytest.mark.parametrize('statement, expected', [
+    ("SELECT * FROM tires WHERE cliente_id = 'acme' AND id = 42",
+     "SELECT * FROM tires WHERE cliente_id = ? AND id = ?"),
+    ("SELECT * FROM tires WHERE cliente_id = %s AND marca IN (%s, %s, %s)",
+     "SELECT * FROM tires WHERE cliente_id = ? AND marca IN (?+)"),
+    ("SELECT * FROM tires WHERE id IN (1,2)", "SELECT * FROM tires WHERE id IN (?+)"),
+    ("INSERT INTO tire_events (id, seq) VALUES (%s, %s), (%s, %s), (%s, %s)",
+     "INSERT INTO tire_events (id, seq) VALUES (?, ?), ..."),
+    ("SELECT /* route */ a\n  FROM   t -- trailing\nWHERE x = %(cliente_id)s",
+     "SELECT a FROM t WHERE x = ?"),
+    ("SELECT t1.id FROM tire_analytics t1 WHERE t1.cpk > -0.5", "SELECT t1.id FROM tire_analytics t1 WHERE t1.cpk > ?"),
+    ("SELECT * FROM t WHERE a = 'it''s' AND b = \"x\"", "SELECT * FROM t WHERE a = ? AND b = ?"),
+])
+def test_fingerprint(statement, expected):
+    assert fingerprint(statement) == expected
+
+
+def test_redact_params_keeps_shape_not_values():
+    assert redact_params(None) is None
+    assert redact_params(('acme', 42, 1.5, None, True)) == ['<str:4>', '<int>', '<float>', None, '<bool>']
+    assert redact_params({'cliente_id': 'acme'}) == {'cliente_id': '<str:4>'}
+    assert redact_params([('a', 1), ('b', 2)]) == {'rows': 2, 'first': ['<str:1>', '<int>']}
+
+
+def slow_log(threshold_ms=100, **options):
+    log = SlowQueryLog(threshold_ms=threshold_ms, log=False, **options)
+    log._ensure_worker = lambda: None  # EXPLAINs stay queued
+    return log
+
+
+def test_only_statements_over_the_threshold_are_recorded():
+    log = slow_log(explain=False)
+    log.observe("SELECT * FROM tires WHERE id = %s", ('t1',), 0.05, None)
+    log.observe("SELECT * FROM tires WHERE id = %s", ('t2',), 0.3, None)
+    log.observe("SELECT * FROM tires WHERE id = 7", None, 0.1, RuntimeError())
+    report = log.report()
+    assert report['fingerprints'] == 1
+    entry = report['statements'][0]
+    assert (entry['count'], entry['errors'], entry['max_ms'], entry['avg_ms']) == (2, 1, 300.0, 200.0)
+    assert entry['last_params'] is None
+    assert '_explaining' not in entry
+
+
+def test_report_order_and_eviction():
+    log = slow_log(explain=False, max_fingerprints=2)
+    log.observe("SELECT a FROM t", None, 1.0, None)
+    log.observe("SELECT b FROM t", None, 0.2, None)
+    log.observe("SELECT b FROM t", None, 0.2, None)
+    assert [row['fingerprint'] for row in log.report(order='count')['statements']] == ["SELECT b FROM t", "SELECT a FROM t"]
+    log.observe("SELECT c FROM t", None, 0.5, None)  # evicts the least total time: b (400 ms)
+    assert {row['fingerprint'] for row in log.report()['statements']} == {"SELECT a FROM t", "SELECT c FROM t"}
+
+
+def test_each_select_fingerprint_is_queued_for_explain_once():
+    log = slow_log(explain_queue_size=1)
+    log.observe("SELECT a FROM t WHERE id = 1", None, 0.2, None)
+    log.observe("SELECT a FROM t WHERE id = 2", None, 0.2, None)
+    log.observe("UPDATE t SET a = 1", None, 0.2, None)
+    log.observe("SELECT b FROM t", None, 0.2, None)  # queue full: dropped, retried on a later run
+    assert log._explain_queue.qsize() == 1
+    assert log._entries["SELECT b FROM t"]["_explaining"] is False
+
+
+class UnbufferedCursor:
+    """Executes instantly; every fetch takes `fetch_seconds`, as rows stream from the server."""
+
+    arraysize = 1
+    with_rows = True
+
+    def __init__(self, rows, fetch_seconds):
+        self.rows = list(rows)
+        self.fetch_seconds = fetch_seconds
+        self.closed = False
+
+    def execute(self, statement, params=None):
+        pass
+
+    def _take(self, count):
+        time.sleep(self.fetch_seconds)
+        taken, self.rows = self.rows[:count], self.rows[count:]
+        return taken
+
+    def fetchone(self):
+        taken = self._take(1)
+        return taken[0] if taken else None
+
+    def fetchmany(self, size=1):
+        return self._take(size)
+
+    def fetchall(self):
+        return self._take(len(self.rows))
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def observed(monkeypatch):
+    log = slow_log(explain=False, threshold_ms=50)
+    monkeypatch.setattr(instrumentation, 'statement_observers', [log.observe])
+    monkeypatch.setattr(instrumentation, 'fetch_observers', [])
+    return log
+
+
+def test_fetch_time_of_an_unbuffered_scan_counts_toward_the_threshold(observed):
+    cursor = InstrumentedCursor(UnbufferedCursor([(1,), (2,), (3,)], fetch_seconds=0.03))
+    cursor.execute("SELECT id FROM tire_events WHERE cliente_id = %s", ('c1',))
+    assert observed.report()['fingerprints'] == 0  # reported once the rows are read
+    while cursor.fetchmany(2):
+        pass
+    entry = observed.report()['statements'][0]
+    assert entry['fingerprint'] == "SELECT id FROM tire_events WHERE cliente_id = ?"
+    assert entry['count'] == 1 and entry['max_ms'] >= 50
+
+
+def test_partially_read_result_is_reported_on_close(observed):
+    cursor = InstrumentedCursor(UnbufferedCursor([(1,), (2,), (3,)], fetch_seconds=0.06))
+    cursor.execute("SELECT id FROM tires", None)
+    assert cursor.fetchone() == (1,)
+    assert observed.report()['fingerprints'] == 0
+    cursor.close()
+    assert cursor._cursor.closed
+    assert observed.report()['statements'][0]['count'] == 1
+
+
+def test_iteration_reports_when_exhausted(observed):
+    cursor = InstrumentedCursor(UnbufferedCursor([(1,), (2,)], fetch_seconds=0.03))
+    cursor.execute("SELECT id FROM tires", None)
+    assert [row for row in cursor] == [(1,), (2,)]
+    assert observed.report()['statements'][0]['max_ms'] >= 50
@@ -0,0 +1,77 @@
+import pytest
+
+from db.statements import (writable_changes, build_update, select_list, UnknownColumnError, PreparedStatementCache,
+                           WRITABLE_COLUMNS)
+
+
+def test_writable_changes_keeps_schema_order_and_drops_immutable_columns():
+    data = {'updatedAt': 'x', 'modelo': 'FH 540', 'placa': 'ABC1D23', 'id': 'v1', 'cliente_id': 'c1'}
+    changes = writable_changes('vehicles', data)
+    assert list(changes) == ['placa', 'modelo']
+    assert changes == {'placa': 'ABC1D23', 'modelo': 'FH 540'}
+
+
+def test_writable_changes_rejects_unknown_keys():
+    with pytest.raises(UnknownColumnError) as error:
+        writable_changes('tires', {'marca': 'Pirelli', 'senha': 'x', 'apagar': 1})
+    assert error.value.columns == ['apagar', 'senha']
+    assert str(error.value) == "Campos desconhecidos: apagar, senha."
+
+
+def test_numero_fogo_is_not_writable():
+    assert 'numeroFogo' not in WRITABLE_COLUMNS['tires']
+    assert writable_changes('tires', {'numeroFogo': '123'}) == {}
+
+
+def test_build_update_is_the_same_text_for_any_key_order():
+    first = build_update('tires', {'marca': 'Pirelli', 'medida': '295/80R22.5'})
+    second = build_update('tires', {'medida': '295/80R22.5', 'marca': 'Pirelli'})
+    assert first == second
+    assert first[0] == "UPDATE tires SET marca = %s, medida = %s, updatedAt = NOW() WHERE id = %s AND cliente_id = %s"
+    assert first[1] == ['Pirelli', '295/80R22.5']
+
+
+def test_build_update_custom_where_and_unknown_column():
+    sql, values = build_update('vehicles', {'eixos': 3}, where=('id',))
+    assert sql == "UPDATE vehicles SET eixos = %s, updatedAt = NOW() WHERE id = %s"
+    assert values == [3]
+    with pytest.raises(KeyError):
+        build_update('vehicles', {'cor': 'azul'})
+
+
+def test_select_list():
+    assert select_list('vehicles', exclude=('createdAt', 'updatedAt')) == "id, placa, modelo, ano, eixos, cliente_id"
+
+
+class FakeCursor:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnection:
+    def __init__(self):
+        self.cursors = []
+
+    def cursor(self, prepared=False):
+        assert prepared
+        self.cursors.append(FakeCursor())
+        return self.cursors[-1]
+
+
+def test_prepared_statement_cache_returns_the_stored_text_and_evicts_lru():
+    raw = FakeConnection()
+    statements = PreparedStatementCache(raw, size=2)
+    sql_a = "UPDATE tires SET marca = %s WHERE id = %s"
+    stored, cursor_a, hit = statements.lookup(sql_a)
+    assert not hit and stored is sql_a
+    # an equal string built elsewhere gets the cached object back (no re-prepare)
+    stored, cursor, hit = statements.lookup(''.join(["UPDATE tires SET marca = %s", " WHERE id = %s"]))
+    assert hit and stored is sql_a and cursor is cursor_a
+    statements.lookup("SELECT 1")
+    statements.lookup(sql_a)  # 'SELECT 1' is now the least recently used
+    statements.lookup("SELECT 2")
+    assert len(statements) == 2
+    assert raw.cursors[1].closed and not cursor_a.closed
@@ -0,0 +1,168 @@
+import json
+
+import pytest
+
+from controllers.tire_state import TIRE_STATE_COLUMNS, apply_events, event_tire_updates
+from controllers.tire_projection import (is_in_order, replay_tire, rebase_from_acquisition, acquisition_state,
+                                        REPLAY_BASE_SQL, REPLAY_EVENTS_SQL, ACQUISITION_STATE_SQL, REBASE_SQL)
+from controllers.event_controller import is_folded
+
+
+def new_tire(**state):
+    tire = dict.fromkeys(TIRE_STATE_COLUMNS)
+    tire.update(statusInicial='Em Estoque - Novo', numeroRecapagens=0, quilometragemTotalPercorrida=0,
+                ultimaLeituraHodometroRegistrada=0, profundidadeSulcoAtual=16)
+    tire.update(state)
+    return tire
+
+
+def mount(vehicle_id='v1'):
+    return {'tipo': 'Montagem em Veículo',
+            'detalhes': {'veiculoId': vehicle_id, 'veiculoPlaca': 'ABC1D23', 'eixo': 'Eixo 1', 'posicao': 'Esquerda Externa'}}
+
+
+def reading(odometer, depth):
+    return {'tipo': 'Registro de Quilometragem e Sulco',
+            'detalhes': {'quilometragemVeiculo': odometer, 'profundidadeSulcoAtual': depth}}
+
+
+def test_apply_events_accumulates_km_from_odometer_deltas():
+    tire = new_tire(ultimaLeituraHodometroRegistrada=1000)
+    state, changed = apply_events(tire, [mount(), reading(1800, 15), reading(3500, 14), reading(3000, 13.5)])
+    assert state['statusInicial'] == 'Em Uso'
+    assert state['currentVehicleId'] == 'v1'
+    # a reading below the last one updates the depth only
+    assert state['quilometragemTotalPercorrida'] == 2500
+    assert state['ultimaLeituraHodometroRegistrada'] == 3500
+    assert state['profundidadeSulcoAtual'] == 13.5
+    assert {'statusInicial', 'currentVehicleId', 'quilometragemTotalPercorrida'} <= changed
+
+
+def test_apply_events_depends_on_order():
+    events = [mount(), {'tipo': 'Remoção de Veículo'}]
+    removed, _ = apply_events(new_tire(), events)
+    mounted, _ = apply_events(new_tire(), list(reversed(events)))
+    assert removed['statusInicial'] == 'Em Estoque - Usado' and removed['currentVehicleId'] is None
+    assert mounted['statusInicial'] == 'Em Uso' and mounted['currentVehicleId'] == 'v1'
+
+
+def test_apply_events_does_not_mutate_input():
+    tire = new_tire()
+    apply_events(tire, [mount()])
+    assert tire['statusInicial'] == 'Em Estoque - Novo'
+
+
+def test_retread_return_counts_and_resets_depth():
+    updates = event_tire_updates(new_tire(numeroRecapagens=1),
+                                 {'tipo': 'Retorno da Recapagem', 'detalhes': {'novaProfundidadeSulco': 14}})
+    assert updates == {'numeroRecapagens': 2, 'statusInicial': 'Em Estoque - Recapado', 'profundidadeSulcoAtual': 14}
+
+
+def test_missing_details_raise_key_error():
+    with pytest.raises(KeyError):
+        event_tire_updates(new_tire(), {'tipo': 'Montagem em Veículo', 'detalhes': {}})
+
+
+def test_is_in_order_compares_dates_only():
+    assert is_in_order('2024-05-01', None)
+    assert is_in_order('2024-05-01', '2024-05-01')
+    assert is_in_order('2024-05-01T10:00:00', '2024-05-01')
+    assert not is_in_order('2024-04-30', '2024-05-01')
+
+
+def test_is_folded():
+    assert is_folded({'hasBase': 1, 'seq': 5, 'baseEventSeq': 7})
+    assert is_folded({'hasBase': 1, 'seq': 7, 'baseEventSeq': 7})
+    assert not is_folded({'hasBase': 1, 'seq': 8, 'baseEventSeq': 7})
+    assert not is_folded({'hasBase': 1, 'seq': 1, 'baseEventSeq': None})
+    # no base: the hand-edited state already includes every event, until rebased
+    assert is_folded({'hasBase': 0, 'seq': 9, 'baseEventSeq': None})
+
+
+class ReplayCursor:
+    """Dictionary cursor answering the replay and rebase queries."""
+
+    def __init__(self, base, events, tire=None):
+        self.base = base
+        self.events = events
+        self.tire = tire
+        self.executed = []
+        self._rows = []
+
+    def execute(self, sql, values=()):
+        self.executed.append((sql, values))
+        if sql == REPLAY_BASE_SQL:
+            self._rows = [self.base] if self.base else []
+        elif sql == ACQUISITION_STATE_SQL:
+            self._rows = [self.tire] if self.tire else []
+        elif sql == REPLAY_EVENTS_SQL:
+            self._rows = [{'tipo': e['tipo'], 'detalhes': json.dumps(e.get('detalhes', {}))} for e in self.events]
+        else:
+            self._rows = []
+
+    def fetchone(self):
+        return self._rows.pop(0) if self._rows else None
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+
+def replay_row(current, base, base_event_seq):
+    row = {'id': 't1', 'baseEventSeq': base_event_seq, **current}
+    row.update({f"base_{column}": value for column, value in base.items()})
+    return row
+
+
+def test_replay_folds_remaining_events_over_the_base():
+    base = new_tire(ultimaLeituraHodometroRegistrada=1000)
+    current = new_tire(statusInicial='Em Estoque - Usado', quilometragemTotalPercorrida=9000)
+    cursor = ReplayCursor(replay_row(current, base, 12), [mount(), reading(1500, 15), reading(2000, 14)])
+    changes = replay_tire(cursor, 'c1', 't1')
+    assert cursor.executed[1] == (REPLAY_EVENTS_SQL, ('c1', 't1', 12))
+    assert changes['statusInicial'] == 'Em Uso'
+    assert changes['quilometragemTotalPercorrida'] == 1000
+    assert cursor.executed[-1][0].startswith('UPDATE tires')
+
+
+def test_replay_without_changes_writes_nothing():
+    base = new_tire()
+    state, _ = apply_events(base, [mount()])
+    cursor = ReplayCursor(replay_row(state, base, 3), [mount()])
+    assert replay_tire(cursor, 'c1', 't1') == {}
+    assert len(cursor.executed) == 2
+
+
+def test_replay_of_tire_without_base_is_a_no_op():
+    cursor = ReplayCursor(None, [mount()])
+    assert replay_tire(cursor, 'c1', 't1') == {}
+    assert len(cursor.executed) == 1
+
+
+def test_acquisition_state_keeps_retreads_the_history_does_not_explain():
+    tire = new_tire(numeroRecapagens=2, profundidadeSulcoAtual=9, profundidadeSulcoInicial=16)
+    retread = {'tipo': 'Retorno da Recapagem', 'detalhes': {'novaProfundidadeSulco': 14}}
+    state = acquisition_state(tire, [retread])
+    assert state['numeroRecapagens'] == 1 and state['statusInicial'] == 'Em Estoque - Recapado'
+    assert state['profundidadeSulcoAtual'] == 16 and state['quilometragemTotalPercorrida'] == 0
+    assert acquisition_state(tire, [retread] * 3)['numeroRecapagens'] == 0
+
+
+def test_rebase_when_history_reproduces_the_current_state():
+    events = [mount(), reading(1500, 15), reading(2000, 14)]
+    current, _ = apply_events(new_tire(), events)
+    cursor = ReplayCursor(None, events, tire={'id': 't1', 'profundidadeSulcoInicial': 16, **current})
+    assert rebase_from_acquisition(cursor, 'c1', 't1')
+    assert cursor.executed[1] == (REPLAY_EVENTS_SQL, ('c1', 't1', 0))
+    sql, values = cursor.executed[-1]
+    assert sql == REBASE_SQL and values[:2] == ['t1', 'c1']
+    assert dict(zip(TIRE_STATE_COLUMNS, values[2:])) == new_tire()
+
+
+def test_hand_edited_tire_is_not_rebased():
+    events = [mount(), reading(1500, 15)]
+    current, _ = apply_events(new_tire(), events)
+    current['quilometragemTotalPercorrida'] = 40000
+    cursor = ReplayCursor(None, events, tire={'id': 't1', 'profundidadeSulcoInicial': 16, **current})
+    assert not rebase_from_acquisition(cursor, 'c1', 't1')
+    assert all(sql != REBASE_SQL for sql, _ in cursor.executed)